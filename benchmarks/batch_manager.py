@@ -0,0 +1,130 @@
+"""
+Нагрузка на BatchManager: много пользователей одновременно шлют пачки файлов.
+
+Сравнивается текущий планировщик (одна куча сроков и один цикл) с прежней
+схемой «задача asyncio на каждый файл». Бот заменен заглушкой, которая
+только запоминает время отправки сводки.
+
+Запуск из корня проекта:
+    python benchmarks/batch_manager.py --users 10000 --files 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.batch_manager import BATCH_DELAY, BatchManager
+
+
+class FakeBot:
+    """Вместо Telegram: время отправки сводки по chat_id"""
+
+    def __init__(self):
+        self.sent = {}
+
+    async def send_message(self, chat_id: int, text: str):
+        self.sent[chat_id] = asyncio.get_running_loop().time()
+
+
+class LegacyBatchManager(BatchManager):
+    """Прежняя схема: defaultdict словарей и новая задача на каждый файл"""
+
+    def __init__(self, bot, delay: float = BATCH_DELAY):
+        self.bot = bot
+        self.delay = delay
+        self.user_state = defaultdict(lambda: {"results": [], "timer": None})
+
+    def add_result(self, user_id, result):
+        self.user_state[user_id]["results"].append(result)
+
+    async def schedule_batch(self, user_id, chat_id):
+        state = self.user_state[user_id]
+        state["chat_id"] = chat_id
+        if state["timer"]:
+            state["timer"].cancel()
+
+        async def send_summary():
+            await asyncio.sleep(self.delay)
+            results = state["results"]
+            if len(results) > 1:
+                await self.bot.send_message(chat_id, "итоги")
+            del self.user_state[user_id]
+
+        state["timer"] = asyncio.create_task(send_summary())
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+async def run(manager_cls, users: int, files: int, interval: float) -> dict:
+    bot = FakeBot()
+    manager = manager_cls(bot)
+    manager.start()
+    loop = asyncio.get_running_loop()
+    last_file = {}
+    schedule_time = 0.0
+    peak_tasks = 0
+
+    tracemalloc.start()
+    for _ in range(files):
+        started = time.perf_counter()
+        for user_id in range(1, users + 1):
+            manager.add_result(user_id, {"success": True, "filename": "f.xlsx"})
+            await manager.schedule_batch(user_id, user_id)
+            last_file[user_id] = loop.time()
+        schedule_time += time.perf_counter() - started
+        peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+        await asyncio.sleep(interval)
+    memory_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    give_up = max(last_file.values()) + BATCH_DELAY * 3
+    while len(bot.sent) < users and loop.time() < give_up:
+        await asyncio.sleep(0.05)
+    manager.stop()
+
+    # Насколько позже срока (последний файл + задержка) ушла сводка
+    delays = [bot.sent[u] - last_file[u] - BATCH_DELAY for u in bot.sent]
+    return {
+        "summaries": len(bot.sent),
+        "schedule_us_per_call": round(schedule_time / (users * files) * 1e6, 2),
+        "peak_tasks": peak_tasks,
+        "peak_memory_mb": round(memory_peak / 2**20, 2),
+        "fire_lag_p50_ms": round(percentile(delays, 50) * 1000, 1) if delays else None,
+        "fire_lag_p99_ms": round(percentile(delays, 99) * 1000, 1) if delays else None,
+        "fire_lag_max_ms": round(max(delays) * 1000, 1) if delays else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=5, help="файлов на пользователя")
+    parser.add_argument(
+        "--interval", type=float, default=0.5, help="пауза между файлами, с"
+    )
+    args = parser.parse_args()
+
+    for name, cls in (("heap", BatchManager), ("legacy", LegacyBatchManager)):
+        result = asyncio.run(run(cls, args.users, args.files, args.interval))
+        print(f"{name:<7} " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
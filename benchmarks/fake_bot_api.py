@@ -0,0 +1,215 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных тестов.
+
+Реализует методы, которыми пользуется бот: getMe, getUpdates, getFile,
+sendDocument, sendMessage, скачивание файлов; остальные методы отвечают
+успехом. Документы «от пользователей» добавляются через add_document,
+ответы бота сохраняются вместе с временем их получения.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+BOT_INFO = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Load test bot",
+    "username": "load_test_bot",
+}
+
+
+@dataclass
+class Reply:
+    """Ответ бота на сообщение пользователя"""
+
+    method: str
+    chat_id: int
+    reply_to: int | None
+    text: str
+    received_at: float
+    size: int = 0
+
+
+@dataclass
+class Upload:
+    """Документ, отправленный пользователем"""
+
+    message_id: int
+    user_id: int
+    filename: str
+    sent_at: float
+    replies: list[Reply] = field(default_factory=list)
+
+
+class FakeBotApi:
+    """Заглушка Bot API на aiohttp"""
+
+    def __init__(self, flood_ratio: float = 0.0, retry_after: int = 1):
+        # Доля ответов sendDocument/sendMessage с ошибкой 429 (RetryAfter)
+        self.flood_ratio = flood_ratio
+        self.retry_after = retry_after
+        self.flood_errors = 0
+        self.uploads: dict[int, Upload] = {}
+        self.messages: list[Reply] = []
+        # Бот начал опрашивать getUpdates — запуск завершен
+        self.polling = asyncio.Event()
+
+        self._files: dict[str, bytes] = {}
+        self._updates: list[dict] = []
+        self._new_updates = asyncio.Condition()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024**3)
+        app.router.add_post("/bot{token}/{method}", self._handle_method)
+        app.router.add_get("/file/bot{token}/{path:.+}", self._handle_file)
+        return app
+
+    async def add_document(
+        self,
+        user_id: int,
+        filename: str,
+        data: bytes,
+        file_unique_id: str | None = None,
+    ) -> Upload:
+        """Документ от пользователя: попадет в ответ getUpdates"""
+        file_number = next(self._file_ids)
+        file_id = f"file-{file_number}"
+        self._files[file_id] = data
+
+        message_id = next(self._message_ids)
+        user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+        update = {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": user,
+                "document": {
+                    "file_id": file_id,
+                    "file_unique_id": file_unique_id or f"unique-{file_number}",
+                    "file_name": filename,
+                    "file_size": len(data),
+                },
+            },
+        }
+        upload = Upload(message_id, user_id, filename, time.perf_counter())
+        self.uploads[message_id] = upload
+
+        async with self._new_updates:
+            self._updates.append(update)
+            self._new_updates.notify_all()
+        return upload
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    async def _handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = await request.post()
+
+        if method == "getme":
+            return self._ok(BOT_INFO)
+        if method == "getupdates":
+            self.polling.set()
+            return self._ok(await self._get_updates(params))
+        if method == "getfile":
+            file_id = params["file_id"]
+            return self._ok(
+                {
+                    "file_id": file_id,
+                    "file_unique_id": file_id,
+                    "file_size": len(self._files[file_id]),
+                    "file_path": f"documents/{file_id}",
+                }
+            )
+        if method in ("senddocument", "sendmessage"):
+            if self.flood_ratio and random.random() < self.flood_ratio:
+                self.flood_errors += 1
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": "Too Many Requests: retry after "
+                        f"{self.retry_after}",
+                        "parameters": {"retry_after": self.retry_after},
+                    },
+                    status=429,
+                )
+            return self._ok(self._record_reply(method, params))
+        return self._ok(True)
+
+    async def _get_updates(self, params) -> list[dict]:
+        """Long polling: ждем новые обновления до timeout секунд"""
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+
+        # Обновления до offset подтверждены ботом
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            async with self._new_updates:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except TimeoutError:
+                    pass
+        return self._updates[:100]
+
+    def _record_reply(self, method: str, params) -> dict:
+        now = time.perf_counter()
+        chat_id = int(params["chat_id"])
+        reply_to = None
+        if "reply_parameters" in params:
+            reply_to = json.loads(params["reply_parameters"])["message_id"]
+        elif "reply_to_message_id" in params:
+            reply_to = int(params["reply_to_message_id"])
+
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_INFO,
+        }
+        size = 0
+        if method == "senddocument":
+            document = params["document"]
+            if isinstance(document, web.FileField):
+                size = len(document.file.read())
+                file_id = f"result-{next(self._file_ids)}"
+                name = document.filename
+            else:
+                # Повторная отправка уже загруженного результата
+                file_id = name = document
+            message["document"] = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_name": name,
+                "file_size": size,
+            }
+            text = params.get("caption", "")
+        else:
+            text = params.get("text", "")
+            message["text"] = text
+
+        reply = Reply(method, chat_id, reply_to, text, now, size)
+        if reply_to in self.uploads:
+            self.uploads[reply_to].replies.append(reply)
+        else:
+            self.messages.append(reply)
+        return message
+
+    async def _handle_file(self, request: web.Request) -> web.StreamResponse:
+        file_id = request.match_info["path"].rsplit("/", 1)[-1]
+        data = self._files.get(file_id)
+        if data is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=data, content_type="application/octet-stream")
@@ -0,0 +1,102 @@
+"""
+Детерминированный генератор входных файлов и справочников для бенчмарков.
+
+Одинаковые параметры и seed всегда дают одинаковое содержимое, поэтому
+результаты разных коммитов сравнимы между собой.
+"""
+
+import random
+from collections.abc import Iterator
+from pathlib import Path
+
+from openpyxl import Workbook
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+INPUT_HEADER = ["№", "Код маркировки", "Наименование", "Цена", "Комментарий"]
+REFERENCE_HEADER = ["Артикул", "Наименование", "Бренд", "Размер", "Цвет", "Штрихкод"]
+
+
+def article_name(index: int) -> str:
+    """Артикул по номеру: G0000, G0001, ..."""
+    return f"G{index:04d}"
+
+
+def barcode_for(index: int) -> str:
+    """Стабильный 13-значный штрихкод для артикула"""
+    return f"46{(index * 7919) % 10**11:011d}"
+
+
+def make_code(rnd: random.Random) -> str:
+    """Код маркировки в стиле DataMatrix: 01 + GTIN + 21 + серийный номер"""
+    serial = "".join(rnd.choices("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789", k=13))
+    return f"010{rnd.randrange(10**13):013d}21{serial}"
+
+
+def input_rows(
+    codes: int,
+    seed: int = 1,
+    empty_ratio: float = 0.02,
+    numeric_ratio: float = 0.05,
+    padded_ratio: float = 0.05,
+) -> Iterator[list]:
+    """
+    Строки входного файла: заголовок и codes строк данных. В столбце B —
+    коды, часть ячеек пустая, часть числовая, часть с пробелами по краям;
+    в остальных столбцах — посторонние данные.
+    """
+    rnd = random.Random(seed)
+    yield INPUT_HEADER
+    for i in range(codes):
+        roll = rnd.random()
+        if roll < empty_ratio:
+            code = None
+        elif roll < empty_ratio + numeric_ratio:
+            code = rnd.randrange(10**12, 10**13)
+        elif roll < empty_ratio + numeric_ratio + padded_ratio:
+            code = f"  {make_code(rnd)} "
+        else:
+            code = make_code(rnd)
+        yield [i + 1, code, f"Товар {rnd.randrange(1000)}", rnd.random() * 1000, ""]
+
+
+def reference_rows(articles: int, seed: int = 2) -> Iterator[list]:
+    """Строки справочника: артикул в A, штрихкод в F, часть артикулов в нижнем
+    регистре и с пробелами, часть строк без штрихкода"""
+    rnd = random.Random(seed)
+    yield REFERENCE_HEADER
+    for i in range(articles):
+        article = article_name(i)
+        if rnd.random() < 0.05:
+            article = f" {article.lower()} "
+        barcode: str | None = barcode_for(i) if rnd.random() > 0.01 else None
+        yield [article, f"Товар {i}", "Бренд", rnd.choice("SML"), "черный", barcode]
+
+
+def write_xlsx(path: Path, rows) -> Path:
+    """Запись строк в xlsx через write-only режим openpyxl"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in rows:
+        ws.append(row)
+    tmp_path = path.with_suffix(".tmp")
+    wb.save(tmp_path)
+    tmp_path.replace(path)
+    return path
+
+
+def input_workbook(codes: int, seed: int = 1) -> Path:
+    """Путь к входному файлу на codes кодов (генерируется один раз и кэшируется)"""
+    path = CACHE_DIR / f"input_{codes}_{seed}.xlsx"
+    if not path.exists():
+        write_xlsx(path, input_rows(codes, seed))
+    return path
+
+
+def reference_book(articles: int, seed: int = 2) -> Path:
+    """Путь к справочнику на articles артикулов (кэшируется)"""
+    path = CACHE_DIR / f"reference_{articles}_{seed}.xlsx"
+    if not path.exists():
+        write_xlsx(path, reference_rows(articles, seed))
+    return path
@@ -0,0 +1,293 @@
+"""
+Сквозной нагрузочный тест бота на локальной заглушке Bot API.
+
+Настоящий бот (src/main.py) запускается в этом же процессе в режиме
+polling и ходит в заглушку через TELEGRAM_API_URL. N пользователей
+одновременно отправляют пачки по M файлов, между пачками выжидая окно
+группировки BatchManager. Сеть не нужна.
+
+Запуск из корня проекта:
+    python benchmarks/load_test.py --users 20 --files 5 --bursts 3 --codes 1000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import generator
+from aiohttp import ClientSession, web
+from fake_bot_api import FakeBotApi, Upload
+
+BATCH_WINDOW = 3.5
+LAG_INTERVAL = 0.05
+RSS_INTERVAL = 0.5
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+def rss_bytes(pid: int) -> int:
+    """Резидентная память процесса по /proc (0, если недоступно)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def final_reply(upload: Upload):
+    """Результат или сообщение об ошибке (уведомления об очереди не в счет)"""
+    for reply in upload.replies:
+        if reply.method == "senddocument" or not reply.text.startswith("⏳"):
+            return reply
+    return None
+
+
+class Monitor:
+    """Задержка цикла событий и пиковая память процесса с воркерами"""
+
+    def __init__(self):
+        self.lags: list[float] = []
+        self.peak_rss = 0
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._watch_lag()),
+            asyncio.create_task(self._watch_rss()),
+        ]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _watch_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - started - LAG_INTERVAL))
+
+    async def _watch_rss(self):
+        while True:
+            pids = [os.getpid()] + [p.pid for p in multiprocessing.active_children()]
+            self.peak_rss = max(self.peak_rss, sum(rss_bytes(pid) for pid in pids))
+            await asyncio.sleep(RSS_INTERVAL)
+
+
+async def simulate_user(
+    api: FakeBotApi, user_id: int, args, data: bytes, articles: int
+) -> list[Upload]:
+    """Пачки файлов от одного пользователя с паузой на окно группировки"""
+    uploads = []
+    for burst in range(args.bursts):
+        batch = []
+        for n in range(args.files):
+            article = generator.article_name((user_id * args.files + n) % articles)
+            unique_id = "same" if args.repeat_files else None
+            batch.append(
+                await api.add_document(
+                    user_id, f"{article} - пачка {burst}.xlsx", data, unique_id
+                )
+            )
+            await asyncio.sleep(args.interval)
+
+        while not all(final_reply(u) for u in batch):
+            await asyncio.sleep(0.05)
+        uploads.extend(batch)
+        await asyncio.sleep(BATCH_WINDOW)
+    return uploads
+
+
+def configure_environment(args, api_url: str, tmp: Path, reference: Path):
+    """Переменные окружения для src/config.py до его импорта"""
+    os.environ.update(
+        {
+            "TG_BOT_API_TOKEN": "42:LOAD-TEST",
+            "TELEGRAM_API_URL": api_url,
+            "REFERENCE_BOOK_FILE_PATH": str(reference),
+            "REFERENCE_SNAPSHOT_PATH": str(tmp / "reference.snapshot"),
+            "BOT_MODE": "polling",
+            "WORKER_POOL_MODE": args.pool_mode,
+            "WORKER_POOL_SIZE": str(args.pool_size),
+            "WORKER_QUEUE_SIZE": str(args.users * args.files * args.bursts),
+        }
+    )
+    if not args.repeat_files:
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+    if args.metrics_port:
+        os.environ["METRICS_PORT"] = str(args.metrics_port)
+    if args.durable:
+        os.environ["JOB_QUEUE_PATH"] = str(tmp / "jobs.sqlite3")
+        os.environ["JOB_WORKERS"] = str(args.pool_size)
+        os.environ["JOB_POLL_INTERVAL"] = "0.05"
+
+
+async def stage_means(port: int) -> dict:
+    """Средняя длительность этапов по /metrics бота"""
+    async with (
+        ClientSession() as session,
+        session.get(f"http://127.0.0.1:{port}/metrics") as response,
+    ):
+        text = await response.text()
+
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f'tg_bot_stage_seconds{suffix}{{stage="'
+            if line.startswith(prefix):
+                stage, value = line[len(prefix) :].split('"} ')
+                target[stage] = float(value)
+    return {
+        f"stage_{stage}_mean": round(sums[stage] / counts[stage], 4)
+        for stage in sorted(sums)
+        if counts.get(stage)
+    }
+
+
+async def run(args) -> dict:
+    reference = generator.reference_book(args.articles)
+    data = generator.input_workbook(args.codes).read_bytes()
+
+    api = FakeBotApi(flood_ratio=args.flood)
+    runner = web.AppRunner(api.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args, f"http://{host}:{port}", Path(tmp), reference)
+        import main as bot_main
+
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        worker = None
+        if args.durable:
+            worker = await asyncio.create_subprocess_exec(
+                sys.executable,
+                str(Path(bot_main.__file__).with_name("worker.py")),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=None if args.verbose else asyncio.subprocess.DEVNULL,
+            )
+
+        monitor = Monitor()
+        monitor.start()
+        bot_task = asyncio.create_task(bot_main.main())
+        while not api.polling.is_set():
+            if bot_task.done():
+                raise RuntimeError("Бот завершился при запуске")
+            await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        per_user = await asyncio.wait_for(
+            asyncio.gather(
+                *(
+                    simulate_user(api, user_id, args, data, args.articles)
+                    for user_id in range(1, args.users + 1)
+                )
+            ),
+            args.timeout,
+        )
+        elapsed = time.perf_counter() - started
+        stages = await stage_means(args.metrics_port) if args.metrics_port else {}
+
+        await bot_main.dp.stop_polling()
+        await bot_task
+        monitor.stop()
+        if worker:
+            worker.terminate()
+            await worker.wait()
+    await runner.cleanup()
+
+    uploads = [u for batch in per_user for u in batch]
+    latencies = [final_reply(u).received_at - u.sent_at for u in uploads]
+    # Паузы на окно группировки в пропускную способность не входят
+    busy = elapsed - args.bursts * BATCH_WINDOW
+    errors = sum(1 for u in uploads if final_reply(u).method != "senddocument")
+    summaries = sum(1 for m in api.messages if m.text.startswith("Обработка завершена"))
+
+    return {
+        "users": args.users,
+        "files_per_burst": args.files,
+        "bursts": args.bursts,
+        "codes": args.codes,
+        "articles": args.articles,
+        "pool": f"{args.pool_mode}x{args.pool_size}",
+        "files": len(uploads),
+        "errors": errors,
+        "batch_summaries": summaries,
+        "flood_errors_injected": api.flood_errors,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p90": round(percentile(latencies, 90), 4),
+        "latency_p99": round(percentile(latencies, 99), 4),
+        "latency_max": round(max(latencies, default=0), 4),
+        "throughput_files_per_s": round(len(uploads) / busy, 2) if busy > 0 else None,
+        "loop_lag_p50": round(percentile(monitor.lags, 50), 4),
+        "loop_lag_p99": round(percentile(monitor.lags, 99), 4),
+        "loop_lag_max": round(max(monitor.lags, default=0), 4),
+        "peak_rss_mb": round(monitor.peak_rss / 2**20, 1),
+        **stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--files", type=int, default=3, help="файлов в пачке")
+    parser.add_argument("--bursts", type=int, default=2, help="пачек на пользователя")
+    parser.add_argument(
+        "--interval", type=float, default=0.2, help="пауза между файлами пачки, с"
+    )
+    parser.add_argument("--codes", type=int, default=1000, help="кодов в файле")
+    parser.add_argument("--articles", type=int, default=10_000)
+    parser.add_argument("--pool-mode", choices=("process", "thread"), default="process")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument(
+        "--repeat-files",
+        action="store_true",
+        help="одинаковый file_unique_id (кэш результатов)",
+    )
+    parser.add_argument(
+        "--durable", action="store_true", help="надежная очередь и отдельный worker.py"
+    )
+    parser.add_argument(
+        "--flood", type=float, default=0.0, help="доля ответов 429 от заглушки"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="включить /metrics бота и вывести средние по этапам",
+    )
+    parser.add_argument("--verbose", action="store_true", help="логи бота уровня INFO")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", type=Path, help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    for key, value in report.items():
+        print(f"{key:<24} {value}")
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Сравнение CodeReader с чтением через pandas для xlsx, xls, ods и csv.
+
+Запуск из корня проекта:
+    python benchmarks/readers.py --rows 50000
+
+Для xls нужен xlwt, для ods — odfpy (только для генерации и pandas-пути);
+форматы без нужных пакетов пропускаются.
+"""
+
+import argparse
+import csv
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from services.code_readers import CodeReader
+
+XLS_MAX_ROWS = 65535
+
+
+def make_rows(count: int, seed: int = 7) -> list[list]:
+    rnd = random.Random(seed)
+    rows = [["№", "Код", "Примечание", "Сумма"]]
+    for i in range(count):
+        code = f"0104600{rnd.randrange(10**12):012d}21{rnd.randrange(36**8):X}"
+        rows.append([i, "" if i % 50 == 0 else code, "x" * (i % 7), i * 1.5])
+    return rows
+
+
+def write_xlsx(path: Path, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def write_csv(path: Path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, delimiter=";").writerows(rows)
+
+
+def write_xls(path: Path, rows):
+    import xlwt
+
+    wb = xlwt.Workbook()
+    ws = wb.add_sheet("Sheet")
+    for r, row in enumerate(rows[: XLS_MAX_ROWS + 1]):
+        for c, value in enumerate(row):
+            ws.write(r, c, value)
+    wb.save(str(path))
+
+
+def write_ods(path: Path, rows):
+    pd.DataFrame(rows).to_excel(path, header=False, index=False, engine="odf")
+
+
+def pandas_codes(path: Path, fmt: str) -> list[str]:
+    if fmt == "csv":
+        df = pd.read_csv(path, header=None, skiprows=1, dtype=str, sep=";")
+    else:
+        engine = {"xlsx": "openpyxl", "xls": "xlrd", "ods": "odf"}[fmt]
+        df = pd.read_excel(path, header=None, skiprows=1, dtype=str, engine=engine)
+    codes = df.iloc[:, 1].str.strip().dropna()
+    return codes[codes != ""].tolist()
+
+
+def timed(fn) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    writers = {"xlsx": write_xlsx, "xls": write_xls, "ods": write_ods, "csv": write_csv}
+
+    print(
+        f"{'формат':<6} {'строк':>8} {'pandas, с':>10} {'CodeReader, с':>14} {'x':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, writer in writers.items():
+            path = Path(tmp) / f"codes.{fmt}"
+            try:
+                writer(path, rows)
+                pandas_time, expected = timed(
+                    lambda path=path, fmt=fmt: pandas_codes(path, fmt)
+                )
+            except ImportError as e:
+                print(f"{fmt:<6} пропущен: {e}")
+                continue
+
+            reader_time, actual = timed(
+                lambda path=path: list(CodeReader.iter_codes(path))
+            )
+            status = "" if actual == expected else "  (результаты различаются!)"
+            print(
+                f"{fmt:<6} {len(actual):>8} {pandas_time:>10.2f} {reader_time:>14.2f} "
+                f"{pandas_time / reader_time:>6.1f}{status}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Сравнение памяти и задержки поиска: dict против PackedReferenceStore.
+
+Запуск из корня проекта:
+    python benchmarks/reference_store.py --articles 1000000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from services.reference_store import PackedReferenceStore
+
+
+def make_articles(count: int, seed: int = 42) -> dict[str, str]:
+    rnd = random.Random(seed)
+    return {
+        f"A{rnd.randrange(36**6):06X}-{i}": f"46{rnd.randrange(10**11):011d}"
+        for i in range(count)
+    }
+
+
+def measure_lookups(mapping, keys: list[str]) -> float:
+    """Средняя задержка get в наносекундах"""
+    get = mapping.get
+    started = time.perf_counter_ns()
+    for key in keys:
+        get(key)
+    return (time.perf_counter_ns() - started) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    source = make_articles(args.articles)
+    rnd = random.Random(1)
+    keys = list(source)
+    probes = [rnd.choice(keys) for _ in range(args.lookups // 2)]
+    probes += [f"MISSING-{i}" for i in range(args.lookups // 2)]
+    rnd.shuffle(probes)
+
+    tracemalloc.start()
+    # Новые строковые объекты, как после разбора xlsx
+    as_dict = {k.encode().decode(): v.encode().decode() for k, v in source.items()}
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "reference.snapshot"
+        started = time.perf_counter()
+        PackedReferenceStore.write(path, source, 0, 0, "00" * 32)
+        write_seconds = time.perf_counter() - started
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        store = PackedReferenceStore(path)
+        open_seconds = time.perf_counter() - started
+        store_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f"Артикулов: {args.articles:,}, поисков: {len(probes):,}")
+        print(f"dict:   {dict_bytes / 2**20:8.1f} МБ в куче каждого процесса")
+        print(
+            f"packed: {path.stat().st_size / 2**20:8.1f} МБ файл (общий, mmap), "
+            f"{store_heap / 1024:.1f} КБ в куче; "
+            f"запись {write_seconds:.2f} с, открытие {open_seconds * 1000:.2f} мс"
+        )
+        print(f"dict.get:   {measure_lookups(as_dict, probes):8.0f} нс")
+        print(f"packed.get: {measure_lookups(store, probes):8.0f} нс")
+
+
+if __name__ == "__main__":
+    main()
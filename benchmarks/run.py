@@ -0,0 +1,237 @@
+"""
+Бенчмарки конвейера обработки файлов: время и пиковая память.
+
+Запуск из корня проекта:
+    python benchmarks/run.py                       # 10, 1k, 100k кодов; 1k, 100k артикулов
+    python benchmarks/run.py --full                # до 1M кодов и 2M артикулов
+    python benchmarks/run.py --compare benchmarks/results/<старый>.json
+
+Результаты сохраняются в benchmarks/results/<время>_<коммит>.json.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import generator
+
+from services.file_processor import FileProcessor
+from services.reference_book import ReferenceBook
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+DEFAULT_CODES = [10, 1_000, 100_000]
+FULL_CODES = [10, 1_000, 100_000, 1_000_000]
+DEFAULT_ARTICLES = [1_000, 100_000]
+FULL_ARTICLES = [1_000, 100_000, 2_000_000]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    """Минимальное и медианное время за repeat запусков и пик памяти
+    (tracemalloc, отдельным запуском, чтобы не искажать время)"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_file_pipeline(codes_sizes: list[int], repeat: int, tmp: Path) -> list[dict]:
+    results = []
+    barcode = generator.barcode_for(1)
+    filename = f"{generator.article_name(1)} - партия.xlsx"
+
+    for codes in codes_sizes:
+        source = generator.input_workbook(codes)
+        codes_list = FileProcessor.read_codes_from_file(source)
+        runs = max(1, repeat if codes < 1_000_000 else 1)
+
+        cases = {
+            "read_codes_from_file": lambda source=source: (
+                FileProcessor.read_codes_from_file(source)
+            ),
+            "create_result_file": lambda codes_list=codes_list: (
+                FileProcessor.create_result_file(barcode, codes_list, io.BytesIO())
+            ),
+            "process_file": lambda source=source: FileProcessor.process_file(
+                source, tmp, filename, barcode
+            ),
+        }
+        for name, fn in cases.items():
+            results.append({"name": name, "codes": codes, **measure(fn, runs)})
+            print(f"  {name:<22} {codes:>9} кодов: {results[-1]}")
+    return results
+
+
+def bench_extract_article(repeat: int) -> list[dict]:
+    names = [
+        f"{generator.article_name(i)}{sep}{i} штук.xlsx"
+        for i in range(10_000)
+        for sep in (" - ", "_", ".", "—")
+    ]
+
+    def run():
+        for name in names:
+            FileProcessor.extract_article(name)
+
+    result = {"name": "extract_article", "calls": len(names), **measure(run, repeat)}
+    print(f"  extract_article        {len(names):>9} вызовов: {result}")
+    return [result]
+
+
+def bench_reference_book(
+    articles_sizes: list[int], repeat: int, tmp: Path
+) -> list[dict]:
+    results = []
+    for articles in articles_sizes:
+        source = generator.reference_book(articles)
+        snapshot = tmp / f"reference_{articles}.snapshot"
+        runs = max(1, repeat if articles < 1_000_000 else 1)
+
+        def load(snapshot_path=None, source=source):
+            ReferenceBook._cache = {}
+            asyncio.run(
+                ReferenceBook.load(source, force=True, snapshot_path=snapshot_path)
+            )
+
+        results.append(
+            {
+                "name": "ReferenceBook.load[xlsx]",
+                "articles": articles,
+                **measure(load, runs),
+            }
+        )
+        print(f"  ReferenceBook.load[xlsx]     {articles:>9}: {results[-1]}")
+
+        load(snapshot)  # создание снимка
+        results.append(
+            {
+                "name": "ReferenceBook.load[snapshot]",
+                "articles": articles,
+                **measure(lambda snapshot=snapshot: load(snapshot), repeat),
+            }
+        )
+        print(f"  ReferenceBook.load[snapshot] {articles:>9}: {results[-1]}")
+
+        probes = [
+            generator.article_name(i)
+            for i in range(0, articles, max(1, articles // 100_000))
+        ]
+
+        def lookups(probes=probes):
+            for article in probes:
+                ReferenceBook.get_barcode(article)
+
+        results.append(
+            {
+                "name": "ReferenceBook.get_barcode",
+                "articles": articles,
+                "calls": len(probes),
+                **measure(lookups, repeat),
+            }
+        )
+        print(f"  ReferenceBook.get_barcode    {articles:>9}: {results[-1]}")
+    return results
+
+
+def compare(current: list[dict], baseline_path: Path):
+    """Печать изменения времени относительно сохраненного прогона"""
+    baseline = json.loads(baseline_path.read_text())
+    key = lambda r: (r["name"], r.get("codes"), r.get("articles"))
+    old = {key(r): r for r in baseline["results"]}
+
+    print(f"\nСравнение с {baseline_path.name} ({baseline['commit']}):")
+    for result in current:
+        before = old.get(key(result))
+        if not before:
+            continue
+        ratio = (
+            result["seconds_min"] / before["seconds_min"]
+            if before["seconds_min"]
+            else 0
+        )
+        size = result.get("codes") or result.get("articles") or ""
+        print(
+            f"  {result['name']:<30} {size:>9}: {before['seconds_min']:.4f} -> "
+            f"{result['seconds_min']:.4f} с (x{ratio:.2f}), "
+            f"память {before['peak_mb']} -> {result['peak_mb']} МБ"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--full", action="store_true", help="большие размеры (долго)")
+    parser.add_argument("--codes", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--articles", type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", type=Path, help="JSON предыдущего прогона")
+    args = parser.parse_args()
+
+    codes_sizes = args.codes or (FULL_CODES if args.full else DEFAULT_CODES)
+    articles_sizes = args.articles or (FULL_ARTICLES if args.full else DEFAULT_ARTICLES)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Обработка файлов:")
+        results += bench_file_pipeline(codes_sizes, args.repeat, Path(tmp))
+        results += bench_extract_article(args.repeat)
+        print("Справочник:")
+        results += bench_reference_book(articles_sizes, args.repeat, Path(tmp))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
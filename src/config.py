@@ -1,6 +1,9 @@
+import logging
 import os
+import re
+import socket
 import sys
-import logging
+
 from dotenv import load_dotenv
 
 logging.basicConfig(
@@ -13,6 +16,100 @@ load_dotenv()
 
 TOKEN = os.getenv("TG_BOT_API_TOKEN")
 REFERENCE_BOOK_FILE_PATH = os.getenv("REFERENCE_BOOK_FILE_PATH")
+# Бинарный снимок справочника (по умолчанию — рядом с временной директорией)
+REFERENCE_SNAPSHOT_PATH = os.getenv("REFERENCE_SNAPSHOT_PATH")
+# Хранилище справочника: dict (в памяти процесса) или mmap (снимок на диске)
+REFERENCE_BACKEND = os.getenv("REFERENCE_BACKEND", "dict").lower()
+# Опрос файла справочника на изменения и пауза, пока файл дописывается
+REFERENCE_POLL_INTERVAL = float(os.getenv("REFERENCE_POLL_INTERVAL", "5"))
+REFERENCE_DEBOUNCE = float(os.getenv("REFERENCE_DEBOUNCE", "2"))
+
+# Пул обработки файлов: process (по умолчанию) или thread
+WORKER_POOL_MODE = os.getenv("WORKER_POOL_MODE", "process").lower()
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "2"))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "50"))
+WORKER_JOB_TIMEOUT = float(os.getenv("WORKER_JOB_TIMEOUT", "300"))
+# Справедливая очередь: всего файлов в работе (скачивание, обработка,
+# отправка), файлов одного пользователя одновременно и ожидающих файлов
+SCHEDULER_MAX_ACTIVE = int(os.getenv("SCHEDULER_MAX_ACTIVE", str(WORKER_POOL_SIZE * 2)))
+SCHEDULER_PER_USER = int(os.getenv("SCHEDULER_PER_USER", "2"))
+SCHEDULER_QUEUE_SIZE = int(os.getenv("SCHEDULER_QUEUE_SIZE", "1000"))
+# Надежная очередь задач на SQLite (пусто — файлы обрабатываются пулом
+# внутри бота); воркеры запускаются отдельно: python worker.py
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "")
+JOBS_DIR = os.getenv("JOBS_DIR") or os.path.join(
+    os.path.dirname(JOB_QUEUE_PATH) or ".", "jobs"
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+# Имя запуска worker.py в очереди (по умолчанию — имя хоста): по нему после
+# перезапуска находятся задачи, брошенные прежним запуском, поэтому оно не
+# должно меняться при пересоздании контейнера
+WORKER_ID = os.getenv("WORKER_ID") or socket.gethostname()
+# Пределы одного файла результата: строк (вместе с двумя строками заголовка,
+# не больше предела листа Excel) и байт (Bot API принимает файлы до 50 МБ);
+# больший результат делится на части codes_<артикул>_partN.xlsx
+RESULT_MAX_ROWS = min(int(os.getenv("RESULT_MAX_ROWS", "1048576")), 1048576)
+RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", str(45 * 1024 * 1024)))
+# Проверка кодов: gs1 (структура и длина GS1 DataMatrix) или регулярное
+# выражение для кода целиком; пусто — коды не проверяются. Повторы ищутся
+# внутри файла и между файлами одного пакета (в надежной очереди — только
+# внутри файла)
+CODE_PATTERN = os.getenv("CODE_PATTERN", "")
+# Сколько таблиц может быть в одном zip-архиве
+ARCHIVE_MAX_FILES = int(os.getenv("ARCHIVE_MAX_FILES", "500"))
+# Проверка файла до разбора (0 — предел выключен): размер документа,
+# размер после распаковки и степень сжатия xlsx/ods, ячеек в диапазоне
+# листа xlsx (элемент dimension). Файлы больше пределов SLOW_* обрабатываются
+# в медленной очереди по PREFLIGHT_SLOW_WORKERS одновременно
+PREFLIGHT_MAX_FILE_BYTES = int(
+    os.getenv("PREFLIGHT_MAX_FILE_BYTES", str(100 * 1024 * 1024))
+)
+PREFLIGHT_MAX_UNPACKED_BYTES = int(
+    os.getenv("PREFLIGHT_MAX_UNPACKED_BYTES", str(1024**3))
+)
+PREFLIGHT_MAX_RATIO = float(os.getenv("PREFLIGHT_MAX_RATIO", "100"))
+PREFLIGHT_MAX_CELLS = int(os.getenv("PREFLIGHT_MAX_CELLS", "100000000"))
+PREFLIGHT_SLOW_BYTES = int(os.getenv("PREFLIGHT_SLOW_BYTES", str(256 * 1024 * 1024)))
+PREFLIGHT_SLOW_CELLS = int(os.getenv("PREFLIGHT_SLOW_CELLS", "10000000"))
+PREFLIGHT_SLOW_WORKERS = int(os.getenv("PREFLIGHT_SLOW_WORKERS", "1"))
+# Файлы не больше этого размера обрабатываются в памяти, без временных файлов
+IN_MEMORY_MAX_BYTES = int(os.getenv("IN_MEMORY_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Кэш отправленных результатов (0 — выключен) и суммарный размер результатов
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1024**3)))
+
+# Режим получения обновлений: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Публичный адрес, который регистрируется в Telegram (без него setWebhook
+# не вызывается — удобно для локальной проверки POST-запросами)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+# Эндпоинт метрик Prometheus /metrics (0 — метрики выключены)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Лимиты исходящих сообщений: в один чат и всего (в секунду), повторы
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_MAX_ATTEMPTS = int(os.getenv("SEND_MAX_ATTEMPTS", "5"))
+# Соединений в общем пуле HTTP-сессии бота
+TELEGRAM_CONNECTIONS = int(os.getenv("TELEGRAM_CONNECTIONS", "100"))
+# Другой адрес Bot API: локальный telegram-bot-api или тестовая заглушка
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+# Администраторы (user id через запятую): им доступна команда /profile
+ADMIN_IDS = frozenset(
+    int(user_id)
+    for user_id in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",")
+    if user_id
+)
+# Длительность сессии /profile по умолчанию и максимальная, секунд
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
 
 if not TOKEN:
     logger.error("ОШИБКА: Не задана переменная окружения TG_BOT_API_TOKEN")
@@ -21,3 +118,26 @@ if not TOKEN:
 if not REFERENCE_BOOK_FILE_PATH:
     logger.error("ОШИБКА: Не задана переменная окружения REFERENCE_BOOK_FILE_PATH")
     sys.exit(1)
+
+if CODE_PATTERN and CODE_PATTERN != "gs1":
+    try:
+        re.compile(CODE_PATTERN)
+    except re.error as e:
+        logger.error("ОШИБКА: Неверное регулярное выражение CODE_PATTERN: %s", e)
+        sys.exit(1)
+
+if RESULT_MAX_ROWS < 3:
+    logger.error(
+        "ОШИБКА: RESULT_MAX_ROWS должен быть не меньше 3 "
+        "(две строки заголовка и хотя бы один код)"
+    )
+    sys.exit(1)
+
+if BOT_MODE not in ("polling", "webhook"):
+    logger.error("ОШИБКА: BOT_MODE должен быть polling или webhook")
+    sys.exit(1)
+
+if WEBHOOK_URL and BOT_MODE != "webhook":
+    logger.warning(
+        "WEBHOOK_URL задан, но BOT_MODE=%s: вебхук не регистрируется", BOT_MODE
+    )
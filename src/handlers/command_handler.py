@@ -1,5 +1,13 @@
 import logging
-from aiogram.types import Message
+import math
+from collections.abc import Set as AbstractSet
+from datetime import datetime
+
+from aiogram.types import BufferedInputFile, Message
+
+from services.batch_manager import BatchManager
+from services.profiler import profiler
+from services.send_queue import SendError, SendQueue
 
 logger = logging.getLogger(__name__)
 
@@ -7,12 +15,97 @@ logger = logging.getLogger(__name__)
 class CommandHandler:
     """Обработчик команд бота"""
 
+    def __init__(
+        self,
+        batch_manager: BatchManager,
+        send_queue: SendQueue,
+        admin_ids: AbstractSet[int] = frozenset(),
+        profile_seconds: float = 30,
+        profile_max_seconds: float = 300,
+    ):
+        self.batch_manager = batch_manager
+        self.send_queue = send_queue
+        self.admin_ids = admin_ids
+        self.profile_seconds = profile_seconds
+        self.profile_max_seconds = profile_max_seconds
+
     @staticmethod
     async def start(message: Message):
         """Команда /start"""
         logger.info("Команда /start от пользователя %s", message.from_user.id)
         await message.answer(
             "Бот для обработки файлов с кодами.\n\n"
-            "Отправьте файл Excel (.xlsx или .xls) — можно несколько подряд.\n"
-            "Через 3 секунды после последнего файла пришлю результат."
+            "Отправьте таблицу (.xlsx, .xls, .ods или .csv) — можно несколько подряд.\n"
+            "Через 3 секунды после последнего файла пришлю результат.\n\n"
+            "Много файлов можно отправить одним .zip — ответ придет одним архивом.\n"
+            "/archive — получать результаты каждой пачки файлов одним архивом."
         )
+
+    async def archive(self, message: Message):
+        """Команда /archive: переключение режима архива"""
+        user_id = message.from_user.id
+        enabled = not self.batch_manager.is_archive_mode(user_id)
+        self.batch_manager.set_archive_mode(user_id, enabled)
+        logger.info(
+            "Режим архива %s пользователем %s",
+            "включен" if enabled else "выключен",
+            user_id,
+        )
+        if enabled:
+            await message.answer(
+                "📦 Режим архива включен: результаты файлов, отправленных подряд, "
+                "придут одним zip-архивом с отчетом об ошибках.\n"
+                "Выключить — /archive"
+            )
+        else:
+            await message.answer(
+                "Режим архива выключен: результат каждого файла приходит отдельно."
+            )
+
+    async def profile(self, message: Message, args: str | None):
+        """Команда /profile [секунды]: профилирование бота (только администраторы)"""
+        user_id = message.from_user.id
+        if user_id not in self.admin_ids:
+            logger.warning("Команда /profile от пользователя %s без прав", user_id)
+            return
+
+        try:
+            duration = float(args) if args else self.profile_seconds
+        except ValueError:
+            duration = math.nan
+        if not math.isfinite(duration):
+            await self._reply(message, "Использование: /profile [секунды]")
+            return
+        duration = min(max(duration, 1.0), self.profile_max_seconds)
+
+        if profiler.active:
+            await self._reply(message, "Профилирование уже идет, дождитесь отчета")
+            return
+
+        logger.info("Команда /profile на %s с от пользователя %s", duration, user_id)
+        await self._reply(
+            message, f"⏱ Профилирование {duration:g} с, затем пришлю отчет"
+        )
+        try:
+            report, summary = await profiler.run(duration)
+        except RuntimeError:
+            await self._reply(message, "Профилирование уже идет, дождитесь отчета")
+            return
+
+        document = BufferedInputFile(
+            report, filename=f"profile_{datetime.now():%Y%m%d_%H%M%S}.zip"
+        )
+        try:
+            await self.send_queue.send(
+                message.chat.id,
+                lambda: message.answer_document(document, caption=summary),
+            )
+        except SendError as e:
+            logger.error("Не удалось отправить отчет профилирования: %s", e)
+
+    async def _reply(self, message: Message, text: str):
+        """Ответ на команду через очередь отправки"""
+        try:
+            await self.send_queue.send(message.chat.id, lambda: message.answer(text))
+        except SendError as e:
+            logger.error("Не удалось ответить на команду: %s", e)
@@ -1,9 +1,27 @@
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
+from typing import Any
+
 from aiogram import Bot
-from aiogram.types import Message, FSInputFile
-from services.file_processor import FileProcessor
+from aiogram.types import BufferedInputFile, FSInputFile, Message
+
+from services.archive_processor import ArchiveProcessor
 from services.batch_manager import BatchManager
+from services.code_validator import CodeCheck, CodeValidator
+from services.fair_scheduler import FairScheduler, ReplyOrder
+from services.file_processor import FileProcessor
+from services.job_queue import DONE, FAILED, PENDING, JobQueue
+from services.metrics import metrics
+from services.preflight import Preflight, PreflightError
+from services.reference_book import ReferenceBook
+from services.result_cache import ResultCache
+from services.send_queue import SendError, SendQueue
+from services.worker_pool import WorkerPool
+from services.xlsx_stream import MAX_ROWS
 
 logger = logging.getLogger(__name__)
 
@@ -11,10 +29,44 @@ logger = logging.getLogger(__name__)
 class DocumentHandler:
     """Обработчик документов"""
 
-    def __init__(self, bot: Bot, temp_dir: Path, batch_manager: BatchManager):
+    def __init__(
+        self,
+        bot: Bot,
+        temp_dir: Path,
+        batch_manager: BatchManager,
+        worker_pool: WorkerPool,
+        result_cache: ResultCache,
+        scheduler: FairScheduler,
+        send_queue: SendQueue,
+        in_memory_max_bytes: int = 0,
+        job_queue: JobQueue | None = None,
+        jobs_dir: Path | None = None,
+        archive_max_files: int = 500,
+        result_max_rows: int = MAX_ROWS,
+        result_max_bytes: int | None = None,
+        code_pattern: str | None = None,
+        preflight: Preflight | None = None,
+        slow_lane_size: int = 1,
+    ):
         self.bot = bot
         self.temp_dir = temp_dir
         self.batch_manager = batch_manager
+        self.worker_pool = worker_pool
+        self.result_cache = result_cache
+        self.scheduler = scheduler
+        self.reply_order = ReplyOrder()
+        self.send_queue = send_queue
+        self.in_memory_max_bytes = in_memory_max_bytes
+        self.job_queue = job_queue
+        self.jobs_dir = jobs_dir
+        self.archive_max_files = archive_max_files
+        self.result_max_rows = result_max_rows
+        self.result_max_bytes = result_max_bytes
+        self.code_pattern = code_pattern
+        # Проверка размера и формы до разбора; тяжелые файлы обрабатываются
+        # в медленной очереди по slow_lane_size одновременно
+        self.preflight = preflight or Preflight()
+        self.slow_lane = asyncio.Semaphore(slow_lane_size)
 
     async def handle_document(self, message: Message):
         """Обработка входящего документа"""
@@ -23,46 +75,170 @@ class DocumentHandler:
         doc = message.document
 
         # Валидация формата файла
-        if not self._is_valid_file(doc):
-            await message.reply("Поддерживаются только .xlsx и .xls файлы")
+        is_archive = ArchiveProcessor.is_archive(doc.file_name)
+        if not is_archive and not FileProcessor.is_supported(doc.file_name):
+            await self.send_queue.send(
+                chat_id,
+                lambda: message.reply(
+                    "Поддерживаются только .xlsx, .xls, .ods, .csv и .zip файлы"
+                ),
+            )
             return
 
         logger.info("Получен файл %s от пользователя %s", doc.file_name, user_id)
 
+        # Сразу после запуска справочник может еще загружаться
+        await ReferenceBook.wait_ready()
+
+        # Надежная очередь: файл сохраняется задачей, обработают воркеры
+        # (архивы разбираются пулом внутри бота)
+        if self.job_queue is not None and not is_archive:
+            await self._enqueue(message, doc, user_id)
+            return
+
         # Генерация уникального имени для временного файла
-        temp_input = self.temp_dir / f"{user_id}_{doc.file_id}_{doc.file_name}"
+        temp_input = self.temp_dir / f"{self._file_prefix(message)}{doc.file_name}"
+
+        # Режим архива: результаты и ошибки пакета уходят одним архивом
+        in_archive = not is_archive and self.batch_manager.is_archive_mode(user_id)
 
+        # Номер файла для ответа в порядке отправки
+        ticket = self.reply_order.take(user_id)
         try:
-            await self._process_file(message, doc, temp_input, user_id)
-        except Exception as e:
-            await self._handle_error(message, doc, temp_input, user_id, str(e))
+            with metrics.stage("total"):
+                if is_archive:
+                    await self._process_archive(
+                        message, doc, temp_input, user_id, ticket
+                    )
+                else:
+                    await self._process_file(
+                        message, doc, temp_input, user_id, ticket, in_archive
+                    )
+        except Exception as e:  # noqa: BLE001
+            metrics.count_file("error")
+            metrics.count_error(e)
+            await self.reply_order.wait(user_id, ticket)
+            await self._handle_error(
+                message, doc, temp_input, user_id, str(e), in_archive
+            )
+        finally:
+            self.reply_order.done(user_id, ticket)
 
         # Планируем отправку итогового сообщения
         await self.batch_manager.schedule_batch(user_id, chat_id)
 
-    def _is_valid_file(self, doc) -> bool:
-        """Проверка формата файла"""
-        return doc.file_name and doc.file_name.lower().endswith((".xlsx", ".xls"))
+    def _queued_notifier(self, message: Message, doc):
+        """Сообщение о позиции файла в справедливой очереди"""
+
+        async def notify_queued(position: int):
+            try:
+                await self.send_queue.send(
+                    message.chat.id,
+                    lambda: message.reply(
+                        f"⏳ {doc.file_name}\nВ очереди, позиция {position}"
+                    ),
+                )
+            except SendError as e:
+                logger.warning("Не удалось отправить позицию в очереди: %s", e)
+
+        return notify_queued
+
+    @staticmethod
+    def _file_prefix(message: Message) -> str:
+        """
+        Префикс временных файлов документа. Один и тот же файл, отправленный
+        дважды, приходит с тем же file_unique_id, но в другом сообщении
+        """
+        doc = message.document
+        return f"{message.from_user.id}_{message.message_id}_{doc.file_unique_id}_"
 
     async def _process_file(
-        self, message: Message, doc, temp_input: Path, user_id: int
+        self,
+        message: Message,
+        doc,
+        temp_input: Path,
+        user_id: int,
+        ticket: int,
+        in_archive: bool = False,
     ):
         """Обработка файла"""
-        # Скачивание файла
-        file = await self.bot.get_file(doc.file_id)
-        await self.bot.download_file(file.file_path, temp_input)
-
-        # Обработка через FileProcessor
-        temp_output, article = FileProcessor.process_file(
-            input_file_path=temp_input,
-            output_dir=self.temp_dir,
-            filename=doc.file_name,
+        # Поиск штрихкода до скачивания: неизвестный артикул не тратит трафик
+        with metrics.stage("lookup"):
+            article, barcode = FileProcessor.find_barcode(doc.file_name)
+
+        # Тот же файл с тем же справочником уже обрабатывался — отправляем
+        # ранее загруженный результат по file_id
+        cache_key = ResultCache.make_key(
+            doc.file_unique_id, article, ReferenceBook.get_version()
         )
+        caption = f"✅ {doc.file_name}\nАртикул: {article}"
+        # В архив нужен сам файл результата, а не file_id из кэша; при
+        # проверке кодов нужны сами коды — для сверки с другими файлами
+        use_cache = not in_archive and not self.code_pattern
+        if use_cache and (cached := self.result_cache.get(cache_key)):
+            await self.reply_order.wait(user_id, ticket)
+            try:
+                await self.send_queue.send(
+                    message.chat.id,
+                    lambda: message.reply_document(cached["file_id"], caption=caption),
+                )
+            except SendError as e:
+                self._delivery_failed(doc, user_id, e, None, None)
+                return
+            metrics.count_file("cached")
+            self.batch_manager.add_result(
+                user_id,
+                {"success": True, "filename": doc.file_name, "article": article},
+            )
+            return
 
-        # Отправка результата
-        await message.reply_document(
-            FSInputFile(temp_output), caption=f"✅ {doc.file_name}\nАртикул: {article}"
+        # Скачивание и обработка — в порядке справедливой очереди
+        documents, temp_input, temp_outputs, check = await self._in_lane(
+            message,
+            doc,
+            user_id,
+            lambda: self._download(doc, temp_input, to_disk=in_archive),
+            lambda source: self._convert(
+                doc, source, self._file_prefix(message), barcode
+            ),
         )
+        summary = await self._check_summary(user_id, check)
+        if summary:
+            caption += CodeValidator.describe(check, summary["batch_duplicates"])
+
+        if in_archive:
+            # Результат ждет конца пакета; порядок в архиве — порядок отправки
+            await self.reply_order.wait(user_id, ticket)
+            metrics.count_file("success")
+            self.batch_manager.add_result(
+                user_id,
+                {
+                    "success": True,
+                    "filename": doc.file_name,
+                    "article": article,
+                    "result_paths": temp_outputs,
+                    "temp_input": temp_input,
+                    "in_archive": True,
+                    "check": summary,
+                },
+            )
+            return
+
+        # Отправка вне очереди обработки: медленная загрузка не занимает
+        # место, а результат уходит после ответов на предыдущие файлы
+        await self.reply_order.wait(user_id, ticket)
+        try:
+            with metrics.stage("reply"):
+                sent = await self._reply_parts(message, documents, caption)
+        except SendError as e:
+            self._delivery_failed(doc, user_id, e, temp_input, temp_outputs)
+            return
+        metrics.count_file("success")
+        # В кэше один file_id: результаты из нескольких частей не кэшируются
+        if len(documents) == 1 and sent.document:
+            self.result_cache.put(
+                cache_key, sent.document.file_id, sent.document.file_size or 0
+            )
 
         logger.info("Файл %s успешно обработан (артикул: %s)", doc.file_name, article)
 
@@ -73,18 +249,468 @@ class DocumentHandler:
                 "success": True,
                 "filename": doc.file_name,
                 "article": article,
-                "result_path": temp_output,
+                "result_paths": temp_outputs,
+                "temp_input": temp_input,
+                "check": summary,
+            },
+        )
+
+    async def _check_summary(
+        self, user_id: int, check: CodeCheck | None
+    ) -> dict | None:
+        """
+        Итоги проверки кодов файла для сводки пакета; коды файла сверяются
+        с уже обработанными файлами пакета
+        """
+        if check is None:
+            return None
+        batch_duplicates = await self.batch_manager.count_batch_duplicates(
+            user_id, check.hashes
+        )
+        return {
+            "codes": check.codes,
+            "invalid": check.invalid,
+            "duplicates": check.duplicates,
+            "batch_duplicates": batch_duplicates,
+        }
+
+    async def _reply_parts(self, message: Message, documents: list, caption: str):
+        """
+        Отправка результата по частям в порядке номеров.
+
+        Returns:
+            Message: Ответ с последней частью
+        """
+        for part, document in enumerate(documents, start=1):
+            if len(documents) > 1:
+                part_caption = f"{caption}\nЧасть {part} из {len(documents)}"
+            else:
+                part_caption = caption
+            sent = await self.send_queue.send(
+                message.chat.id,
+                partial(message.reply_document, document, caption=part_caption),
+            )
+        return sent
+
+    async def _process_archive(
+        self, message: Message, doc, temp_input: Path, user_id: int, ticket: int
+    ):
+        """
+        Обработка zip-архива таблиц: файлы архива обрабатываются параллельно
+        в пуле воркеров, результаты и отчет об ошибках уходят одним архивом
+        """
+        prefix = self._file_prefix(message)
+        archive_name = ArchiveProcessor.archive_filename(doc.file_name)
+        archive_path = self.temp_dir / f"{prefix}{archive_name}"
+
+        # Распакованные файлы, в том числе не дошедшие до обработки
+        extracted: list[tuple[str, Path]] = []
+
+        async def prepare():
+            with metrics.stage("get_file"):
+                file = await self.bot.get_file(doc.file_id)
+            with metrics.stage("download"):
+                await self.bot.download_file(file.file_path, temp_input)
+
+            # Оглавление архива проверяется до распаковки, файлы архива —
+            # до обработки: тяжелый файл делает тяжелым весь архив
+            slow = await asyncio.to_thread(self.preflight.inspect, temp_input)
+            entries, errors = await asyncio.to_thread(
+                ArchiveProcessor.extract,
+                temp_input,
+                self.temp_dir,
+                prefix,
+                self.archive_max_files,
+            )
+            extracted.extend(entries)
+            accepted, heavy = await asyncio.to_thread(
+                self._inspect_entries, entries, errors
+            )
+            return (accepted, errors), slow or heavy
+
+        async def convert(prepared):
+            entries, errors = prepared
+            # Файлов архива в пуле одновременно не больше, чем воркеров:
+            # остальные ждут здесь и не переполняют общую очередь пула
+            limit = asyncio.Semaphore(self.worker_pool.max_workers)
+            outcomes = await asyncio.gather(
+                *(
+                    self._convert_entry(name, path, f"{prefix}{i}_", limit, user_id)
+                    for i, (name, path) in enumerate(entries)
+                ),
+                return_exceptions=True,
+            )
+
+            results = []
+            checks = []
+            succeeded = 0
+            for (name, _), outcome in zip(entries, outcomes):
+                if isinstance(outcome, Exception):
+                    errors.append((name, str(outcome)))
+                else:
+                    succeeded += 1
+                    outputs, summary = outcome
+                    results.extend(outputs)
+                    if summary:
+                        checks.append(summary)
+            try:
+                await asyncio.to_thread(
+                    ArchiveProcessor.write_archive, archive_path, results, errors
+                )
+            finally:
+                for _, output_path in results:
+                    output_path.unlink(missing_ok=True)
+            return succeeded, errors, checks
+
+        try:
+            succeeded, errors, checks = await self._in_lane(
+                message, doc, user_id, prepare, convert
+            )
+        finally:
+            for _, path in extracted:
+                path.unlink(missing_ok=True)
+
+        caption = f"📦 {doc.file_name}\n✅ Успешно: {succeeded}"
+        if errors:
+            caption += f"\n❌ С ошибками: {len(errors)}"
+        if checks:
+            total = CodeCheck(
+                sum(c["codes"] for c in checks),
+                sum(c["invalid"] for c in checks),
+                sum(c["duplicates"] for c in checks),
+                None,
+            )
+            caption += CodeValidator.describe(
+                total, sum(c["batch_duplicates"] for c in checks)
+            )
+        document = FSInputFile(archive_path, filename=archive_name)
+
+        await self.reply_order.wait(user_id, ticket)
+        try:
+            with metrics.stage("reply"):
+                await self.send_queue.send(
+                    message.chat.id,
+                    lambda: message.reply_document(document, caption=caption),
+                )
+        except SendError as e:
+            self._delivery_failed(doc, user_id, e, temp_input, [archive_path])
+            return
+        metrics.count_file("success")
+
+        logger.info(
+            "Архив %s обработан: %s файлов, ошибок: %s",
+            doc.file_name,
+            succeeded,
+            len(errors),
+        )
+        self.batch_manager.add_result(
+            user_id,
+            {
+                "success": True,
+                "filename": doc.file_name,
+                "result_paths": [archive_path],
+                "temp_input": temp_input,
+            },
+        )
+
+    async def _convert_entry(
+        self,
+        name: str,
+        path: Path,
+        output_prefix: str,
+        limit: asyncio.Semaphore,
+        user_id: int,
+    ) -> tuple[list[tuple[str, Path]], dict | None]:
+        """
+        Обработка одного файла из архива.
+
+        Returns:
+            tuple: ([(имя в архиве, путь) для каждой части результата],
+                итоги проверки кодов или None)
+        """
+        try:
+            article, barcode = FileProcessor.find_barcode(name)
+            async with limit:
+                output_paths, article, stats = await self.worker_pool.submit(
+                    FileProcessor.process_file,
+                    path,
+                    self.temp_dir,
+                    name,
+                    barcode,
+                    output_prefix,
+                    metrics.enabled,
+                    self.result_max_rows,
+                    self.result_max_bytes,
+                    self.code_pattern,
+                )
+            summary = await self._check_summary(user_id, stats.pop("check", None))
+            metrics.observe_stats(stats)
+            names = FileProcessor.result_filenames(article, len(output_paths))
+            return list(zip(names, output_paths)), summary
+        finally:
+            path.unlink(missing_ok=True)
+
+    async def _enqueue(self, message: Message, doc, user_id: int):
+        """
+        Запись документа задачей в JobQueue.
+
+        Ошибки и попадания в кэш тоже записываются задачами (сразу готовыми
+        к отправке), чтобы ответы шли в порядке отправки файлов.
+        """
+        job = {
+            "user_id": user_id,
+            "chat_id": message.chat.id,
+            "message_id": message.message_id,
+            "file_unique_id": doc.file_unique_id,
+            "file_name": doc.file_name,
+        }
+        status = PENDING
+        ticket = self.reply_order.take(user_id)
+        try:
+            try:
+                article, barcode = FileProcessor.find_barcode(doc.file_name)
+                version = ReferenceBook.get_version()
+                job.update(article=article, barcode=barcode, reference_version=version)
+
+                # В режиме архива нужен сам файл результата, а не file_id из
+                # кэша; при проверке кодов — итоги проверки от воркера
+                cache_key = ResultCache.make_key(doc.file_unique_id, article, version)
+                in_archive = self.batch_manager.is_archive_mode(user_id)
+                use_cache = not in_archive and not self.code_pattern
+                if use_cache and (cached := self.result_cache.get(cache_key)):
+                    job["result_file_id"] = cached["file_id"]
+                    status = DONE
+                else:
+                    inputs_dir = self.jobs_dir / "inputs"
+                    inputs_dir.mkdir(parents=True, exist_ok=True)
+                    input_path = (
+                        inputs_dir / f"{self._file_prefix(message)}{doc.file_name}"
+                    )
+                    # Медленной очереди у воркеров нет: проверка только
+                    # отклоняет файлы сверх пределов
+                    self.preflight.check_size(doc.file_size)
+                    with metrics.stage("get_file"):
+                        file = await self.bot.get_file(doc.file_id)
+                    with metrics.stage("download"):
+                        await self.bot.download_file(file.file_path, input_path)
+                    try:
+                        await asyncio.to_thread(self.preflight.inspect, input_path)
+                    except ValueError:
+                        input_path.unlink(missing_ok=True)
+                        raise
+                    job["input_path"] = str(input_path)
+            except Exception as e:  # noqa: BLE001
+                logger.error("Ошибка приема файла %s: %s", doc.file_name, e)
+                metrics.count_error(e)
+                status = FAILED
+                job["error"] = str(e)
+
+            # Номера задач пользователя идут в порядке отправки файлов,
+            # а не в порядке окончания скачивания
+            await self.reply_order.wait(user_id, ticket)
+            job_id = await asyncio.to_thread(self.job_queue.add, status, **job)
+        finally:
+            self.reply_order.done(user_id, ticket)
+
+        if status == PENDING:
+            logger.info("Файл %s поставлен в очередь, задача %s", doc.file_name, job_id)
+
+    def _inspect_entries(
+        self, entries: list[tuple[str, Path]], errors: list[tuple[str, str]]
+    ) -> tuple[list[tuple[str, Path]], bool]:
+        """
+        Предварительная проверка файлов архива; отклоненные файлы
+        удаляются и попадают в отчет об ошибках.
+
+        Returns:
+            tuple: (принятые файлы, среди них есть тяжелые)
+        """
+        accepted = []
+        slow = False
+        for name, path in entries:
+            try:
+                slow = self.preflight.inspect(path) or slow
+            except PreflightError as e:
+                errors.append((name, str(e)))
+                path.unlink(missing_ok=True)
+                continue
+            accepted.append((name, path))
+        return accepted, slow
+
+    async def _in_lane(
+        self,
+        message: Message,
+        doc,
+        user_id: int,
+        prepare: Callable[[], Awaitable[tuple[Any, bool]]],
+        convert: Callable[[Any], Awaitable[Any]],
+    ):
+        """
+        Скачивание и обработка файла в справедливой очереди, тяжелого —
+        еще и в медленной.
+
+        prepare() скачивает и проверяет файл, возвращая (скачанное, файл
+        тяжелый); convert(скачанное) обрабатывает его. Место в медленной
+        очереди занимается до места в справедливой: ожидающий тяжелый файл
+        не держит место, нужное обычным файлам. Если файл оказался тяжелым
+        только после скачивания, место в справедливой очереди на время
+        ожидания освобождается.
+        """
+        slow = self.preflight.check_size(doc.file_size)
+        notify_queued = self._queued_notifier(message, doc)
+        async with (
+            self._slow_lane(message, doc, slow),
+            self.scheduler.slot(user_id, on_queued=notify_queued),
+        ):
+            prepared, heavy = await prepare()
+            if slow or not heavy:
+                return await convert(prepared)
+
+        async with self._slow_lane(message, doc, True), self.scheduler.slot(user_id):
+            return await convert(prepared)
+
+    async def _download(self, doc, temp_input: Path, to_disk: bool = False):
+        """
+        Скачивание файла и предварительная проверка: файлы сверх пределов
+        отклоняются с PreflightError.
+
+        to_disk — результат нужен файлом на диске, даже для небольших файлов.
+
+        Returns:
+            tuple: (BytesIO небольшого файла или путь к файлу на диске,
+                файл тяжелый)
+        """
+        with metrics.stage("get_file"):
+            file = await self.bot.get_file(doc.file_id)
+
+        if (
+            not to_disk
+            and doc.file_size is not None
+            and doc.file_size <= self.in_memory_max_bytes
+        ):
+            # Небольшие файлы: скачивание, обработка и отправка в памяти
+            with metrics.stage("download"):
+                source = await self.bot.download_file(file.file_path)
+        else:
+            # Большие файлы обрабатываются через временные файлы на диске
+            with metrics.stage("download"):
+                await self.bot.download_file(file.file_path, temp_input)
+            source = temp_input
+        return source, await asyncio.to_thread(self.preflight.inspect, source)
+
+    async def _convert(self, doc, source, output_prefix: str, barcode: str):
+        """
+        Обработка скачанного файла в пуле воркеров.
+
+        Returns:
+            tuple: (части результата для отправки, временный входной файл,
+                пути к частям результата, итоги проверки кодов) — временных
+                файлов нет при обработке в памяти, проверки — без code_pattern
+        """
+        if not isinstance(source, Path):
+            parts, article, stats = await self.worker_pool.submit(
+                FileProcessor.process_bytes,
+                source.getvalue(),
+                doc.file_name,
+                barcode,
+                metrics.enabled,
+                self.result_max_rows,
+                self.result_max_bytes,
+                self.code_pattern,
+            )
+            names = FileProcessor.result_filenames(article, len(parts))
+            documents = [
+                BufferedInputFile(data, filename=name)
+                for data, name in zip(parts, names)
+            ]
+            temp_input = temp_outputs = None
+        else:
+            temp_outputs, article, stats = await self.worker_pool.submit(
+                FileProcessor.process_file,
+                source,
+                self.temp_dir,
+                doc.file_name,
+                barcode,
+                output_prefix,
+                metrics.enabled,
+                self.result_max_rows,
+                self.result_max_bytes,
+                self.code_pattern,
+            )
+            names = FileProcessor.result_filenames(article, len(temp_outputs))
+            documents = [
+                FSInputFile(path, filename=name)
+                for path, name in zip(temp_outputs, names)
+            ]
+            temp_input = source
+
+        # Замеры этапов и итоги проверки приходят из воркера с результатом
+        check = stats.pop("check", None)
+        metrics.observe_stats(stats)
+        return documents, temp_input, temp_outputs, check
+
+    @asynccontextmanager
+    async def _slow_lane(self, message: Message, doc, slow: bool):
+        """Место в медленной очереди для тяжелого файла (с сообщением)"""
+        if not slow:
+            yield
+            return
+
+        logger.info("Файл %s обрабатывается в медленной очереди", doc.file_name)
+        try:
+            await self.send_queue.send(
+                message.chat.id,
+                lambda: message.reply(
+                    f"🐢 {doc.file_name}\nБольшой файл: обработка займет больше времени"
+                ),
+            )
+        except SendError as e:
+            logger.warning("Не удалось сообщить о медленной очереди: %s", e)
+        async with self.slow_lane:
+            yield
+
+    def _delivery_failed(
+        self,
+        doc,
+        user_id: int,
+        error: SendError,
+        temp_input: Path | None,
+        temp_outputs: list[Path] | None,
+    ):
+        """Файл обработан, но результат не доставлен — это не ошибка обработки"""
+        logger.error("Не удалось отправить результат %s: %s", doc.file_name, error)
+        metrics.count_file("undelivered")
+        self.batch_manager.add_result(
+            user_id,
+            {
+                "success": False,
+                "filename": doc.file_name,
+                "error": str(error),
+                "result_paths": temp_outputs,
                 "temp_input": temp_input,
             },
         )
 
     async def _handle_error(
-        self, message: Message, doc, temp_input: Path, user_id: int, error: str
+        self,
+        message: Message,
+        doc,
+        temp_input: Path,
+        user_id: int,
+        error: str,
+        in_archive: bool = False,
     ):
-        """Обработка ошибки"""
+        """Обработка ошибки (в режиме архива — только в отчет архива)"""
         logger.error("Ошибка обработки файла %s: %s", doc.file_name, error)
 
-        await message.reply(f"❌ {doc.file_name}\n{error}")
+        if not in_archive:
+            try:
+                await self.send_queue.send(
+                    message.chat.id,
+                    lambda: message.reply(f"❌ {doc.file_name}\n{error}"),
+                )
+            except SendError as e:
+                logger.error("Не удалось сообщить об ошибке %s: %s", doc.file_name, e)
 
         self.batch_manager.add_result(
             user_id,
@@ -93,5 +719,6 @@ class DocumentHandler:
                 "filename": doc.file_name or "unknown",
                 "error": error,
                 "temp_input": temp_input,
+                "in_archive": in_archive,
             },
         )
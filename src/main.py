@@ -1,62 +1,304 @@
-import logging
+# Отсчет времени запуска — до импорта тяжелых модулей
 import asyncio
+import logging
+import sys
 import tempfile
 from pathlib import Path
-from aiogram import F, Bot, Dispatcher, Router
-from aiogram.filters import Command
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
-from config import TOKEN, REFERENCE_BOOK_FILE_PATH
-from services.batch_manager import BatchManager
-from services.lifecycle import LifecycleManager
+
+from config import (
+    ADMIN_IDS,
+    ARCHIVE_MAX_FILES,
+    BOT_MODE,
+    CODE_PATTERN,
+    IN_MEMORY_MAX_BYTES,
+    JOB_POLL_INTERVAL,
+    JOB_QUEUE_PATH,
+    JOBS_DIR,
+    METRICS_HOST,
+    METRICS_PORT,
+    PREFLIGHT_MAX_CELLS,
+    PREFLIGHT_MAX_FILE_BYTES,
+    PREFLIGHT_MAX_RATIO,
+    PREFLIGHT_MAX_UNPACKED_BYTES,
+    PREFLIGHT_SLOW_BYTES,
+    PREFLIGHT_SLOW_CELLS,
+    PREFLIGHT_SLOW_WORKERS,
+    PROFILE_MAX_SECONDS,
+    PROFILE_SECONDS,
+    REFERENCE_BACKEND,
+    REFERENCE_BOOK_FILE_PATH,
+    REFERENCE_DEBOUNCE,
+    REFERENCE_POLL_INTERVAL,
+    REFERENCE_SNAPSHOT_PATH,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_SIZE,
+    RESULT_MAX_BYTES,
+    RESULT_MAX_ROWS,
+    SCHEDULER_MAX_ACTIVE,
+    SCHEDULER_PER_USER,
+    SCHEDULER_QUEUE_SIZE,
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GLOBAL_RATE,
+    SEND_MAX_ATTEMPTS,
+    TELEGRAM_API_URL,
+    TELEGRAM_CONNECTIONS,
+    TOKEN,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WORKER_JOB_TIMEOUT,
+    WORKER_POOL_MODE,
+    WORKER_POOL_SIZE,
+    WORKER_QUEUE_SIZE,
+)
 from handlers.command_handler import CommandHandler
 from handlers.document_handler import DocumentHandler
+from services.batch_manager import BatchManager
+from services.fair_scheduler import FairScheduler
+from services.job_queue import JobQueue
+from services.lifecycle import LifecycleManager
+from services.metrics import MetricsServer, metrics
+from services.preflight import Preflight
+from services.reference_book import ReferenceBook
+from services.reference_watcher import ReferenceWatcher
+from services.result_cache import ResultCache
+from services.result_publisher import ResultPublisher
+from services.send_queue import SendQueue
+from services.startup import startup
+from services.webhook_server import WebhookServer
+from services.worker_pool import WorkerPool
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
 logger = logging.getLogger(__name__)
+startup.mark("модули импортированы")
 
-bot = Bot(token=TOKEN)
 dp = Dispatcher()
-router = Router()
 
 REFERENCE_PATH = Path(REFERENCE_BOOK_FILE_PATH)
 TEMP_DIR = Path(tempfile.gettempdir()) / "tg_bot_files"
-TEMP_DIR.mkdir(parents=True, exist_ok=True)
+SNAPSHOT_PATH = (
+    Path(REFERENCE_SNAPSHOT_PATH)
+    if REFERENCE_SNAPSHOT_PATH
+    else TEMP_DIR.parent / "tg_bot_reference.snapshot"
+)
 
-batch_manager = BatchManager(bot)
-lifecycle_manager = LifecycleManager(bot, REFERENCE_PATH, TEMP_DIR, batch_manager)
-command_handler = CommandHandler()
-document_handler = DocumentHandler(bot, TEMP_DIR, batch_manager)
 
+def setup_bot() -> tuple[Bot, LifecycleManager]:
+    """
+    Создание бота и сервисов, регистрация обработчиков в dp.
 
-@router.message(Command("start"))
-async def start(message: Message):
-    """Команда /start"""
-    await command_handler.start(message)
+    Вызывается из main(), а не при импорте модуля: сервер forkserver пула
+    обработки импортирует этот модуль заново, и ему не нужны ни бот с
+    сессией, ни очереди и фоновые сервисы.
 
+    Returns:
+        tuple: (бот, менеджер жизненного цикла)
+    """
+    # Одна сессия с общим пулом соединений на все запросы бота
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(TELEGRAM_API_URL)
+        if TELEGRAM_API_URL
+        else PRODUCTION,
+        limit=TELEGRAM_CONNECTIONS,
+    )
+    bot = Bot(token=TOKEN, session=session)
+    router = Router()
 
-@router.message(F.document)
-async def handle_document(message: Message):
-    """Обработка документов"""
-    await document_handler.handle_document(message)
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    ReferenceBook.configure(backend=REFERENCE_BACKEND)
 
+    send_queue = SendQueue(
+        chat_rate=SEND_CHAT_RATE,
+        chat_burst=SEND_CHAT_BURST,
+        global_rate=SEND_GLOBAL_RATE,
+        max_attempts=SEND_MAX_ATTEMPTS,
+    )
+    batch_manager = BatchManager(bot, send_queue, temp_dir=TEMP_DIR)
+    worker_pool = WorkerPool(
+        max_workers=WORKER_POOL_SIZE,
+        max_queue=WORKER_QUEUE_SIZE,
+        job_timeout=WORKER_JOB_TIMEOUT,
+        use_processes=WORKER_POOL_MODE != "thread",
+    )
+    scheduler = FairScheduler(
+        max_active=SCHEDULER_MAX_ACTIVE,
+        per_user_limit=SCHEDULER_PER_USER,
+        max_waiting=SCHEDULER_QUEUE_SIZE,
+    )
+    reference_watcher = ReferenceWatcher(
+        REFERENCE_PATH,
+        SNAPSHOT_PATH,
+        poll_interval=REFERENCE_POLL_INTERVAL,
+        debounce=REFERENCE_DEBOUNCE,
+    )
+    result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_MAX_BYTES)
+
+    # Надежная очередь: документы обрабатывают отдельные процессы worker.py
+    job_queue = JobQueue(Path(JOB_QUEUE_PATH)) if JOB_QUEUE_PATH else None
+    result_publisher = (
+        ResultPublisher(
+            bot,
+            job_queue,
+            send_queue,
+            batch_manager,
+            result_cache,
+            poll_interval=JOB_POLL_INTERVAL,
+        )
+        if job_queue
+        else None
+    )
+
+    metrics_server = None
+    if METRICS_PORT:
+        metrics.enable()
+        metrics.gauge(
+            "tg_bot_queue_depth",
+            "Jobs waiting for a free worker",
+            lambda: worker_pool.queue_depth,
+        )
+        metrics.gauge(
+            "tg_bot_scheduler_waiting",
+            "Files waiting in the per-user fair queue",
+            lambda: scheduler.waiting,
+        )
+        metrics.gauge(
+            "tg_bot_scheduler_active",
+            "Files being downloaded, processed or sent",
+            lambda: scheduler.active,
+        )
+        metrics.gauge(
+            "tg_bot_reference_size",
+            "Articles in the reference book",
+            ReferenceBook.get_cache_size,
+        )
+        metrics.gauge(
+            "tg_bot_reference_age_seconds",
+            "Seconds since the reference book was loaded",
+            ReferenceBook.get_age_seconds,
+        )
+        metrics.gauge(
+            "tg_bot_batch_states",
+            "Users with an open batch",
+            lambda: len(batch_manager.user_state),
+        )
+        if job_queue:
+            metrics.gauge(
+                "tg_bot_jobs_pending",
+                "Jobs in the durable queue waiting for a worker",
+                lambda: job_queue.counts().get("pending", 0),
+            )
+        metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT)
+
+    lifecycle_manager = LifecycleManager(
+        bot,
+        REFERENCE_PATH,
+        TEMP_DIR,
+        batch_manager,
+        worker_pool,
+        reference_watcher,
+        SNAPSHOT_PATH,
+        webhook_url=(
+            f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}"
+            if BOT_MODE == "webhook" and WEBHOOK_URL
+            else None
+        ),
+        webhook_secret=WEBHOOK_SECRET,
+        metrics_server=metrics_server,
+        result_publisher=result_publisher,
+    )
+    command_handler = CommandHandler(
+        batch_manager, send_queue, ADMIN_IDS, PROFILE_SECONDS, PROFILE_MAX_SECONDS
+    )
+    document_handler = DocumentHandler(
+        bot,
+        TEMP_DIR,
+        batch_manager,
+        worker_pool,
+        result_cache,
+        scheduler,
+        send_queue,
+        IN_MEMORY_MAX_BYTES,
+        job_queue=job_queue,
+        jobs_dir=Path(JOBS_DIR),
+        archive_max_files=ARCHIVE_MAX_FILES,
+        result_max_rows=RESULT_MAX_ROWS,
+        result_max_bytes=RESULT_MAX_BYTES,
+        code_pattern=CODE_PATTERN or None,
+        preflight=Preflight(
+            PREFLIGHT_MAX_FILE_BYTES,
+            PREFLIGHT_MAX_UNPACKED_BYTES,
+            PREFLIGHT_MAX_RATIO,
+            PREFLIGHT_MAX_CELLS,
+            PREFLIGHT_SLOW_BYTES,
+            PREFLIGHT_SLOW_CELLS,
+        ),
+        slow_lane_size=PREFLIGHT_SLOW_WORKERS,
+    )
+
+    @router.message(Command("start"))
+    async def start(message: Message):
+        """Команда /start"""
+        await command_handler.start(message)
+
+    @router.message(Command("archive"))
+    async def archive(message: Message):
+        """Команда /archive"""
+        await command_handler.archive(message)
+
+    @router.message(Command("profile"))
+    async def profile(message: Message, command: CommandObject):
+        """Команда /profile [секунды]"""
+        await command_handler.profile(message, command.args)
+
+    @router.message(F.document)
+    async def handle_document(message: Message):
+        """Обработка документов"""
+        await document_handler.handle_document(message)
 
-async def main():
-    """Главная функция запуска бота"""
     dp.startup.register(lifecycle_manager.on_startup)
     dp.shutdown.register(lifecycle_manager.on_shutdown)
     dp.include_router(router)
+    return bot, lifecycle_manager
 
-    logger.info("Бот запущен и готов к работе")
 
-    try:
-        await dp.start_polling(bot)
-    except (KeyboardInterrupt, SystemExit):
-        logger.info("Получен сигнал остановки")
-    except asyncio.CancelledError:
-        logger.info("Polling отменен")
+async def main():
+    """Главная функция запуска бота"""
+    bot, lifecycle_manager = setup_bot()
+
+    if BOT_MODE == "webhook":
+        logger.info("Бот запущен в режиме webhook")
+        server = WebhookServer(
+            dp, bot, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+        )
+        lifecycle_manager.stop_bot = server.stop
+        await server.run()
+    else:
+        logger.info("Бот запущен и готов к работе")
+        lifecycle_manager.stop_bot = dp.stop_polling
+        try:
+            # Webhook, оставшийся от запуска в другом режиме, мешает getUpdates
+            await bot.delete_webhook(drop_pending_updates=False)
+            await dp.start_polling(bot)
+        except (KeyboardInterrupt, SystemExit):
+            logger.info("Получен сигнал остановки")
+        except asyncio.CancelledError:
+            logger.info("Polling отменен")
+
+    # Справочник не загрузился: бот остановлен, процесс завершается с ошибкой
+    if lifecycle_manager.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+import posixpath
+import shutil
+import zipfile
+from collections.abc import Iterable
+from pathlib import Path
+
+from services.file_processor import FileProcessor
+
+# Отчет об ошибках внутри архива с результатами
+ERRORS_REPORT = "errors.txt"
+
+
+class ArchiveProcessor:
+    """Zip-архивы: распаковка входных таблиц и упаковка результатов"""
+
+    @staticmethod
+    def is_archive(filename: str) -> bool:
+        return bool(filename) and filename.lower().endswith(".zip")
+
+    @staticmethod
+    def archive_filename(filename: str) -> str:
+        """Имя архива с результатами для входного архива filename"""
+        return f"codes_{Path(filename).stem}.zip"
+
+    @staticmethod
+    def _entry_name(info: zipfile.ZipInfo) -> str:
+        """
+        Имя файла в архиве без каталогов. Архиватор Windows пишет имена
+        в кодировке cp866 без флага UTF-8, zipfile читает их как cp437
+        """
+        name = info.filename
+        if not info.flag_bits & 0x800:
+            try:
+                name = name.encode("cp437").decode("cp866")
+            except UnicodeError:
+                pass
+        return Path(name).name
+
+    @classmethod
+    def extract(
+        cls, archive_path: Path, target_dir: Path, prefix: str, max_files: int
+    ) -> tuple[list[tuple[str, Path]], list[tuple[str, str]]]:
+        """
+        Распаковывает таблицы из архива в target_dir.
+
+        Каталоги, служебные файлы macOS и скрытые файлы пропускаются,
+        файлы других форматов попадают в список ошибок.
+
+        Returns:
+            tuple: ([(имя файла, путь к распакованному файлу)],
+                [(имя файла, ошибка)])
+
+        Raises:
+            ValueError: Если файл не zip-архив, в нем нет таблиц
+                или таблиц больше max_files
+        """
+        entries: list[tuple[str, Path]] = []
+        errors: list[tuple[str, str]] = []
+        try:
+            archive = zipfile.ZipFile(archive_path)
+        except zipfile.BadZipFile:
+            raise ValueError("Файл не является zip-архивом") from None
+
+        try:
+            with archive:
+                for info in archive.infolist():
+                    name = cls._entry_name(info)
+                    if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                        continue
+                    if not name or name.startswith((".", "~$")):
+                        continue
+                    if not FileProcessor.is_supported(name):
+                        errors.append((name, "Неподдерживаемый формат файла"))
+                        continue
+                    if len(entries) >= max_files:
+                        raise ValueError(
+                            f"В архиве больше {max_files} таблиц, "
+                            "разделите его на части"
+                        )
+
+                    path = target_dir / f"{prefix}{len(entries)}_{name}"
+                    entries.append((name, path))
+                    with archive.open(info) as source, open(path, "wb") as target:
+                        shutil.copyfileobj(source, target, 1 << 20)
+        except BaseException:
+            # Уже распакованные файлы не нужны
+            for _, path in entries:
+                path.unlink(missing_ok=True)
+            raise
+
+        if not entries:
+            raise ValueError("В архиве нет таблиц .xlsx, .xls, .ods или .csv")
+        return entries, errors
+
+    @staticmethod
+    def write_archive(
+        output_path: Path,
+        results: Iterable[tuple[str, Path]],
+        errors: Iterable[tuple[str, str]],
+    ) -> int:
+        """
+        Упаковывает результаты и отчет об ошибках в zip.
+
+        Args:
+            output_path: Путь к создаваемому архиву
+            results: (имя в архиве, путь к результату); повторяющиеся имена
+                получают суффикс _2, _3, ...
+            errors: (имя входного файла, ошибка) для отчета errors.txt,
+                отчет не создается, если ошибок нет
+
+        Returns:
+            int: Количество результатов в архиве
+        """
+        names: set[str] = set()
+        count = 0
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, path in results:
+                stem, suffix = posixpath.splitext(name)
+                number = 1
+                while name in names:
+                    number += 1
+                    name = f"{stem}_{number}{suffix}"
+                names.add(name)
+                # xlsx уже сжат: повторное сжатие тратит время без выигрыша
+                archive.write(path, name, compress_type=zipfile.ZIP_STORED)
+                count += 1
+
+            report = "".join(f"{filename}: {error}\n" for filename, error in errors)
+            if report:
+                archive.writestr(ERRORS_REPORT, report)
+        return count
@@ -1,105 +1,276 @@
 import asyncio
+import heapq
 import logging
+import tempfile
+from datetime import datetime
 from pathlib import Path
-from datetime import datetime, timedelta
-from collections import defaultdict
-from typing import Dict, List, Any
+from typing import Any
+
 from aiogram import Bot
+from aiogram.types import FSInputFile
+
+from services.archive_processor import ArchiveProcessor
+from services.file_processor import FileProcessor
+from services.send_queue import SendQueue
 
 logger = logging.getLogger(__name__)
 
+# Пауза после последнего файла, после которой пакет считается завершенным
+BATCH_DELAY = 3.1
+# Состояние без запланированной сводки удаляется через этот срок
+STALE_AFTER = 3600.0
+
+
+class _UserBatch:
+    """Состояние пакета одного пользователя"""
+
+    __slots__ = ("chat_id", "code_hashes", "deadline", "results")
+
+    def __init__(self):
+        self.results: list[dict[str, Any]] = []
+        self.chat_id: int | None = None
+        self.deadline = 0.0
+        # Хэши кодов уже обработанных файлов пакета (при проверке кодов)
+        self.code_hashes: set[int] = set()
+
 
 class BatchManager:
-    """Менеджер пакетной обработки файлов"""
+    """
+    Менеджер пакетной обработки файлов.
+
+    Сроки всех пакетов хранятся в одной куче, которую разбирает единственный
+    цикл планировщика: новый файл только сдвигает срок пакета, не создавая
+    задач и таймеров. Устаревшие записи кучи отбрасываются при извлечении.
+
+    При проверке кодов пакет хранит хэши кодов своих файлов:
+    count_batch_duplicates находит коды, которые уже были в других файлах.
 
-    def __init__(self, bot: Bot):
+    Пользователи в режиме архива (set_archive_mode) получают результаты
+    пакета одним zip-архивом вместо отдельных документов: такие результаты
+    добавляются с флагом in_archive и упаковываются при отправке сводки.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        send_queue: SendQueue | None = None,
+        delay: float = BATCH_DELAY,
+        stale_after: float = STALE_AFTER,
+        temp_dir: Path | None = None,
+    ):
         self.bot = bot
-        self.user_state: Dict[int, Dict[str, Any]] = defaultdict(
-            lambda: {
-                "results": [],
-                "timer": None,
-                "chat_id": None,
-                "last_activity": datetime.now(),
-            }
-        )
-
-    def add_result(self, user_id: int, result: Dict[str, Any]):
+        self.send_queue = send_queue or SendQueue()
+        self.delay = delay
+        self.stale_after = stale_after
+        self.temp_dir = temp_dir or Path(tempfile.gettempdir())
+        self.user_state: dict[int, _UserBatch] = {}
+        self.archive_users: set[int] = set()
+        self._deadlines: list[tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._scheduler: asyncio.Task | None = None
+        self._sending: set[asyncio.Task] = set()
+        self._hashes_lock = asyncio.Lock()
+
+    def _state(self, user_id: int) -> _UserBatch:
+        state = self.user_state.get(user_id)
+        if state is None:
+            state = self.user_state[user_id] = _UserBatch()
+        return state
+
+    def _set_deadline(self, user_id: int, state: _UserBatch, delay: float):
+        state.deadline = asyncio.get_running_loop().time() + delay
+        if not self._deadlines or state.deadline < self._deadlines[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._deadlines, (state.deadline, user_id))
+        if len(self._deadlines) > 2 * len(self.user_state) + 64:
+            self._compact()
+        self.start()
+
+    def _compact(self):
+        """Пересборка кучи без устаревших записей"""
+        self._deadlines = [
+            (state.deadline, user_id) for user_id, state in self.user_state.items()
+        ]
+        heapq.heapify(self._deadlines)
+
+    def set_archive_mode(self, user_id: int, enabled: bool):
+        """Включение и выключение режима архива для пользователя"""
+        if enabled:
+            self.archive_users.add(user_id)
+        else:
+            self.archive_users.discard(user_id)
+
+    def is_archive_mode(self, user_id: int) -> bool:
+        return user_id in self.archive_users
+
+    def add_result(self, user_id: int, result: dict[str, Any]):
         """Добавить результат обработки файла"""
-        state = self.user_state[user_id]
-        state["results"].append(result)
-        state["last_activity"] = datetime.now()
+        state = self._state(user_id)
+        state.results.append(result)
+        if not state.deadline:
+            # Сводка еще не запланирована: без нее состояние уйдет по сроку
+            self._set_deadline(user_id, state, self.stale_after)
+
+    async def count_batch_duplicates(self, user_id: int, hashes) -> int:
+        """
+        Сколько кодов файла уже встречались в других файлах пакета;
+        хэши кодов файла (уникальные, numpy uint64) добавляются к пакету
+        """
+        state = self._state(user_id)
+        # Сверка и пополнение множества — одним шагом на файл, в потоке:
+        # на миллионе кодов это доли секунды, которые не должны стоять в цикле
+        async with self._hashes_lock:
+            return await asyncio.to_thread(
+                self._merge_hashes, state.code_hashes, hashes
+            )
+
+    @staticmethod
+    def _merge_hashes(seen: set[int], hashes) -> int:
+        values = hashes.tolist()
+        duplicates = len(seen.intersection(values)) if seen else 0
+        seen.update(values)
+        return duplicates
 
     async def schedule_batch(self, user_id: int, chat_id: int):
         """Запланировать отправку итогового сообщения через 3 секунды"""
-        state = self.user_state[user_id]
-        state["chat_id"] = chat_id
+        state = self._state(user_id)
+        state.chat_id = chat_id
+        self._set_deadline(user_id, state, self.delay)
 
-        if state["timer"]:
-            state["timer"].cancel()
+    def start(self):
+        """Запуск цикла планировщика (повторный вызов ничего не делает)"""
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self.run())
 
-        async def send_summary():
-            await asyncio.sleep(3.1)
-            await self._send_batch_summary(user_id)
+    def stop(self):
+        """Остановка планировщика; неотправленные сводки отбрасываются"""
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            self._scheduler = None
 
-        task = asyncio.create_task(send_summary())
-        state["timer"] = task
+    async def run(self):
+        """Цикл планировщика: отправка сводок по истечении сроков пакетов"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
 
-    async def _send_batch_summary(self, user_id: int):
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, user_id = heapq.heappop(self._deadlines)
+                state = self.user_state.get(user_id)
+                # Срок пакета сдвинут более поздним файлом — запись устарела
+                if state is None or state.deadline != deadline:
+                    continue
+                del self.user_state[user_id]
+                self._dispatch(user_id, state)
+
+            timeout = self._deadlines[0][0] - now if self._deadlines else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    def _dispatch(self, user_id: int, state: _UserBatch):
+        """Отправка сводки отдельной задачей, чтобы не задерживать планировщик"""
+        if state.chat_id is None:
+            logger.info("Очистка устаревших данных пользователя %s", user_id)
+            self._cleanup_files(state.results)
+            return
+        task = asyncio.create_task(self._send_batch_summary(user_id, state))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send_batch_summary(self, user_id: int, state: _UserBatch):
         """Отправка итогового сообщения о пакете файлов"""
-        state = self.user_state[user_id]
-        results = state["results"]
+        results = state.results
 
         if not results:
             return
 
         total = len(results)
         success_count = sum(1 for r in results if r["success"])
+        archived = [r for r in results if r.get("in_archive")]
 
-        if total > 1:
-            message = self._format_summary_message(total, success_count)
-            await self.bot.send_message(state["chat_id"], message)
-            logger.info(
-                "Отправлено итоговое сообщение пользователю %s: %s файлов",
-                user_id,
-                total,
-            )
+        try:
+            if archived:
+                await self._send_archive(user_id, state.chat_id, archived)
+            elif total > 1:
+                message = self._format_summary_message(total, success_count, results)
+                await self.send_queue.send(
+                    state.chat_id,
+                    lambda: self.bot.send_message(state.chat_id, message),
+                )
+                logger.info(
+                    "Отправлено итоговое сообщение пользователю %s: %s файлов",
+                    user_id,
+                    total,
+                )
+        except Exception:
+            logger.exception("Ошибка отправки итогов пользователю %s", user_id)
+        finally:
+            self._cleanup_files(results)
 
-        self._cleanup_files(results)
+    async def _send_archive(
+        self, user_id: int, chat_id: int, results: list[dict[str, Any]]
+    ):
+        """Отправка результатов пакета одним архивом, сводка — в подписи"""
+        files, errors = [], []
+        for r in results:
+            if r["success"]:
+                paths = r["result_paths"]
+                names = FileProcessor.result_filenames(r["article"], len(paths))
+                files.extend(zip(names, paths))
+            else:
+                errors.append((r["filename"], r["error"]))
 
-        del self.user_state[user_id]
+        archive_path = self.temp_dir / f"{user_id}_{id(results)}_batch.zip"
+        try:
+            await asyncio.to_thread(
+                ArchiveProcessor.write_archive, archive_path, files, errors
+            )
+            document = FSInputFile(
+                archive_path, filename=f"codes_{datetime.now():%Y%m%d_%H%M%S}.zip"
+            )
+            caption = self._format_summary_message(
+                len(results), sum(1 for r in results if r["success"]), results
+            )
+            await self.send_queue.send(
+                chat_id,
+                lambda: self.bot.send_document(chat_id, document, caption=caption),
+            )
+            logger.info(
+                "Отправлен архив пользователю %s: %s файлов", user_id, len(results)
+            )
+        finally:
+            archive_path.unlink(missing_ok=True)
 
-    def _format_summary_message(self, total: int, success_count: int) -> str:
-        """Форматирование итогового сообщения"""
+    def _format_summary_message(
+        self, total: int, success_count: int, results: list[dict[str, Any]] = ()
+    ) -> str:
+        """Форматирование итогового сообщения (с итогами проверки кодов)"""
         lines = [
             f"Обработка завершена: {total} файл(ов)",
             f"✅ Успешно: {success_count}",
         ]
         if total - success_count > 0:
             lines.append(f"❌ С ошибками: {total - success_count}")
+
+        checks = [r["check"] for r in results if r.get("check")]
+        if checks:
+            invalid = sum(c["invalid"] for c in checks)
+            duplicates = sum(c["duplicates"] + c["batch_duplicates"] for c in checks)
+            if invalid or duplicates:
+                lines.append(f"⚠️ Неверный формат: {invalid}, повторы: {duplicates}")
         return "\n".join(lines)
 
-    def _cleanup_files(self, results: List[Dict[str, Any]]):
+    def _cleanup_files(self, results: list[dict[str, Any]]):
         """Очистка временных файлов"""
         for r in results:
-            for key in ("temp_input", "result_path"):
-                if path := r.get(key):
+            paths = [r.get("temp_input"), *(r.get("result_paths") or ())]
+            for path in paths:
+                if path:
                     try:
                         Path(path).unlink(missing_ok=True)
                         logger.debug("Удален временный файл: %s", path)
-                    except Exception as e:
+                    except OSError as e:
                         logger.error("Ошибка удаления файла %s: %s", path, e)
-
-    async def cleanup_old_states(self):
-        """Периодическая очистка устаревших состояний пользователей"""
-        while True:
-            await asyncio.sleep(3600)
-            now = datetime.now()
-            to_delete = []
-
-            for user_id, state in self.user_state.items():
-                if now - state["last_activity"] > timedelta(hours=1):
-                    to_delete.append(user_id)
-
-            for user_id in to_delete:
-                logger.info("Очистка устаревших данных пользователя %s", user_id)
-                del self.user_state[user_id]
@@ -0,0 +1,290 @@
+import codecs
+import contextlib
+import csv
+import io
+import zipfile
+from collections.abc import Iterator
+from datetime import datetime, time
+from pathlib import Path
+from typing import BinaryIO
+from xml.parsers import expat
+
+from services.xlsx_stream import NA_STRINGS, XlsxStreamReader
+
+Source = Path | BinaryIO
+
+XLSX = "xlsx"
+XLS = "xls"
+ODS = "ods"
+CSV = "csv"
+
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGIC = b"PK\x03\x04"
+ODS_MIMETYPE = b"application/vnd.oasis.opendocument.spreadsheet"
+
+SNIFF_SIZE = 64 * 1024
+CHUNK_SIZE = 1 << 20
+
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+
+def read_head(source: Source, size: int) -> bytes:
+    """Первые байты файла без смещения позиции чтения"""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    position = source.tell()
+    head = source.read(size)
+    source.seek(position)
+    return head
+
+
+def _clean(value: str | None) -> str | None:
+    """Значение без пробелов по краям; пустые и NA-значения отбрасываются"""
+    if value is None or value in NA_STRINGS:
+        return None
+    return value.strip() or None
+
+
+def _number(text: str) -> str:
+    """Число в виде строки, как его отдает pandas: целые без .0"""
+    value = float(text)
+    integer = int(value)
+    return str(integer if integer == value else value)
+
+
+class _OdsColumnParser:
+    """SAX-обработчик content.xml: значения одного столбца первой таблицы"""
+
+    def __init__(self, column: int, start_row: int):
+        self.column = column
+        self.start_row = start_row
+        self.values: list[str] = []
+
+        self._table_depth = 0
+        self.done = False
+        self._row = 0
+        self._row_repeat = 1
+        self._col = 0
+        self._cell: dict[str, str] | None = None
+        self._capturing = False
+        self._paragraphs: list[list[str]] = []
+        self._in_paragraph = False
+
+    def start(self, name: str, attrs: dict[str, str]):
+        if self.done:
+            return
+        if name == f"{TABLE_NS} table":
+            self._table_depth += 1
+        elif self._table_depth != 1:
+            return
+        elif name == f"{TABLE_NS} table-row":
+            self._row_repeat = int(attrs.get(f"{TABLE_NS} number-rows-repeated", 1))
+            self._col = 0
+        elif name in (f"{TABLE_NS} table-cell", f"{TABLE_NS} covered-table-cell"):
+            repeat = int(attrs.get(f"{TABLE_NS} number-columns-repeated", 1))
+            first = self._col + 1
+            self._col += repeat
+            if first <= self.column <= self._col:
+                self._cell = attrs
+                self._capturing = True
+                self._paragraphs = []
+        elif self._capturing:
+            if name == f"{TEXT_NS} p":
+                self._paragraphs.append([])
+                self._in_paragraph = True
+            elif self._in_paragraph and name == f"{TEXT_NS} s":
+                self._paragraphs[-1].append(" " * int(attrs.get(f"{TEXT_NS} c", 1)))
+            elif self._in_paragraph and name == f"{TEXT_NS} tab":
+                self._paragraphs[-1].append("\t")
+            elif self._in_paragraph and name == f"{TEXT_NS} line-break":
+                self._paragraphs[-1].append("\n")
+
+    def end(self, name: str):
+        if self.done:
+            return
+        if name == f"{TABLE_NS} table":
+            self._table_depth -= 1
+            # pandas читает только первый лист
+            self.done = self._table_depth == 0
+        elif self._table_depth != 1:
+            return
+        elif name == f"{TABLE_NS} table-row":
+            first_row = self._row + 1
+            self._row += self._row_repeat
+            if self._cell is not None:
+                value = _clean(self._convert())
+                self._cell = None
+                if value is not None:
+                    rows = self._row - max(first_row, self.start_row) + 1
+                    self.values.extend([value] * max(rows, 0))
+        elif name in (f"{TABLE_NS} table-cell", f"{TABLE_NS} covered-table-cell"):
+            self._capturing = False
+        elif name == f"{TEXT_NS} p":
+            self._in_paragraph = False
+
+    def data(self, text: str):
+        if self._in_paragraph and self._capturing:
+            self._paragraphs[-1].append(text)
+
+    def _convert(self) -> str | None:
+        """Значение ячейки ODS в том виде, в котором его вернул бы pandas"""
+        attrs = self._cell
+        value_type = attrs.get(f"{OFFICE_NS} value-type")
+        if value_type in ("float", "percentage", "currency"):
+            return _number(attrs[f"{OFFICE_NS} value"])
+        if value_type == "boolean":
+            return str(attrs.get(f"{OFFICE_NS} boolean-value") == "true")
+        if value_type == "date":
+            return str(datetime.fromisoformat(attrs[f"{OFFICE_NS} date-value"]))
+        if value_type == "time":
+            hours, rest = attrs[f"{OFFICE_NS} time-value"][2:].split("H")
+            minutes, rest = rest.split("M")
+            seconds = float(rest.rstrip("S") or 0)
+            return str(
+                time(int(hours), int(minutes), int(seconds), round(seconds % 1 * 1e6))
+            )
+        if not self._paragraphs:
+            return None
+        return "\n".join("".join(parts) for parts in self._paragraphs)
+
+
+class CodeReader:
+    """Чтение кодов из таблиц с определением формата по содержимому"""
+
+    @staticmethod
+    def detect_format(source: Source) -> str:
+        """
+        Определяет формат по сигнатуре файла, а не по расширению.
+
+        Raises:
+            ValueError: Если формат не поддерживается
+        """
+        head = read_head(source, SNIFF_SIZE)
+
+        if head.startswith(OLE2_MAGIC):
+            return XLS
+
+        if head.startswith(ZIP_MAGIC):
+            # В ODS первой записью архива идет несжатый mimetype
+            if head[30:38] == b"mimetype" and ODS_MIMETYPE in head[38:128]:
+                return ODS
+            try:
+                with zipfile.ZipFile(source) as archive:
+                    names = set(archive.namelist())
+            except zipfile.BadZipFile:
+                raise ValueError("Файл поврежден: не удалось открыть архив") from None
+            if "xl/workbook.xml" in names or "[Content_Types].xml" in names:
+                return XLSX
+            if "content.xml" in names:
+                return ODS
+            raise ValueError("Архив не является таблицей Excel или ODS")
+
+        stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+        if stripped.startswith(b"<"):
+            raise ValueError(
+                "Файл сохранен как HTML/XML-таблица, пересохраните его в .xlsx"
+            )
+        if b"\0" in head:
+            raise ValueError("Неподдерживаемый формат файла")
+
+        return CSV
+
+    @classmethod
+    def iter_codes(
+        cls, source: Source, column: int = 2, start_row: int = 2
+    ) -> Iterator[str]:
+        """
+        Отдает непустые значения столбца (с обрезанными пробелами),
+        начиная со строки start_row, выбирая читатель по формату файла.
+        """
+        readers = {
+            XLSX: XlsxStreamReader.iter_column,
+            XLS: cls._iter_xls,
+            ODS: cls._iter_ods,
+            CSV: cls._iter_csv,
+        }
+        return readers[cls.detect_format(source)](source, column, start_row)
+
+    @staticmethod
+    def _iter_xls(source: Source, column: int, start_row: int) -> Iterator[str]:
+        """Чтение BIFF (.xls) через xlrd, только нужный столбец первого листа"""
+        import xlrd
+
+        if isinstance(source, (str, Path)):
+            book = xlrd.open_workbook(source, on_demand=True)
+        else:
+            book = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+
+        try:
+            sheet = book.sheet_by_index(0)
+            if sheet.ncols < column:
+                return
+            for row in range(start_row - 1, sheet.nrows):
+                cell = sheet.cell(row, column - 1)
+                if cell.ctype == xlrd.XL_CELL_TEXT:
+                    value = _clean(cell.value)
+                elif cell.ctype == xlrd.XL_CELL_NUMBER:
+                    value = _number(repr(cell.value))
+                elif cell.ctype == xlrd.XL_CELL_DATE:
+                    value = str(
+                        xlrd.xldate.xldate_as_datetime(cell.value, book.datemode)
+                    )
+                elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                    value = str(bool(cell.value))
+                else:
+                    value = None
+                if value:
+                    yield value
+        finally:
+            book.release_resources()
+
+    @staticmethod
+    def _iter_ods(source: Source, column: int, start_row: int) -> Iterator[str]:
+        """Потоковый разбор content.xml первой таблицы ODS"""
+        handler = _OdsColumnParser(column, start_row)
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.data
+
+        with zipfile.ZipFile(source) as archive, archive.open("content.xml") as content:
+            while not handler.done and (chunk := content.read(CHUNK_SIZE)):
+                parser.Parse(chunk, False)
+                yield from handler.values
+                handler.values.clear()
+
+    @staticmethod
+    def _iter_csv(source: Source, column: int, start_row: int) -> Iterator[str]:
+        """CSV: кодировка UTF-8 или cp1251, разделитель определяется по образцу"""
+        head = read_head(source, SNIFF_SIZE)
+        try:
+            codecs.getincrementaldecoder("utf-8-sig")().decode(head, final=False)
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            encoding = "cp1251"
+
+        sample = head.decode(encoding, errors="ignore")
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+
+        with contextlib.ExitStack() as stack:
+            stream = source
+            if isinstance(source, (str, Path)):
+                stream = stack.enter_context(open(source, "rb"))
+            text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+            try:
+                for row_number, row in enumerate(csv.reader(text, dialect), start=1):
+                    if row_number >= start_row and len(row) >= column:
+                        value = _clean(row[column - 1])
+                        if value:
+                            yield value
+            finally:
+                # Обертка не закрывает поток: свой файл закроет stack,
+                # а переданный поток остается открытым у вызывающего
+                text.detach()
@@ -0,0 +1,164 @@
+import hashlib
+from collections.abc import Iterable, Iterator
+
+# Предустановленный формат кодов; остальные значения CODE_PATTERN — регулярки
+GS1 = "gs1"
+
+# Коды проверяются пачками: векторные операции без списка всех кодов в памяти
+CHUNK_SIZE = 8192
+# Более длинные коды хэшируются по отдельности, чтобы одна строка-мусор
+# не раздувала массив пачки (ширина массива — самый длинный код)
+MAX_WIDTH = 256
+
+# GS1 DataMatrix: (01) GTIN из 14 цифр, (21) серийный номер и дальше
+# необязательные (91)/(92)/(93) через разделитель GS — печатные ASCII и GS
+GS1_MIN_LENGTH = 24
+GS1_MAX_LENGTH = 148
+GS_CHAR = 0x1D
+
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+
+class CodeCheck:
+    """Итоги проверки кодов одного файла"""
+
+    __slots__ = ("codes", "duplicates", "hashes", "invalid")
+
+    def __init__(self, codes: int, invalid: int, duplicates: int, hashes):
+        self.codes = codes
+        self.invalid = invalid
+        # Повторы внутри файла: кодов сверх первого вхождения
+        self.duplicates = duplicates
+        # Уникальные 64-битные хэши кодов (numpy uint64) для сверки
+        # с другими файлами пакета
+        self.hashes = hashes
+
+
+class CodeValidator:
+    """
+    Проверка кодов маркировки по формату и поиск повторов.
+
+    Коды проходят через check() без изменений, а проверяются пачками
+    векторными операциями: формат gs1 — сравнением кодов символов в
+    массиве numpy, произвольная регулярка — str.fullmatch pandas. Хэши
+    кодов не зависят от процесса (в отличие от hash()), поэтому хэши
+    из разных воркеров можно сравнивать между собой.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.codes = 0
+        self.invalid = 0
+        self._hashes: list = []
+
+    @staticmethod
+    def describe(check: CodeCheck | None, batch_duplicates: int = 0) -> str:
+        """Строка подписи к результату с итогами проверки (пусто без проверки)"""
+        if check is None:
+            return ""
+        problems = []
+        if check.invalid:
+            problems.append(f"неверный формат — {check.invalid}")
+        if check.duplicates:
+            problems.append(f"повторы в файле — {check.duplicates}")
+        if batch_duplicates:
+            problems.append(f"уже были в других файлах — {batch_duplicates}")
+        if not problems:
+            return "\n🔎 Проверка кодов: без замечаний"
+        return "\n⚠️ Проверка кодов: " + ", ".join(problems)
+
+    def check(self, codes: Iterable[str]) -> Iterator[str]:
+        """Отдает коды как есть, проверяя их пачками по CHUNK_SIZE"""
+        chunk: list[str] = []
+        for code in codes:
+            chunk.append(code)
+            if len(chunk) == CHUNK_SIZE:
+                self._check_chunk(chunk)
+                yield from chunk
+                chunk = []
+        if chunk:
+            self._check_chunk(chunk)
+            yield from chunk
+
+    def result(self) -> CodeCheck:
+        """Итоги по всем кодам, прошедшим через check()"""
+        import numpy as np
+        import pandas as pd
+
+        if self._hashes:
+            hashes = pd.unique(np.concatenate(self._hashes))
+        else:
+            hashes = np.empty(0, dtype=np.uint64)
+        return CodeCheck(self.codes, self.invalid, self.codes - len(hashes), hashes)
+
+    def _check_chunk(self, chunk: list[str]):
+        import numpy as np
+
+        # Длинные коды заменяются дайджестом: хэш тот же для того же кода
+        wide = [i for i, code in enumerate(chunk) if len(code) > MAX_WIDTH]
+        narrow = chunk
+        if wide:
+            narrow = list(chunk)
+            for i in wide:
+                narrow[i] = "#" + hashlib.blake2b(chunk[i].encode()).hexdigest()
+
+        values = np.array(narrow, dtype=np.str_)
+        # Коды символов: строка массива — код, дополненный нулями
+        points = values.view(np.uint32).reshape(len(values), -1)
+        lengths = np.count_nonzero(points, axis=1)
+
+        if self.pattern == GS1:
+            valid = self._gs1(points, lengths)
+            if wide:
+                valid[wide] = False
+        else:
+            valid = self._fullmatch(chunk)
+
+        self.codes += len(chunk)
+        self.invalid += len(chunk) - int(np.count_nonzero(valid))
+        self._hashes.append(self._hash(points, int(lengths.min())))
+
+    @staticmethod
+    def _gs1(points, lengths):
+        """Структура и длина GS1 DataMatrix по кодам символов"""
+        valid = (lengths >= GS1_MIN_LENGTH) & (lengths <= GS1_MAX_LENGTH)
+        if points.shape[1] < GS1_MIN_LENGTH:
+            return valid
+
+        zero, one, two = ord("0"), ord("1"), ord("2")
+        gtin = points[:, 2:16]
+        tail = points[:, 18:]
+        valid &= (points[:, 0] == zero) & (points[:, 1] == one)
+        valid &= ((gtin >= zero) & (gtin <= ord("9"))).all(axis=1)
+        valid &= (points[:, 16] == two) & (points[:, 17] == one)
+        # Нули — дополнение до ширины массива после конца кода
+        valid &= (
+            ((tail >= 0x21) & (tail <= 0x7E)) | (tail == GS_CHAR) | (tail == 0)
+        ).all(axis=1)
+        return valid
+
+    def _fullmatch(self, chunk: list[str]):
+        import pandas as pd
+
+        matched = pd.Series(chunk, dtype=object).str.fullmatch(self.pattern, na=False)
+        return matched.to_numpy(dtype=bool)
+
+    @staticmethod
+    def _hash(points, shortest: int):
+        """
+        FNV-1a по кодам символов. Нули дополнения не перемешиваются,
+        поэтому хэш кода не зависит от ширины массива пачки
+        """
+        import numpy as np
+
+        hashes = np.full(len(points), FNV_OFFSET, dtype=np.uint64)
+        prime = np.uint64(FNV_PRIME)
+        for column in range(points.shape[1]):
+            values = points[:, column].astype(np.uint64)
+            mixed = (hashes ^ values) * prime
+            if column < shortest:
+                hashes = mixed
+            else:
+                hashes = np.where(values != 0, mixed, hashes)
+        return hashes
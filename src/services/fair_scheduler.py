@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from services.worker_pool import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+class _UserQueue:
+    """Ожидающие задачи и число выполняющихся задач одного пользователя"""
+
+    __slots__ = ("active", "waiters")
+
+    def __init__(self):
+        self.waiters: deque[asyncio.Future] = deque()
+        self.active = 0
+
+
+class FairScheduler:
+    """
+    Справедливая очередь обработки файлов.
+
+    У каждого пользователя своя очередь; свободные места раздаются по кругу
+    между пользователями, у которых есть ожидающие файлы, поэтому пачка из
+    сотен файлов одного пользователя не задерживает остальных дольше чем
+    на один круг. Общее число выполняющихся задач ограничено max_active,
+    у одного пользователя — per_user_limit. Внутри очереди пользователя
+    файлы запускаются в порядке поступления.
+    """
+
+    def __init__(self, max_active: int, per_user_limit: int, max_waiting: int):
+        self.max_active = max_active
+        self.per_user_limit = per_user_limit
+        self.max_waiting = max_waiting
+        self._users: dict[int, _UserQueue] = {}
+        # Круг пользователей, у которых есть ожидающие задачи
+        self._ring: deque[int] = deque()
+        self._active = 0
+        self._waiting = 0
+
+    @property
+    def active(self) -> int:
+        """Количество выполняющихся задач"""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """Количество задач, ожидающих своей очереди"""
+        return self._waiting
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: int,
+        on_queued: Callable[[int], Awaitable[Any]] | None = None,
+    ):
+        """
+        Место для обработки одного файла пользователя.
+
+        Если место не выдано сразу, on_queued получает позицию файла в
+        очереди пользователя. При переполненной очереди — QueueFullError.
+        """
+        await self._acquire(user_id, on_queued)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    async def _acquire(
+        self, user_id: int, on_queued: Callable[[int], Awaitable[Any]] | None
+    ):
+        queue = self._users.get(user_id)
+        if queue is None:
+            queue = self._users[user_id] = _UserQueue()
+
+        if (
+            not queue.waiters
+            and queue.active < self.per_user_limit
+            and self._active < self.max_active
+        ):
+            queue.active += 1
+            self._active += 1
+            return
+
+        if self._waiting >= self.max_waiting:
+            self._forget(user_id, queue)
+            raise QueueFullError("Очередь обработки переполнена, попробуйте позже")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.waiters.append(waiter)
+        self._waiting += 1
+        if len(queue.waiters) == 1:
+            self._ring.append(user_id)
+
+        try:
+            if on_queued:
+                await on_queued(len(queue.waiters))
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Место уже выдано, но задача отменена — возвращаем его
+                self._release(user_id)
+            else:
+                waiter.cancel()
+                queue.waiters.remove(waiter)
+                self._waiting -= 1
+                self._forget(user_id, queue)
+                self._dispatch()
+            raise
+
+    def _release(self, user_id: int):
+        queue = self._users[user_id]
+        queue.active -= 1
+        self._active -= 1
+        self._forget(user_id, queue)
+        self._dispatch()
+
+    def _forget(self, user_id: int, queue: _UserQueue):
+        """Удаление пустой очереди пользователя"""
+        if not queue.active and not queue.waiters:
+            del self._users[user_id]
+            try:
+                self._ring.remove(user_id)
+            except ValueError:
+                pass
+
+    def _dispatch(self):
+        """Раздача свободных мест по кругу пользователей"""
+        skipped = 0
+        while (
+            self._ring and self._active < self.max_active and skipped < len(self._ring)
+        ):
+            user_id = self._ring.popleft()
+            queue = self._users[user_id]
+
+            if not queue.waiters:
+                continue
+            if queue.active >= self.per_user_limit:
+                self._ring.append(user_id)
+                skipped += 1
+                continue
+
+            waiter = queue.waiters.popleft()
+            self._waiting -= 1
+            queue.active += 1
+            self._active += 1
+            waiter.set_result(None)
+            skipped = 0
+            if queue.waiters:
+                self._ring.append(user_id)
+
+
+class _UserReplies:
+    """Номера файлов одного пользователя: выданные, отвеченные, ожидающие"""
+
+    __slots__ = ("finished", "issued", "served", "waiters")
+
+    def __init__(self):
+        self.issued = 0
+        self.served = 0
+        self.finished: set = set()
+        self.waiters: dict[int, asyncio.Future] = {}
+
+
+class ReplyOrder:
+    """
+    Ответы пользователю в порядке отправки файлов.
+
+    Файл получает номер при поступлении (take), перед ответом ждет, пока
+    ответят на все предыдущие файлы пользователя (wait), и после ответа
+    или ошибки обязательно освобождает номер (done).
+    """
+
+    def __init__(self):
+        self._users: dict[int, _UserReplies] = {}
+
+    def take(self, user_id: int) -> int:
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserReplies()
+        state.issued += 1
+        return state.issued - 1
+
+    async def wait(self, user_id: int, ticket: int):
+        state = self._users[user_id]
+        if state.served >= ticket:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters[ticket] = waiter
+        try:
+            await waiter
+        finally:
+            state.waiters.pop(ticket, None)
+
+    def done(self, user_id: int, ticket: int):
+        state = self._users[user_id]
+        # Номер может освободиться раньше предыдущих (отмена задачи),
+        # поэтому очередь сдвигается только по освобожденным подряд
+        state.finished.add(ticket)
+        while state.served in state.finished:
+            state.finished.discard(state.served)
+            state.served += 1
+        waiter = state.waiters.get(state.served)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        if state.served == state.issued:
+            del self._users[user_id]
@@ -1,14 +1,32 @@
+import io
 import re
+import time
+from collections.abc import Callable, Iterable, Iterator
+from itertools import chain
 from pathlib import Path
-from typing import List
-import pandas as pd
-from openpyxl import Workbook
+from typing import (
+    Any,
+    BinaryIO,
+)
+
+from services.code_readers import CodeReader
+from services.code_validator import CodeValidator
 from services.reference_book import ReferenceBook
+from services.xlsx_stream import MAX_ROWS, XlsxStreamWriter
+
+Target = Path | BinaryIO
 
 
 class FileProcessor:
     """Сервис для обработки Excel файлов с кодами"""
 
+    SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".ods", ".csv")
+
+    @classmethod
+    def is_supported(cls, filename: str) -> bool:
+        """Поддерживается ли формат файла (по расширению)"""
+        return bool(filename) and filename.lower().endswith(cls.SUPPORTED_EXTENSIONS)
+
     @staticmethod
     def extract_article(filename: str) -> str:
         """
@@ -32,21 +50,27 @@ class FileProcessor:
         return first_word.upper()
 
     @staticmethod
-    def read_codes_from_file(file_path: Path) -> List[str]:
-        df = pd.read_excel(
-            file_path, header=None, skiprows=1, dtype=str, engine="openpyxl"
-        )
-
-        if df.shape[1] < 2:
-            return []
-
-        codes = df.iloc[:, 1].str.strip().dropna()
-        codes = codes[codes != ""].tolist()
+    def iter_codes_from_file(file_path: Path | BinaryIO) -> Iterator[str]:
+        """
+        Потоково читает коды из столбца B, начиная со второй строки.
+        Пустые ячейки пропускаются, пробелы по краям обрезаются.
+        Формат (xlsx, xls, ods, csv) определяется по содержимому файла.
+        """
+        return CodeReader.iter_codes(file_path, column=2, start_row=2)
 
-        return codes
+    @classmethod
+    def read_codes_from_file(cls, file_path: Path | BinaryIO) -> list[str]:
+        """Читает все коды из столбца B списком"""
+        return list(cls.iter_codes_from_file(file_path))
 
     @staticmethod
-    def create_result_file(barcode: str, codes: List[str], output_path: Path) -> None:
+    def create_result_file(
+        barcode: str,
+        codes: Iterable[str],
+        output_path: Target,
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+    ) -> int:
         """
         Создает результирующий Excel файл с указанной структурой.
 
@@ -55,67 +79,293 @@ class FileProcessor:
         - Строка 2, столбец A: штрихкод
         - Строки 3+, столбец A: коды из входного файла
 
+        Коды записываются потоково, поэтому можно передать генератор.
+        Запись останавливается на пределе max_rows строк (с заголовком)
+        или max_bytes размера файла; оставшиеся коды итератора не читаются.
+
         Args:
-            article: Артикул (используется для названия файла)
             barcode: Штрихкод для записи во вторую строку
-            codes: Список кодов для записи с третьей строки
-            output_path: Путь для сохранения файла
+            codes: Коды для записи с третьей строки
+            output_path: Путь для сохранения файла или бинарный буфер
+            max_rows: Предел строк в файле
+            max_bytes: Предел размера файла (None — без предела)
+
+        Returns:
+            int: Количество записанных кодов
+        """
+        rows = XlsxStreamWriter.write_column(
+            output_path, chain(("коды", barcode), codes), max_rows, max_bytes
+        )
+        return rows - 2
+
+    @classmethod
+    def create_result_parts(
+        cls,
+        barcode: str,
+        codes: Iterable[str],
+        part_target: Callable[[int], Target],
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+    ) -> list[int]:
+        """
+        Записывает коды в столько файлов, сколько нужно по пределам
+        max_rows и max_bytes; у каждой части свой заголовок со штрихкодом.
+
+        Args:
+            part_target: Путь или буфер для части по ее номеру (с 1)
+
+        Returns:
+            list: Количество кодов в каждой части
+
+        Raises:
+            ValueError: Если в max_rows не помещается ни одного кода
         """
-        wb = Workbook()
-        ws = wb.active
+        if max_rows < 3:
+            raise ValueError("В файле результата нужно место хотя бы для одного кода")
+        codes = iter(codes)
+        counts: list[int] = []
+        while (code := next(codes, None)) is not None:
+            counts.append(
+                cls.create_result_file(
+                    barcode,
+                    chain((code,), codes),
+                    part_target(len(counts) + 1),
+                    max_rows,
+                    max_bytes,
+                )
+            )
+        return counts
 
-        # Первая строка: "коды"
-        ws["A1"] = "коды"
+    @classmethod
+    def find_barcode(cls, filename: str) -> tuple[str, str]:
+        """
+        Извлекает артикул из названия файла и ищет его штрихкод в справочнике.
 
-        # Вторая строка: штрихкод
-        ws["A2"] = barcode
+        Returns:
+            tuple: (артикул, штрихкод)
 
-        # Третья и последующие строки: коды
-        for idx, code in enumerate(codes, start=3):
-            ws[f"A{idx}"] = code
+        Raises:
+            ValueError: Если артикул не извлечен или не найден в справочнике
+        """
+        article = cls.extract_article(filename)
+        if not article:
+            raise ValueError("Не удалось извлечь артикул из названия файла")
+
+        barcode = ReferenceBook.get_barcode(article)
+        if not barcode:
+            raise ValueError(
+                f"Артикул «{article}» (Файл {filename}) не найден в справочнике"
+            )
 
-        # Сохраняем файл
-        wb.save(output_path)
+        return article, barcode
+
+    @staticmethod
+    def result_filename(article: str, part: int | None = None) -> str:
+        """Имя результирующего файла (или его части) для пользователя"""
+        if part is None:
+            return f"codes_{article}.xlsx"
+        return f"codes_{article}_part{part}.xlsx"
+
+    @classmethod
+    def result_filenames(cls, article: str, parts: int) -> list[str]:
+        """Имена всех частей результата; одна часть — без номера"""
+        if parts == 1:
+            return [cls.result_filename(article)]
+        return [cls.result_filename(article, part) for part in range(1, parts + 1)]
+
+    @classmethod
+    def _process(
+        cls,
+        source: Target,
+        part_target: Callable[[int], Target],
+        filename: str,
+        barcode: str | None,
+        stats: dict[str, Any],
+        collect_stats: bool = False,
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+        code_pattern: str | None = None,
+    ) -> tuple[str, int]:
+        """
+        Общий конвейер: артикул, штрихкод, чтение кодов, запись результата
+        (частями по пределам max_rows и max_bytes).
+
+        Returns:
+            tuple: (артикул, количество частей результата)
+
+        В stats записывается число кодов, а при collect_stats — еще и
+        длительности этапов parse, write и lookup (если штрихкод ищется
+        здесь) в секундах. При code_pattern коды проверяются по формату
+        и на повторы, итоги (CodeCheck) — в stats["check"].
+        """
+        clock = time.perf_counter
+        started = clock()
+
+        # 1-2. Извлекаем артикул и ищем штрихкод в справочнике
+        if barcode is None:
+            article, barcode = cls.find_barcode(filename)
+            if collect_stats:
+                stats["lookup"] = clock() - started
+        else:
+            article = cls.extract_article(filename)
+        lookup_done = clock()
+
+        # 3. Читаем коды из файла (проверяем, что есть хотя бы один)
+        codes = cls.iter_codes_from_file(source)
+        if collect_stats:
+            codes = cls._timed(codes, stats)
+        validator = CodeValidator(code_pattern) if code_pattern else None
+        if validator:
+            codes = validator.check(codes)
+        first_code = next(codes, None)
+        if first_code is None:
+            raise ValueError(f"В файле «{filename}» не найдено кодов в столбце B")
+
+        # 4. Создаем результирующий файл (или несколько частей)
+        counts = cls.create_result_parts(
+            barcode, chain((first_code,), codes), part_target, max_rows, max_bytes
+        )
+        stats["rows"] = sum(counts)
+        if validator:
+            stats["check"] = validator.result()
+
+        if collect_stats:
+            # Чтение и запись идут потоком вперемешку: запись — остаток времени
+            stats["write"] = clock() - lookup_done - stats["parse"]
+        return article, len(counts)
+
+    @staticmethod
+    def _timed(codes: Iterator[str], stats: dict[str, float]) -> Iterator[str]:
+        """Отдает коды, накапливая в stats["parse"] время их чтения"""
+        clock = time.perf_counter
+        stats["parse"] = 0.0
+        while True:
+            started = clock()
+            code = next(codes, None)
+            stats["parse"] += clock() - started
+            if code is None:
+                return
+            yield code
 
     @classmethod
     def process_file(
-        cls, input_file_path: Path, output_dir: Path, filename: str
-    ) -> tuple[Path, str]:
+        cls,
+        input_file_path: Path,
+        output_dir: Path,
+        filename: str,
+        barcode: str | None = None,
+        output_prefix: str = "",
+        collect_stats: bool = False,
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+        code_pattern: str | None = None,
+    ) -> tuple[list[Path], str, dict[str, Any]]:
         """
         Обрабатывает входящий файл и создает результирующий файл.
 
+        Если коды не помещаются в max_rows строк или max_bytes байт, результат
+        делится на части codes_<артикул>_partN.xlsx.
+
         Args:
             input_file_path: Путь к входящему файлу
             output_dir: Директория для сохранения результата
             filename: Оригинальное название файла
+            barcode: Уже найденный штрихкод (если None — ищется в справочнике)
+            output_prefix: Префикс имени результата, чтобы файлы разных
+                пользователей с одним артикулом не перезаписывали друг друга
+            collect_stats: Замерять длительность этапов (для метрик)
+            max_rows: Предел строк в одной части
+            max_bytes: Предел размера одной части (None — без предела)
+            code_pattern: Формат кодов для проверки (gs1 или регулярное
+                выражение; None — без проверки)
 
         Returns:
-            tuple: (Путь к результирующему файлу, артикул)
+            tuple: (Пути к частям результата по порядку, артикул, замеры)
 
         Raises:
             ValueError: При различных ошибках валидации
         """
-        # 1. Извлекаем артикул из названия файла
         article = cls.extract_article(filename)
-        if not article:
-            raise ValueError("Не удалось извлечь артикул из названия файла")
+        paths: list[Path] = []
 
-        # 2. Ищем штрихкод в справочнике
-        barcode = ReferenceBook.get_barcode(article)
-        if not barcode:
-            raise ValueError(
-                f"Артикул «{article}» (Файл {filename}) не найден в справочнике"
+        def part_path(part: int) -> Path:
+            # Первая часть получает номер, только если за ней есть вторая
+            name = cls.result_filename(article, part if part > 1 else None)
+            paths.append(output_dir / f"{output_prefix}{name}")
+            return paths[-1]
+
+        stats: dict[str, Any] = {}
+        try:
+            cls._process(
+                input_file_path,
+                part_path,
+                filename,
+                barcode,
+                stats,
+                collect_stats,
+                max_rows,
+                max_bytes,
+                code_pattern,
             )
+        except BaseException:
+            for path in paths:
+                path.unlink(missing_ok=True)
+            raise
 
-        # 3. Читаем коды из файла
-        codes = cls.read_codes_from_file(input_file_path)
-        if not codes:
-            raise ValueError(f"В файле «{filename}» не найдено кодов в столбце B")
+        if len(paths) > 1:
+            paths[0] = paths[0].replace(
+                output_dir / f"{output_prefix}{cls.result_filename(article, 1)}"
+            )
+
+        return paths, article, stats
+
+    @classmethod
+    def process_bytes(
+        cls,
+        data: bytes,
+        filename: str,
+        barcode: str | None = None,
+        collect_stats: bool = False,
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+        code_pattern: str | None = None,
+    ) -> tuple[list[bytes], str, dict[str, Any]]:
+        """
+        Обрабатывает файл целиком в памяти, без временных файлов.
 
-        # 4. Создаем результирующий файл
-        output_filename = f"codes_{article}.xlsx"
-        output_path = output_dir / output_filename
+        Args:
+            data: Содержимое входящего файла
+            filename: Оригинальное название файла
+            barcode: Уже найденный штрихкод (если None — ищется в справочнике)
+            collect_stats: Замерять длительность этапов (для метрик)
+            max_rows: Предел строк в одной части
+            max_bytes: Предел размера одной части (None — без предела)
+            code_pattern: Формат кодов для проверки (gs1 или регулярное
+                выражение; None — без проверки)
+
+        Returns:
+            tuple: (Содержимое частей результата по порядку, артикул, замеры)
+
+        Raises:
+            ValueError: При различных ошибках валидации
+        """
+        outputs: list[io.BytesIO] = []
 
-        cls.create_result_file(barcode, codes, output_path)
+        def part_buffer(part: int) -> io.BytesIO:
+            outputs.append(io.BytesIO())
+            return outputs[-1]
+
+        stats: dict[str, Any] = {}
+        article, _ = cls._process(
+            io.BytesIO(data),
+            part_buffer,
+            filename,
+            barcode,
+            stats,
+            collect_stats,
+            max_rows,
+            max_bytes,
+            code_pattern,
+        )
 
-        return output_path, article
+        return [output.getvalue() for output in outputs], article, stats
@@ -0,0 +1,320 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+# Статусы задачи: pending — ждет воркера, running — обрабатывается,
+# done/failed — результат готов к отправке (пока ответ отправляется,
+# у задачи задано delivering_at), delivered — ответ отправлен
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+DELIVERED = "delivered"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    file_unique_id TEXT,
+    file_name TEXT NOT NULL,
+    article TEXT,
+    barcode TEXT,
+    reference_version TEXT,
+    input_path TEXT,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_file_id TEXT,
+    check_result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    claimed_at REAL,
+    delivering_at REAL,
+    delivery_attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, status, id);
+"""
+# Столбцы, добавленные после первой версии схемы: базы прежних версий
+# дополняются при открытии
+MIGRATIONS = {
+    "delivering_at": "ALTER TABLE jobs ADD COLUMN delivering_at REAL",
+    "delivery_attempts": (
+        "ALTER TABLE jobs ADD COLUMN delivery_attempts INTEGER NOT NULL DEFAULT 0"
+    ),
+    "check_result": "ALTER TABLE jobs ADD COLUMN check_result TEXT",
+}
+
+
+class JobQueue:
+    """
+    Надежная очередь файлов на SQLite (WAL).
+
+    Бот записывает каждый принятый документ как задачу, процессы-воркеры
+    (worker.py) забирают задачи и записывают результат, бот отправляет
+    готовые результаты. Задачи переживают перезапуск любой из сторон:
+    задачи завершившихся воркеров возвращаются из running в pending.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не делит их между потоками)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def add(self, status: str = PENDING, **fields: Any) -> int:
+        """Новая задача; status=done/failed — ответ готов без обработки"""
+        now = time.time()
+        fields.update(status=status, created_at=now, updated_at=now)
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        cursor = self._connect().execute(
+            f"INSERT INTO jobs ({columns}) VALUES ({placeholders})",
+            tuple(fields.values()),
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> dict[str, Any] | None:
+        """
+        Забирает следующую задачу: первой идет самая старая задача
+        пользователя, у которого сейчас меньше всего задач в работе
+        """
+        now = time.time()
+        row = (
+            self._connect()
+            .execute(
+                """
+            UPDATE jobs SET status = ?, worker = ?, claimed_at = ?,
+                attempts = attempts + 1, updated_at = ?
+            WHERE id = (
+                SELECT j.id FROM jobs j
+                WHERE j.status = ?
+                ORDER BY (
+                    SELECT COUNT(*) FROM jobs r
+                    WHERE r.user_id = j.user_id AND r.status = ?
+                ), j.id
+                LIMIT 1
+            ) AND status = ?
+            RETURNING *
+            """,
+                (RUNNING, worker, now, now, PENDING, RUNNING, PENDING),
+            )
+            .fetchone()
+        )
+        return dict(row) if row else None
+
+    def complete(
+        self,
+        job_id: int,
+        result_paths: Iterable[Path],
+        check: dict[str, int] | None = None,
+    ):
+        """
+        Результат готов; части результата хранятся списком JSON, итоги
+        проверки кодов (если коды проверялись) — объектом JSON
+        """
+        paths = json.dumps([str(path) for path in result_paths])
+        check_result = json.dumps(check) if check is not None else None
+        self._finish(job_id, DONE, result_path=paths, check_result=check_result)
+
+    def fail(self, job_id: int, error: str):
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id: int, status: str, **fields: Any):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET status = ?, {assignments}, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (status, *fields.values(), time.time(), job_id, RUNNING),
+        )
+
+    def requeue(
+        self,
+        worker_prefix: str,
+        max_attempts: int = 3,
+        claimed_before: float | None = None,
+    ) -> int:
+        """
+        Возвращает в очередь задачи воркеров, имя которых начинается с
+        worker_prefix: процесс воркера завершился (упал, убит по таймауту
+        или это прежний запуск того же хоста). Задачи живых воркеров не
+        трогаются, сколько бы они ни выполнялись. Задачи, исчерпавшие
+        max_attempts, помечаются как failed.
+
+        С claimed_before возвращаются только задачи, взятые раньше этого
+        момента: так пустой worker_prefix подбирает задачи воркеров,
+        которых уже нет (хост пересоздан с другим именем).
+        """
+        where = f"status = '{RUNNING}' AND worker LIKE ? || '%' AND claimed_at < ?"
+        claimed_before = float("inf") if claimed_before is None else claimed_before
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                f"UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                f"WHERE {where} AND attempts >= ?",
+                (
+                    FAILED,
+                    "Обработка файла прервана",
+                    now,
+                    worker_prefix,
+                    claimed_before,
+                    max_attempts,
+                ),
+            )
+            cursor = db.execute(
+                f"UPDATE jobs SET status = ?, worker = NULL, updated_at = ? "
+                f"WHERE {where}",
+                (PENDING, now, worker_prefix, claimed_before),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def expire(
+        self, worker_prefix: str, timeout: float, error: str
+    ) -> list[dict[str, Any]]:
+        """
+        Завершает ошибкой задачи воркеров worker_prefix, которые
+        выполняются дольше timeout секунд.
+
+        Returns:
+            list: id и worker этих задач — процессы воркеров нужно остановить
+        """
+        now = time.time()
+        rows = (
+            self._connect()
+            .execute(
+                """
+            UPDATE jobs SET status = ?, error = ?, updated_at = ?
+            WHERE status = ? AND worker LIKE ? || '%' AND claimed_at < ?
+            RETURNING id, worker
+            """,
+                (FAILED, error, now, RUNNING, worker_prefix, now - timeout),
+            )
+            .fetchall()
+        )
+        return [dict(row) for row in rows]
+
+    def claim_deliverable(self, limit: int = 100) -> list[dict[str, Any]]:
+        """
+        Забирает на отправку готовые результаты: у пользователя нет более
+        ранних задач, еще не готовых к отправке или отправляемых сейчас
+        (порядок ответов). Задачи помечаются отправляемыми в том же
+        запросе, поэтому один результат не забирается дважды.
+        """
+        now = time.time()
+        rows = (
+            self._connect()
+            .execute(
+                """
+            UPDATE jobs SET delivering_at = ?,
+                delivery_attempts = delivery_attempts + 1, updated_at = ?
+            WHERE id IN (
+                SELECT j.id FROM jobs j
+                WHERE j.status IN (?, ?) AND j.delivering_at IS NULL
+                  AND NOT EXISTS (
+                    SELECT 1 FROM jobs e
+                    WHERE e.user_id = j.user_id AND e.id < j.id
+                      AND (
+                        e.status IN (?, ?)
+                        OR (e.status IN (?, ?) AND e.delivering_at IS NOT NULL)
+                      )
+                  )
+                ORDER BY j.id
+                LIMIT ?
+            ) AND delivering_at IS NULL
+            RETURNING *
+            """,
+                (now, now, DONE, FAILED, PENDING, RUNNING, DONE, FAILED, limit),
+            )
+            .fetchall()
+        )
+        return sorted((dict(row) for row in rows), key=lambda job: job["id"])
+
+    def release_delivery(self, job_ids: Iterable[int] | None = None) -> int:
+        """
+        Возвращает неотправленные задачи в очередь отправки: job_ids или
+        все отправлявшиеся (после перезапуска бота)
+        """
+        query = (
+            "UPDATE jobs SET delivering_at = NULL, updated_at = ? "
+            "WHERE status IN (?, ?) AND delivering_at IS NOT NULL"
+        )
+        params: list[Any] = [time.time(), DONE, FAILED]
+        if job_ids is not None:
+            ids = list(job_ids)
+            query += f" AND id IN ({', '.join('?' for _ in ids)})"
+            params += ids
+        return self._connect().execute(query, params).rowcount
+
+    def mark_delivered(self, job_id: int):
+        """Ответ отправлен: файлы задачи больше не нужны"""
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (DELIVERED, time.time(), job_id),
+        )
+
+    def purge(self, older_than: float) -> int:
+        """Удаление давно доставленных задач"""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status = ? AND updated_at < ?",
+            (DELIVERED, time.time() - older_than),
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        """Количество задач по статусам"""
+        rows = (
+            self._connect()
+            .execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            .fetchall()
+        )
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def check_result(job: dict[str, Any]) -> dict[str, int] | None:
+        """Итоги проверки кодов задачи или None"""
+        return json.loads(job["check_result"]) if job.get("check_result") else None
+
+    @staticmethod
+    def result_paths(job: dict[str, Any]) -> list[str]:
+        """Пути к частям результата задачи по порядку"""
+        return json.loads(job["result_path"]) if job.get("result_path") else []
+
+    @classmethod
+    def remove_files(cls, job: dict[str, Any]):
+        for path in (job.get("input_path"), *cls.result_paths(job)):
+            if path:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
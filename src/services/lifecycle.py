@@ -1,10 +1,19 @@
-import sys
-import logging
 import asyncio
+import logging
+import sys
+from collections.abc import Awaitable, Callable
 from pathlib import Path
+from typing import Any
+
 from aiogram import Bot
-from services.reference_book import ReferenceBook
+
 from services.batch_manager import BatchManager
+from services.metrics import MetricsServer
+from services.reference_book import ReferenceBook
+from services.reference_watcher import ReferenceWatcher
+from services.result_publisher import ResultPublisher
+from services.startup import startup
+from services.worker_pool import WorkerPool
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +27,30 @@ class LifecycleManager:
         reference_path: Path,
         temp_dir: Path,
         batch_manager: BatchManager,
+        worker_pool: WorkerPool,
+        reference_watcher: ReferenceWatcher,
+        snapshot_path: Path | None = None,
+        webhook_url: str | None = None,
+        webhook_secret: str | None = None,
+        metrics_server: MetricsServer | None = None,
+        result_publisher: ResultPublisher | None = None,
     ):
         self.bot = bot
         self.reference_path = reference_path
         self.temp_dir = temp_dir
         self.batch_manager = batch_manager
+        self.worker_pool = worker_pool
+        self.snapshot_path = snapshot_path
+        self.reference_watcher = reference_watcher
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.metrics_server = metrics_server
+        self.result_publisher = result_publisher
+        self._loading: asyncio.Task | None = None
+        # Остановка приема обновлений (задается в main под режим работы)
+        # и признак, что бот остановлен из-за ошибки запуска
+        self.stop_bot: Callable[[], Awaitable[Any]] | None = None
+        self.failed = False
 
     async def on_startup(self):
         """Инициализация при запуске бота"""
@@ -33,60 +61,94 @@ class LifecycleManager:
             logger.error("ОШИБКА: Справочник не найден: %s", self.reference_path)
             sys.exit(1)
 
-        # Загрузка справочника
+        # Справочник загружается в фоне: обновления принимаются сразу,
+        # а файлы ждут его готовности (ReferenceBook.wait_ready)
+        self._loading = asyncio.create_task(self._load_reference())
+
+        # Запуск фоновых задач
+        self.batch_manager.start()
+
+        # Отправка результатов надежной очереди, в том числе оставшихся
+        # с прошлого запуска
+        if self.result_publisher:
+            asyncio.create_task(self.result_publisher.run())
+
+        # Эндпоинт метрик
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+        # Регистрация webhook в Telegram (только после готовности к приему)
+        if self.webhook_url:
+            await self.bot.set_webhook(
+                self.webhook_url,
+                secret_token=self.webhook_secret,
+                drop_pending_updates=False,
+            )
+            logger.info("Webhook зарегистрирован: %s", self.webhook_url)
+
+        startup.mark("бот принимает обновления")
+
+    async def _load_reference(self):
+        """Загрузка справочника, затем запуск пула и наблюдения за файлом"""
         try:
-            await ReferenceBook.load(self.reference_path)
+            await ReferenceBook.load(
+                self.reference_path, snapshot_path=self.snapshot_path
+            )
         except PermissionError:
-            logger.error(
+            await self._fail(
                 "ОШИБКА: Нет доступа к файлу справочника: %s", self.reference_path
             )
-            sys.exit(1)
-        except Exception as e:
-            logger.error("ОШИБКА при загрузке справочника: %s", e)
-            sys.exit(1)
+            return
+        except Exception as e:  # noqa: BLE001
+            await self._fail("ОШИБКА при загрузке справочника: %s", e)
+            return
 
         # Проверка, что справочник не пуст
         if ReferenceBook.is_empty():
-            logger.error("ОШИБКА: Справочник пуст (нет данных)")
-            sys.exit(1)
+            await self._fail("ОШИБКА: Справочник пуст (нет данных)")
+            return
 
         logger.info("Справочник загружен: %s записей", ReferenceBook.get_cache_size())
-
-        # Запуск фоновых задач
-        asyncio.create_task(self._reference_refresher())
-        asyncio.create_task(self.batch_manager.cleanup_old_states())
-
-    async def _reference_refresher(self):
-        """Фоновое обновление справочника каждые 8 часов"""
-        while True:
-            try:
-                await asyncio.sleep(ReferenceBook.get_cache_lifetime_seconds())
-                await ReferenceBook.load(self.reference_path)
-
-                if ReferenceBook.is_empty():
-                    logger.warning("ПРЕДУПРЕЖДЕНИЕ: Справочник обновлен, но пуст")
-                else:
-                    logger.info(
-                        "Справочник обновлен: %s записей",
-                        ReferenceBook.get_cache_size(),
-                    )
-            except PermissionError:
-                logger.error("Ошибка доступа к справочнику: %s", self.reference_path)
-                await asyncio.sleep(60)
-            except Exception as e:
-                logger.error("Ошибка обновления справочника: %s", e)
-                await asyncio.sleep(60)
+        startup.mark("справочник загружен")
+
+        # Пул запускается после загрузки: до нее файлы все равно ждут
+        # справочник, а процессы воркеров не отнимают память и CPU у загрузки
+        self.worker_pool.start()
+        asyncio.create_task(self.reference_watcher.run())
+
+    async def _fail(self, message: str, *args):
+        """
+        Остановка бота при ошибке фоновой загрузки справочника.
+
+        sys.exit в фоновой задаче остановил бы только саму задачу: бот
+        продолжил бы принимать файлы, которые никогда не обработаются.
+        Поэтому останавливается прием обновлений, а main по флагу failed
+        завершает процесс с ошибкой.
+        """
+        logger.error(message, *args)
+        self.failed = True
+        if self.stop_bot is not None:
+            await self.stop_bot()
 
     async def on_shutdown(self):
         """Завершение работы бота"""
         logger.info("Завершение работы бота...")
 
+        # Остановка загрузки справочника, планировщика сводок и пула обработки
+        if self._loading is not None:
+            self._loading.cancel()
+        self.batch_manager.stop()
+        self.worker_pool.shutdown()
+
+        if self.metrics_server:
+            await self.metrics_server.stop()
+
         # Очистка временных файлов
         for file in self.temp_dir.glob("*"):
             try:
                 file.unlink()
                 logger.debug("Удален временный файл: %s", file)
-            except Exception as e:
+            except OSError as e:
                 logger.error("Ошибка удаления %s: %s", file, e)
 
         # Закрытие сессии бота
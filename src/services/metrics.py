@@ -0,0 +1,246 @@
+import bisect
+import logging
+import time
+from collections.abc import Callable
+from contextlib import nullcontext
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм длительности, секунд
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+_NOOP = nullcontext()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(
+    names: tuple[str, ...], values: tuple[str, ...], extra: str = ""
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Монотонный счетчик с метками"""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами и метками"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счетчики по корзинам (последняя — +Inf), сумма]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Значение, вычисляемое в момент запроса /metrics"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        try:
+            value = float(self.callback())
+        except Exception as e:
+            logger.debug("Не удалось получить %s: %s", self.name, e, exc_info=True)
+            return []
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {value:g}",
+        ]
+
+
+class _StageTimer:
+    """Контекстный менеджер: длительность блока в гистограмму этапов"""
+
+    __slots__ = ("_metrics", "_stage", "_started")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.stage_seconds.observe(
+            time.perf_counter() - self._started, self._stage
+        )
+        return False
+
+
+class Metrics:
+    """
+    Метрики обработки файлов в формате Prometheus.
+
+    Пока метрики не включены, все методы сразу возвращаются, а stage()
+    отдает общий пустой контекстный менеджер.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stage_seconds = Histogram(
+            "tg_bot_stage_seconds",
+            "Duration of file processing stages",
+            ("stage",),
+        )
+        self.files = Counter(
+            "tg_bot_files_total", "Processed files by result", ("result",)
+        )
+        self.rows = Counter("tg_bot_rows_total", "Codes written to result files")
+        self.errors = Counter(
+            "tg_bot_errors_total", "Processing errors by exception type", ("type",)
+        )
+        self._gauges: list[Gauge] = []
+
+    def enable(self):
+        self.enabled = True
+
+    def stage(self, name: str):
+        """Замер этапа: with metrics.stage("download"): ..."""
+        if not self.enabled:
+            return _NOOP
+        return _StageTimer(self, name)
+
+    def observe_stage(self, name: str, seconds: float):
+        if self.enabled:
+            self.stage_seconds.observe(seconds, name)
+
+    def observe_stats(self, stats: dict[str, float] | None):
+        """Замеры, вернувшиеся из воркера: длительности этапов и число строк"""
+        if not self.enabled or not stats:
+            return
+        for name, value in stats.items():
+            if name == "rows":
+                self.rows.inc(amount=value)
+            else:
+                self.stage_seconds.observe(value, name)
+
+    def count_file(self, result: str):
+        if self.enabled:
+            self.files.inc(result)
+
+    def count_error(self, error: BaseException):
+        if self.enabled:
+            self.errors.inc(type(error).__name__)
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]):
+        """Регистрация значения, которое читается при каждом запросе /metrics"""
+        self._gauges.append(Gauge(name, documentation, callback))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in (self.stage_seconds, self.files, self.rows, self.errors):
+            lines.extend(metric.render())
+        for gauge in self._gauges:
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsServer:
+    """Локальный HTTP-эндпоинт /metrics"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Метрики доступны на http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
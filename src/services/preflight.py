@@ -0,0 +1,168 @@
+import re
+import zipfile
+from pathlib import Path
+from typing import BinaryIO
+from xml.etree import ElementTree
+
+from services.code_readers import ZIP_MAGIC, read_head
+from services.xlsx_stream import XlsxStreamReader, column_index
+
+Source = Path | BinaryIO
+
+MB = 1024 * 1024
+# Элемент dimension стоит в начале листа, до sheetData: дальше не читаем
+SHEET_HEAD_SIZE = 64 * 1024
+# Диапазон A1:C10 (абсолютные ссылки тоже) или одна ячейка A1; ссылки
+# другого вида (целые строки и столбцы, пустые) не разбираются
+DIMENSION_RE = re.compile(
+    rb'<(?:\w+:)?dimension\s+ref="\$?([A-Z]{1,3})\$?(\d+)'
+    rb'(?::\$?([A-Z]{1,3})\$?(\d+))?"'
+)
+SHEET_DATA_RE = re.compile(rb"<(?:\w+:)?sheetData[\s/>]")
+# Маленькие файлы сжимаются сильно и без умысла: степень сжатия
+# проверяется только для архивов, распаковывающихся больше чем в это
+RATIO_MIN_BYTES = 16 * MB
+
+
+def _count(value: int) -> str:
+    """Число с пробелами между разрядами: 1 048 576"""
+    return f"{value:,}".replace(",", " ")
+
+
+class PreflightError(ValueError):
+    """Файл отклонен до разбора; текст — сообщение пользователю"""
+
+
+class Preflight:
+    """
+    Дешевая проверка размера и формы файла до разбора таблицы.
+
+    Смотрит размер из метаданных Telegram, оглавление zip (размеры частей
+    до и после распаковки — без распаковки данных) и элемент dimension в
+    начале листа xlsx. Слишком большие файлы и похожие на zip-бомбы
+    отклоняются с PreflightError, тяжелые — отправляются в медленную
+    очередь (check_size и inspect возвращают True).
+    """
+
+    def __init__(
+        self,
+        max_file_bytes: int = 0,
+        max_unpacked_bytes: int = 0,
+        max_ratio: float = 0,
+        max_cells: int = 0,
+        slow_bytes: int = 0,
+        slow_cells: int = 0,
+    ):
+        # Нулевой предел — проверка выключена
+        self.max_file_bytes = max_file_bytes
+        self.max_unpacked_bytes = max_unpacked_bytes
+        self.max_ratio = max_ratio
+        self.max_cells = max_cells
+        self.slow_bytes = slow_bytes
+        self.slow_cells = slow_cells
+
+    def check_size(self, file_size: int | None) -> bool:
+        """
+        Проверка по размеру из метаданных документа, до скачивания.
+
+        Returns:
+            bool: Файл тяжелый — обрабатывать в медленной очереди
+
+        Raises:
+            PreflightError: Файл больше max_file_bytes
+        """
+        if not file_size:
+            return False
+        if self.max_file_bytes and file_size > self.max_file_bytes:
+            raise PreflightError(
+                f"Файл слишком большой: {file_size / MB:.1f} МБ "
+                f"(не больше {self.max_file_bytes / MB:.0f} МБ)"
+            )
+        return bool(self.slow_bytes) and file_size > self.slow_bytes
+
+    def inspect(self, source: Source) -> bool:
+        """
+        Проверка скачанной таблицы: оглавление zip и размеры листа xlsx.
+        Файлы не в zip (xls, csv) проверяются только по размеру.
+
+        Returns:
+            bool: Файл тяжелый — обрабатывать в медленной очереди
+
+        Raises:
+            PreflightError: Файл превышает пределы
+        """
+        if not isinstance(source, (str, Path)):
+            source.seek(0)
+        if not read_head(source, len(ZIP_MAGIC)).startswith(ZIP_MAGIC):
+            return False
+        try:
+            archive = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            # Поврежденный файл — сообщение даст читатель таблицы
+            return False
+
+        with archive:
+            slow = self.check_archive(archive)
+            if "xl/workbook.xml" in archive.NameToInfo:
+                slow = self._check_sheet(archive) or slow
+        return slow
+
+    def check_archive(self, archive: zipfile.ZipFile) -> bool:
+        """
+        Размер после распаковки и степень сжатия по оглавлению zip.
+
+        Returns:
+            bool: Распакованный размер больше slow_bytes
+        """
+        unpacked = sum(info.file_size for info in archive.infolist())
+        packed = sum(info.compress_size for info in archive.infolist())
+
+        if self.max_unpacked_bytes and unpacked > self.max_unpacked_bytes:
+            raise PreflightError(
+                f"Файл слишком большой после распаковки: {unpacked / MB:.0f} МБ "
+                f"(не больше {self.max_unpacked_bytes / MB:.0f} МБ)"
+            )
+        ratio = unpacked / max(packed, 1)
+        if self.max_ratio and unpacked > RATIO_MIN_BYTES and ratio > self.max_ratio:
+            raise PreflightError(
+                f"Файл сжат подозрительно сильно (в {ratio:.0f} раз) "
+                "и не будет обработан"
+            )
+        return bool(self.slow_bytes) and unpacked > self.slow_bytes
+
+    def _check_sheet(self, archive: zipfile.ZipFile) -> bool:
+        """
+        Диапазон первого листа из элемента dimension (распаковывается
+        только начало листа). Лишние заполненные ячейки далеко от данных
+        раздувают диапазон — о них и говорит сообщение.
+        """
+        try:
+            sheet_path = XlsxStreamReader.locate_parts(archive)[0]
+            with archive.open(sheet_path) as sheet:
+                head = sheet.read(SHEET_HEAD_SIZE)
+        except (KeyError, ValueError, ElementTree.ParseError, zipfile.BadZipFile):
+            return False
+
+        data_start = SHEET_DATA_RE.search(head)
+        match = DIMENSION_RE.search(
+            head, 0, data_start.start() if data_start else len(head)
+        )
+        if match is None:
+            return False
+
+        first_col, first_row, last_col, last_row = match.groups()
+        if last_col is None:
+            # Одна ячейка: диапазон из нее самой
+            last_col, last_row = first_col, first_row
+        rows = int(last_row) - int(first_row) + 1
+        columns = column_index(last_col.decode()) - column_index(first_col.decode()) + 1
+        cells = rows * columns
+
+        if self.max_cells and cells > self.max_cells:
+            ref = match.group(0).split(b'"')[1].decode()
+            raise PreflightError(
+                f"Лист слишком большой: диапазон {ref} — {_count(cells)} ячеек "
+                f"(не больше {_count(self.max_cells)}). Удалите лишние строки "
+                "и столбцы или оставьте только коды в столбце B"
+            )
+        return bool(self.slow_cells) and cells > self.slow_cells
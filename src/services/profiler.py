@@ -0,0 +1,185 @@
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import tracemalloc
+import zipfile
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Модули конвейера обработки, по которым строится основной срез профиля
+PIPELINE_RE = r"file_processor|reference_book|reference_store|code_readers|xlsx_stream"
+
+
+def profiled_call(fn: Callable[..., Any], *args: Any) -> tuple[Any, dict]:
+    """Вызов fn(*args) под cProfile в воркере: (результат, статистика cProfile)"""
+    profile = cProfile.Profile()
+    result = profile.runcall(fn, *args)
+    profile.create_stats()
+    return result, profile.stats
+
+
+class _RawStats:
+    """Статистика из воркера в виде, который принимает pstats.Stats.add"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Profiler:
+    """
+    Профилирование работающего бота по команде администратора.
+
+    На время сессии включаются cProfile в потоке event loop (поиск штрихкода,
+    обработчики), cProfile вокруг каждой задачи пула воркеров (WorkerPool
+    проверяет флаг active), tracemalloc и замер задержки event loop. Вне
+    сессии ничего из этого не работает: остается только проверка флага.
+    """
+
+    def __init__(self, top: int = 40, lag_interval: float = 0.1):
+        self.active = False
+        self.top = top
+        self.lag_interval = lag_interval
+        self._worker_stats: list[dict] = []
+        self._worker_calls = 0
+
+    def add_worker_stats(self, stats: dict):
+        """Статистика задачи пула, выполненной во время сессии"""
+        if self.active:
+            self._worker_stats.append(stats)
+            self._worker_calls += 1
+
+    async def run(self, duration: float) -> tuple[bytes, str]:
+        """
+        Сессия профилирования на duration секунд.
+
+        Returns:
+            tuple: (zip-архив с отчетами, краткая сводка)
+
+        Raises:
+            RuntimeError: Если сессия уже идет
+        """
+        if self.active:
+            raise RuntimeError("Профилирование уже запущено")
+        self.active = True
+        self._worker_stats = []
+        self._worker_calls = 0
+        logger.info("Профилирование запущено на %s с", duration)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        lag: list[tuple[float, float]] = []
+        try:
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+            lag_task = asyncio.create_task(self._trace_lag(lag))
+            profile.enable()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                profile.disable()
+                lag_task.cancel()
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.active = False
+
+        worker_stats, calls = self._worker_stats, self._worker_calls
+        self._worker_stats = []
+        report = await asyncio.to_thread(
+            self._build_report, profile, worker_stats, before, after, lag, duration
+        )
+        max_lag = max((value for _, value in lag), default=0.0)
+        summary = (
+            f"Профиль за {duration:g} с\n"
+            f"Задач пула: {calls}\n"
+            f"Макс. задержка event loop: {max_lag * 1000:.0f} мс"
+        )
+        logger.info("Профилирование завершено: задач пула %s", calls)
+        return report, summary
+
+    async def _trace_lag(self, samples: list[tuple[float, float]]):
+        """Насколько позже срока просыпается цикл: (время от начала, задержка)"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            now = loop.time()
+            samples.append((now - start, max(0.0, now - expected)))
+
+    def _build_report(
+        self,
+        profile: cProfile.Profile,
+        worker_stats: list[dict],
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        lag: list[tuple[float, float]],
+        duration: float,
+    ) -> bytes:
+        """
+        Архив отчетов: profile.txt (срезы cProfile), profile.pstats (для
+        snakeviz и pstats), memory.txt (рост памяти по строкам кода),
+        loop_lag.csv (задержка event loop во времени)
+        """
+        text = io.StringIO()
+        stats = pstats.Stats(profile, stream=text)
+        for raw in worker_stats:
+            stats.add(_RawStats(raw))
+
+        text.write(
+            f"Профиль за {duration:g} с: event loop и {len(worker_stats)} задач пула\n"
+            "Под профилировщиком код работает медленнее, задержки завышены\n\n"
+            "=== Конвейер обработки (FileProcessor, ReferenceBook), cumulative ===\n"
+        )
+        stats.sort_stats("cumulative").print_stats(PIPELINE_RE, self.top)
+        text.write("\n=== Все функции, tottime ===\n")
+        stats.sort_stats("tottime").print_stats(self.top)
+
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+        growth = after.filter_traces(ignore).compare_to(
+            before.filter_traces(ignore), "lineno"
+        )
+        memory = "\n".join(str(stat) for stat in growth[: self.top])
+
+        values = sorted(value for _, value in lag)
+        lag_lines = ["elapsed_s,lag_ms"]
+        lag_lines += [f"{elapsed:.3f},{value * 1000:.1f}" for elapsed, value in lag]
+        lag_summary = ""
+        if values:
+            p50 = self._percentile(values, 50) * 1000
+            p99 = self._percentile(values, 99) * 1000
+            lag_summary = (
+                f"Задержка event loop: p50 {p50:.1f} мс, p99 {p99:.1f} мс, "
+                f"макс. {values[-1] * 1000:.1f} мс\n"
+            )
+
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("profile.txt", lag_summary + text.getvalue())
+            archive.writestr("profile.pstats", marshal.dumps(stats.stats))
+            archive.writestr(
+                "memory.txt", f"Рост памяти за сессию (top {self.top})\n{memory}\n"
+            )
+            archive.writestr("loop_lag.csv", "\n".join(lag_lines) + "\n")
+        return output.getvalue()
+
+    @staticmethod
+    def _percentile(values: list[float], q: float) -> float:
+        return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+profiler = Profiler()
@@ -1,9 +1,13 @@
 import asyncio
+import hashlib
 import logging
-from pathlib import Path
-from typing import Dict, Optional
+import os
+import time
+from collections.abc import Mapping
 from datetime import datetime, timedelta
-import pandas as pd
+from pathlib import Path
+
+from services.reference_store import PackedReferenceStore
 
 logger = logging.getLogger(__name__)
 
@@ -11,15 +15,31 @@ logger = logging.getLogger(__name__)
 class ReferenceBook:
     """Класс для хранения справочника"""
 
-    _cache: Dict[str, str] = {}
+    _cache: Mapping[str, str] = {}
+    _backend = "dict"
     _loaded = False
     _lock = asyncio.Lock()
-    _last_load_time: Optional[datetime] = None
+    # Первая загрузка завершена: файлы, пришедшие раньше, ждут этого события
+    _ready = asyncio.Event()
+    _last_load_time: datetime | None = None
     _cache_lifetime = timedelta(hours=8)
+    _version: str | None = None
 
     @classmethod
-    async def load(cls, path: Path, force: bool = False):
-        """Предзагрузка справочника при старте приложения с кэшированием на 8 часов"""
+    async def load(
+        cls, path: Path, force: bool = False, snapshot_path: Path | None = None
+    ):
+        """
+        Предзагрузка справочника при старте приложения с кэшированием на 8 часов.
+
+        Если задан snapshot_path, справочник берется из бинарного снимка,
+        пока исходный файл не изменился (размер, mtime, sha256), иначе
+        xlsx разбирается заново и снимок перезаписывается.
+
+        Новый словарь строится в фоновом потоке и подменяет старый одним
+        присваиванием, поэтому get_barcode не блокируется и не видит
+        частично заполненный кэш.
+        """
         async with cls._lock:
             if not force and cls._loaded and cls._last_load_time:
                 time_since_load = datetime.now() - cls._last_load_time
@@ -30,27 +50,172 @@ class ReferenceBook:
                     return
 
             logger.info("Начинаем загрузку справочника...")
-            df = pd.read_excel(path, usecols=[0, 5], dtype=str, engine="openpyxl")
-            df.dropna(inplace=True)
-            df.iloc[:, 0] = df.iloc[:, 0].str.strip().str.upper()
-            df.iloc[:, 1] = df.iloc[:, 1].str.strip()
+            started = time.perf_counter()
+            old_cache = cls._cache
+            new_cache, version, diff = await asyncio.to_thread(
+                cls._build, path, snapshot_path, old_cache
+            )
 
-            new_cache = dict(zip(df.iloc[:, 0], df.iloc[:, 1]))
-
-            if not new_cache and cls._cache:
+            if not new_cache and old_cache:
                 logger.warning("Новый справочник пуст, оставляем старый кэш")
                 return
 
             cls._cache = new_cache
+            cls._version = version
             cls._loaded = True
             cls._last_load_time = datetime.now()
-            logger.info("Справочник успешно загружен: %s записей", len(cls._cache))
+            cls._ready.set()
+            logger.info(
+                "Справочник успешно загружен за %.2f с: %s записей "
+                "(добавлено %s, удалено %s, изменено %s)",
+                time.perf_counter() - started,
+                len(new_cache),
+                *diff,
+            )
 
     @classmethod
-    def get_barcode(cls, article: str) -> Optional[str]:
+    def _build(
+        cls, path: Path, snapshot_path: Path | None, old_cache: Mapping[str, str]
+    ) -> tuple[Mapping[str, str], str, tuple[int, int, int]]:
+        """
+        Сборка нового кэша (выполняется вне event loop).
+
+        Returns:
+            tuple: (кэш, версия, (добавлено, удалено, изменено))
+        """
+        stat = path.stat()
+        new_cache = version = None
+
+        if snapshot_path:
+            new_cache, version = cls._read_snapshot(snapshot_path, path, stat)
+
+        if new_cache is None:
+            version = cls._file_hash(path)
+            new_cache = cls._read_source(path)
+            if snapshot_path and new_cache:
+                written = cls._write_snapshot(snapshot_path, new_cache, stat, version)
+                if written and cls._backend == "mmap":
+                    new_cache = PackedReferenceStore(snapshot_path)
+
+        return new_cache, version, cls._diff(old_cache, new_cache)
+
+    @staticmethod
+    def _diff(old: Mapping[str, str], new: Mapping[str, str]) -> tuple[int, int, int]:
+        """Количество добавленных, удаленных и измененных артикулов"""
+        if not isinstance(old, dict):
+            old = dict(old.items())
+        new_keys = set(new.keys())
+        added = len(new_keys - old.keys())
+        removed = len(old.keys() - new_keys)
+        changed = sum(
+            1
+            for article, barcode in new.items()
+            if old.get(article, barcode) != barcode
+        )
+        return added, removed, changed
+
+    @staticmethod
+    def _read_source(path: Path) -> dict[str, str]:
+        """Полный разбор xlsx справочника: столбец A — артикул, F — штрихкод"""
+        # pandas нужен только при разборе исходного файла: со снимком
+        # справочника бот запускается без его импорта
+        import pandas as pd
+
+        df = pd.read_excel(path, usecols=[0, 5], dtype=str, engine="openpyxl")
+        df.dropna(inplace=True)
+        df.iloc[:, 0] = df.iloc[:, 0].str.strip().str.upper()
+        df.iloc[:, 1] = df.iloc[:, 1].str.strip()
+
+        return dict(zip(df.iloc[:, 0], df.iloc[:, 1]))
+
+    @staticmethod
+    def _file_hash(path: Path) -> str:
+        """sha256 исходного файла справочника"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _read_snapshot(
+        cls, snapshot_path: Path, source_path: Path, stat: os.stat_result
+    ) -> tuple[Mapping[str, str] | None, str | None]:
+        """
+        Загрузка снимка, если он соответствует исходному файлу.
+
+        Совпадение размера и mtime принимается сразу; если изменился только
+        mtime, сверяется sha256 и ключ снимка обновляется.
+
+        Returns:
+            tuple: (кэш или None, версия справочника)
+        """
+        header = PackedReferenceStore.read_header(snapshot_path)
+        if header is None:
+            return None, None
+
+        size, mtime_ns, version = header
+        if size != stat.st_size:
+            return None, None
+
+        if mtime_ns != stat.st_mtime_ns:
+            if cls._file_hash(source_path) != version:
+                return None, None
+            logger.info("Справочник не изменился (совпал sha256), обновляем снимок")
+            PackedReferenceStore.update_key(snapshot_path, size, stat.st_mtime_ns)
+
+        try:
+            store = PackedReferenceStore(snapshot_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Снимок справочника поврежден: %s", e)
+            return None, None
+
+        logger.info("Справочник загружен из снимка %s", snapshot_path)
+        if cls._backend == "mmap":
+            return store, version
+        return store.to_dict(), version
+
+    @staticmethod
+    def _write_snapshot(
+        snapshot_path: Path, cache: dict[str, str], stat: os.stat_result, version: str
+    ) -> bool:
+        """Атомарная запись снимка справочника рядом с временной директорией"""
+        try:
+            PackedReferenceStore.write(
+                snapshot_path, cache, stat.st_size, stat.st_mtime_ns, version
+            )
+        except OSError as e:
+            logger.warning("Не удалось сохранить снимок справочника: %s", e)
+            return False
+
+        logger.info("Снимок справочника сохранен: %s", snapshot_path)
+        return True
+
+    @classmethod
+    def configure(cls, backend: str = "dict"):
+        """
+        Выбор хранилища кэша: dict (словарь в памяти процесса) или mmap
+        (упакованный снимок вместо словаря; нужен snapshot_path)
+        """
+        if backend not in ("dict", "mmap"):
+            raise ValueError(f"Неизвестное хранилище справочника: {backend}")
+        cls._backend = backend
+
+    @classmethod
+    def get_barcode(cls, article: str) -> str | None:
         """Синхронный метод — теперь можно! Кэш уже гарантированно загружен"""
         return cls._cache.get(str(article).strip().upper())
 
+    @classmethod
+    async def wait_ready(cls):
+        """Ожидание первой загрузки справочника (сразу, если уже загружен)"""
+        if not cls._ready.is_set():
+            await cls._ready.wait()
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return cls._ready.is_set()
+
     @classmethod
     def is_empty(cls) -> bool:
         """Проверка, пуст ли справочник"""
@@ -61,6 +226,18 @@ class ReferenceBook:
         """Получить количество записей в справочнике"""
         return len(cls._cache)
 
+    @classmethod
+    def get_version(cls) -> str | None:
+        """Версия справочника (sha256 исходного файла)"""
+        return cls._version
+
+    @classmethod
+    def get_age_seconds(cls) -> float | None:
+        """Сколько секунд назад справочник был загружен (None — не загружался)"""
+        if cls._last_load_time is None:
+            return None
+        return (datetime.now() - cls._last_load_time).total_seconds()
+
     @classmethod
     def get_cache_lifetime_seconds(cls) -> float:
         """Получить время жизни кэша в секундах"""
@@ -0,0 +1,181 @@
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+
+# Формат файла: заголовок, смещения ключей и значений (uint64, count + 1),
+# хэш-индекс (uint64, номер записи + 1, открытая адресация по crc32),
+# затем ключи (отсортированы побайтно) и значения в UTF-8, каждое с \0 в конце
+STORE_MAGIC = b"RBPACK02"
+STORE_HEADER = struct.Struct("<8sQQ32sQQQQ")
+
+
+class PackedReferenceStore(Mapping):
+    """
+    Справочник в виде упакованных отсортированных массивов в mmap-файле.
+
+    Поиск — по статическому хэш-индексу, O(1). Файл открывается только
+    на чтение, поэтому страницы разделяются между всеми процессами,
+    отобразившими один и тот же файл.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            self.source_size,
+            self.source_mtime_ns,
+            digest,
+            self._count,
+            table_size,
+            keys_len,
+            values_len,
+        ) = STORE_HEADER.unpack_from(self._mmap)
+        if magic != STORE_MAGIC:
+            raise ValueError(f"Неизвестный формат снимка справочника: {path}")
+        self.version = digest.hex()
+
+        offsets_len = (self._count + 1) * 8
+        view = memoryview(self._mmap)
+        pos = STORE_HEADER.size
+        self._key_offsets = view[pos : pos + offsets_len].cast("Q")
+        pos += offsets_len
+        self._value_offsets = view[pos : pos + offsets_len].cast("Q")
+        pos += offsets_len
+        self._table = view[pos : pos + table_size * 8].cast("Q")
+        self._mask = table_size - 1
+        pos += table_size * 8
+        self._keys_base = pos
+        self._values_base = pos + keys_len
+        if self._values_base + values_len > len(self._mmap):
+            raise ValueError(f"Снимок справочника поврежден: {path}")
+
+    @staticmethod
+    def read_header(path: Path) -> tuple[int, int, str] | None:
+        """Ключ снимка без его отображения: (размер, mtime_ns, sha256)"""
+        try:
+            with open(path, "rb") as f:
+                magic, size, mtime_ns, digest, *_ = STORE_HEADER.unpack(
+                    f.read(STORE_HEADER.size)
+                )
+        except (OSError, struct.error):
+            return None
+        if magic != STORE_MAGIC:
+            return None
+        return size, mtime_ns, digest.hex()
+
+    @staticmethod
+    def update_key(path: Path, size: int, mtime_ns: int):
+        """Обновление размера и mtime источника в заголовке на месте"""
+        with open(path, "r+b") as f:
+            f.seek(len(STORE_MAGIC))
+            f.write(struct.pack("<QQ", size, mtime_ns))
+
+    @staticmethod
+    def write(
+        path: Path, cache: dict[str, str], size: int, mtime_ns: int, version: str
+    ):
+        """Атомарная запись словаря в упакованном виде"""
+        items = sorted((k.encode(), v.encode()) for k, v in cache.items())
+
+        key_offsets = array("Q", [0])
+        value_offsets = array("Q", [0])
+        for key, value in items:
+            key_offsets.append(key_offsets[-1] + len(key) + 1)
+            value_offsets.append(value_offsets[-1] + len(value) + 1)
+
+        # Таблица минимум вдвое больше числа записей: в среднем 1-2 пробы
+        table_size = 1 << max(1, (2 * len(items)).bit_length())
+        mask = table_size - 1
+        table = array("Q", bytes(table_size * 8))
+        for index, (key, _) in enumerate(items):
+            slot = zlib.crc32(key) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = index + 1
+
+        keys = b"".join(key + b"\0" for key, _ in items)
+        values = b"".join(value + b"\0" for _, value in items)
+        header = STORE_HEADER.pack(
+            STORE_MAGIC,
+            size,
+            mtime_ns,
+            bytes.fromhex(version),
+            len(items),
+            table_size,
+            len(keys),
+            len(values),
+        )
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(key_offsets.tobytes())
+            f.write(value_offsets.tobytes())
+            f.write(table.tobytes())
+            f.write(keys)
+            f.write(values)
+        os.replace(tmp_path, path)
+
+    def _key(self, index: int) -> bytes:
+        start = self._keys_base + self._key_offsets[index]
+        end = self._keys_base + self._key_offsets[index + 1] - 1
+        return self._mmap[start:end]
+
+    def _value(self, index: int) -> str:
+        start = self._values_base + self._value_offsets[index]
+        end = self._values_base + self._value_offsets[index + 1] - 1
+        return self._mmap[start:end].decode()
+
+    def _find(self, key: str) -> int:
+        """Индекс ключа или -1"""
+        target = key.encode()
+        table, mask = self._table, self._mask
+        slot = zlib.crc32(target) & mask
+        while entry := table[slot]:
+            if self._key(entry - 1) == target:
+                return entry - 1
+            slot = (slot + 1) & mask
+        return -1
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        index = self._find(key)
+        return default if index < 0 else self._value(index)
+
+    def __getitem__(self, key: str) -> str:
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _blob(self, base: int, offsets) -> list[str]:
+        if not self._count:
+            return []
+        data = self._mmap[base : base + offsets[self._count] - 1]
+        return data.decode().split("\0")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._blob(self._keys_base, self._key_offsets))
+
+    def items(self):
+        return zip(
+            self._blob(self._keys_base, self._key_offsets),
+            self._blob(self._values_base, self._value_offsets),
+        )
+
+    def to_dict(self) -> dict[str, str]:
+        """Распаковка в обычный словарь"""
+        return dict(self.items())
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from services.reference_book import ReferenceBook
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceWatcher:
+    """Отслеживание изменений файла справочника и его перезагрузка"""
+
+    def __init__(
+        self,
+        reference_path: Path,
+        snapshot_path: Path | None = None,
+        poll_interval: float = 5.0,
+        debounce: float = 2.0,
+    ):
+        self.reference_path = reference_path
+        self.snapshot_path = snapshot_path
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+
+    def _signature(self) -> tuple[int, int] | None:
+        """Размер и mtime файла (None, если файл сейчас недоступен)"""
+        try:
+            stat = self.reference_path.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    async def _wait_until_stable(
+        self, signature: tuple[int, int]
+    ) -> tuple[int, int] | None:
+        """Ожидание, пока файл перестанет меняться (копирование завершено)"""
+        while True:
+            await asyncio.sleep(self.debounce)
+            current = self._signature()
+            if current == signature:
+                return signature
+            signature = current
+
+    async def run(self):
+        """Опрос файла справочника и перезагрузка при изменении"""
+        last_seen = self._signature()
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = self._signature()
+            if current is None or current == last_seen:
+                continue
+
+            logger.info("Обнаружено изменение справочника: %s", self.reference_path)
+            current = await self._wait_until_stable(current)
+            if current is None:
+                continue
+
+            try:
+                await ReferenceBook.load(
+                    self.reference_path, force=True, snapshot_path=self.snapshot_path
+                )
+                # После неудачной загрузки файл будет прочитан снова
+                # при следующем опросе, даже если больше не изменится
+                last_seen = current
+
+                if ReferenceBook.is_empty():
+                    logger.warning("ПРЕДУПРЕЖДЕНИЕ: Справочник обновлен, но пуст")
+            except PermissionError:
+                logger.error("Ошибка доступа к справочнику: %s", self.reference_path)
+            except Exception:
+                logger.exception("Ошибка обновления справочника")
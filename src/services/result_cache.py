@@ -0,0 +1,72 @@
+import logging
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    LRU-кэш уже отправленных результатов.
+
+    Ключ — file_unique_id входящего документа, артикул и версия
+    справочника; значение — file_id загруженного в Telegram результата,
+    поэтому повторный файл отправляется без скачивания и обработки.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(
+        file_unique_id: str, article: str, reference_version: str | None
+    ) -> tuple:
+        """Ключ кэша: содержимое файла, артикул и версия справочника"""
+        return file_unique_id, article, reference_version
+
+    def get(self, key: tuple) -> dict[str, Any] | None:
+        """Результат из кэша (или None) с учетом попаданий и промахов"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        logger.info(
+            "Кэш результатов: %s (попаданий %s, промахов %s, записей %s)",
+            "попадание" if entry else "промах",
+            self.hits,
+            self.misses,
+            len(self._entries),
+        )
+        return entry
+
+    def put(self, key: tuple, file_id: str, size: int = 0):
+        """Сохранить file_id отправленного результата"""
+        if not self.enabled:
+            return
+
+        if old := self._entries.pop(key, None):
+            self._total_bytes -= old["size"]
+
+        self._entries[key] = {"file_id": file_id, "size": size}
+        self._total_bytes += size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted["size"]
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+)
+from aiogram.types import FSInputFile, ReplyParameters
+
+from services.batch_manager import BatchManager
+from services.code_validator import CodeCheck, CodeValidator
+from services.file_processor import FileProcessor
+from services.job_queue import DONE, JobQueue
+from services.metrics import metrics
+from services.result_cache import ResultCache
+from services.send_queue import SendError, SendQueue
+
+logger = logging.getLogger(__name__)
+
+# Доставленные задачи хранятся сутки, затем удаляются из базы
+PURGE_AFTER = 24 * 3600
+# Ошибки, после которых повтор не поможет: бот заблокирован, чат удален,
+# запрос отклонен — результат считается недоставленным
+PERMANENT_ERRORS = (
+    SendError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+)
+
+
+class ResultPublisher:
+    """
+    Отправка результатов из надежной очереди.
+
+    Опрашивает JobQueue, отправляет готовые результаты и ошибки ответом на
+    исходное сообщение и помечает задачи доставленными. Ответы каждого
+    пользователя уходят строго по порядку задач, разные пользователи
+    обслуживаются параллельно: задачи забираются на отправку в SQLite
+    (claim_deliverable), и задачи пользователя не раздаются дважды. После
+    перезапуска бота недоставленные результаты отправляются автоматически.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        job_queue: JobQueue,
+        send_queue: SendQueue,
+        batch_manager: BatchManager,
+        result_cache: ResultCache,
+        poll_interval: float = 0.5,
+        max_attempts: int = 5,
+    ):
+        self.bot = bot
+        self.job_queue = job_queue
+        self.send_queue = send_queue
+        self.batch_manager = batch_manager
+        self.result_cache = result_cache
+        self.poll_interval = poll_interval
+        # Попыток отправки задачи при прочих ошибках, затем — не доставлена
+        self.max_attempts = max_attempts
+        self._tasks: set[asyncio.Task] = set()
+
+    async def run(self):
+        """Цикл опроса очереди"""
+        loop = asyncio.get_running_loop()
+        next_purge = loop.time()
+        # Отправка, прерванная остановкой бота, начинается заново
+        try:
+            await asyncio.to_thread(self.job_queue.release_delivery)
+        except Exception:
+            logger.exception("Ошибка чтения очереди задач")
+
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self.job_queue.claim_deliverable)
+                by_user: dict[int, list[dict[str, Any]]] = {}
+                for job in jobs:
+                    by_user.setdefault(job["user_id"], []).append(job)
+
+                for user_id, user_jobs in by_user.items():
+                    task = asyncio.create_task(self._deliver_user(user_id, user_jobs))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                if loop.time() >= next_purge:
+                    await asyncio.to_thread(self.job_queue.purge, PURGE_AFTER)
+                    next_purge = loop.time() + 3600
+            except Exception:
+                logger.exception("Ошибка чтения очереди задач")
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _deliver_user(self, user_id: int, jobs: list[dict[str, Any]]):
+        index = 0
+        try:
+            for index, job in enumerate(jobs):
+                try:
+                    await self._deliver(job)
+                except Exception as e:
+                    if job["delivery_attempts"] < self.max_attempts:
+                        raise
+                    logger.error(
+                        "Результат %s не доставлен за %s попыток: %s",
+                        job["file_name"],
+                        job["delivery_attempts"],
+                        e,
+                    )
+                    metrics.count_file("undelivered")
+                    await self._finish(
+                        job,
+                        {
+                            "filename": job["file_name"],
+                            "article": job["article"],
+                            "success": False,
+                            "error": str(e),
+                        },
+                    )
+        except Exception:
+            logger.exception("Ошибка отправки результатов пользователю %s", user_id)
+            # Неотправленные задачи вернутся в очередь отправки по порядку
+            try:
+                await asyncio.to_thread(
+                    self.job_queue.release_delivery,
+                    [job["id"] for job in jobs[index:]],
+                )
+            except Exception:
+                logger.exception("Ошибка чтения очереди задач")
+
+    async def _deliver(self, job: dict[str, Any]):
+        """Отправка одного результата или ошибки"""
+        chat_id = job["chat_id"]
+        file_name = job["file_name"]
+        reply_parameters = ReplyParameters(
+            message_id=job["message_id"], allow_sending_without_reply=True
+        )
+
+        result: dict[str, Any] = {"filename": file_name, "article": job["article"]}
+        # Повторы кодов между файлами пакета воркеры не ищут: хэши кодов
+        # остаются в процессе воркера, в задаче — только итоги файла
+        check = JobQueue.check_result(job)
+        if check is not None:
+            result["check"] = {**check, "batch_duplicates": 0}
+
+        if not job["result_file_id"] and self.batch_manager.is_archive_mode(
+            job["user_id"]
+        ):
+            # Режим архива: результат или ошибка попадут в архив пакета,
+            # файлы задачи удалит BatchManager после отправки архива
+            success = job["status"] == DONE
+            metrics.count_file("success" if success else "error")
+            result.update(
+                success=success,
+                error=job["error"],
+                result_paths=JobQueue.result_paths(job),
+                temp_input=job["input_path"],
+                in_archive=True,
+            )
+            await asyncio.to_thread(self.job_queue.mark_delivered, job["id"])
+            self.batch_manager.add_result(job["user_id"], result)
+            await self.batch_manager.schedule_batch(job["user_id"], chat_id)
+            return
+
+        try:
+            if job["status"] == DONE:
+                if job["result_file_id"]:
+                    documents = [job["result_file_id"]]
+                else:
+                    paths = JobQueue.result_paths(job)
+                    names = FileProcessor.result_filenames(job["article"], len(paths))
+                    documents = [
+                        FSInputFile(path, filename=name)
+                        for path, name in zip(paths, names)
+                    ]
+
+                caption = f"✅ {file_name}\nАртикул: {job['article']}"
+                if check is not None:
+                    caption += CodeValidator.describe(CodeCheck(hashes=None, **check))
+                for part, document in enumerate(documents, start=1):
+                    if len(documents) > 1:
+                        part_caption = f"{caption}\nЧасть {part} из {len(documents)}"
+                    else:
+                        part_caption = caption
+                    sent = await self.send_queue.send(
+                        chat_id,
+                        partial(
+                            self.bot.send_document,
+                            chat_id,
+                            document,
+                            caption=part_caption,
+                            reply_parameters=reply_parameters,
+                        ),
+                    )
+                # В кэше один file_id: результаты из нескольких частей не кэшируются
+                if not job["result_file_id"] and len(documents) == 1 and sent.document:
+                    self.result_cache.put(
+                        ResultCache.make_key(
+                            job["file_unique_id"],
+                            job["article"],
+                            job["reference_version"],
+                        ),
+                        sent.document.file_id,
+                        sent.document.file_size or 0,
+                    )
+                metrics.count_file("cached" if job["result_file_id"] else "success")
+                result["success"] = True
+            else:
+                await self.send_queue.send(
+                    chat_id,
+                    lambda: self.bot.send_message(
+                        chat_id,
+                        f"❌ {file_name}\n{job['error']}",
+                        reply_parameters=reply_parameters,
+                    ),
+                )
+                metrics.count_file("error")
+                result.update(success=False, error=job["error"])
+        except PERMANENT_ERRORS as e:
+            logger.error("Не удалось отправить результат %s: %s", file_name, e)
+            metrics.count_file("undelivered")
+            result.update(success=False, error=str(e))
+
+        await self._finish(job, result)
+
+    async def _finish(self, job: dict[str, Any], result: dict[str, Any]):
+        """Задача доставлена (или не будет доставлена): файлы удаляются"""
+        await asyncio.to_thread(self.job_queue.mark_delivered, job["id"])
+        JobQueue.remove_files(job)
+
+        self.batch_manager.add_result(job["user_id"], result)
+        await self.batch_manager.schedule_batch(job["user_id"], job["chat_id"])
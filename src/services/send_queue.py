@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from services.startup import startup
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SendError(Exception):
+    """Сообщение не удалось отправить: файл обработан, но не доставлен"""
+
+
+class SendQueue:
+    """
+    Исходящие запросы к Telegram с учетом лимитов.
+
+    Каждый запрос резервирует момент отправки (GCRA): не чаще chat_rate
+    в секунду в один чат с запасом chat_burst и не чаще global_rate в
+    секунду всего. RetryAfter приостанавливает чат на указанное время,
+    сетевые и серверные ошибки повторяются с экспоненциальной паузой
+    со случайным разбросом. После max_attempts попыток — SendError.
+    """
+
+    def __init__(
+        self,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        global_rate: float = 30.0,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.chat_interval = 1 / chat_rate
+        self.chat_tolerance = (chat_burst - 1) * self.chat_interval
+        self.global_interval = 1 / global_rate
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Теоретическое время следующей отправки по чатам и общее
+        self._chat_tat: dict[int, float] = {}
+        self._global_tat = 0.0
+        # Паузы чатов после RetryAfter и ошибок: запас chat_burst их не сокращает
+        self._paused_until: dict[int, float] = {}
+
+    def _reserve(self, chat_id: int) -> float:
+        """Через сколько секунд запрос укладывается в лимит своего чата"""
+        now = asyncio.get_running_loop().time()
+        chat_tat = self._chat_tat.get(chat_id, now)
+        at = max(
+            now,
+            chat_tat - self.chat_tolerance,
+            self._paused_until.get(chat_id, now),
+        )
+        self._chat_tat[chat_id] = max(chat_tat, at) + self.chat_interval
+
+        if len(self._chat_tat) > 10_000:
+            self._chat_tat = {c: t for c, t in self._chat_tat.items() if t > now}
+            self._paused_until = {
+                c: t for c, t in self._paused_until.items() if t > now
+            }
+        return at - now
+
+    def _reserve_global(self) -> float:
+        """
+        Через сколько секунд запрос укладывается в общий лимит.
+
+        Слот берется только когда чат уже готов к отправке: пауза одного
+        чата не сдвигает общую очередь и не задерживает остальные чаты.
+        """
+        now = asyncio.get_running_loop().time()
+        at = max(now, self._global_tat)
+        self._global_tat = at + self.global_interval
+        return at - now
+
+    def _pause_chat(self, chat_id: int, seconds: float):
+        now = asyncio.get_running_loop().time()
+        self._paused_until[chat_id] = max(
+            self._paused_until.get(chat_id, now), now + seconds
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def send(self, chat_id: int, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет request() в очереди чата.
+
+        Raises:
+            SendError: Если запрос не удался за max_attempts попыток
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            if delay := self._reserve(chat_id):
+                await asyncio.sleep(delay)
+            if delay := self._reserve_global():
+                await asyncio.sleep(delay)
+            try:
+                result = await request()
+                startup.first_reply()
+                return result
+            except TelegramRetryAfter as e:
+                logger.warning(
+                    "Лимит Telegram для чата %s, повтор через %s с",
+                    chat_id,
+                    e.retry_after,
+                )
+                self._pause_chat(chat_id, e.retry_after)
+                error: Exception = e
+            except (TelegramNetworkError, TelegramServerError) as e:
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "Ошибка отправки в чат %s (попытка %s): %s, повтор через %.1f с",
+                    chat_id,
+                    attempt,
+                    e,
+                    delay,
+                )
+                self._pause_chat(chat_id, delay)
+                error = e
+
+        raise SendError(f"Не удалось отправить сообщение: {error}") from error
@@ -0,0 +1,34 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Замеры запуска бота от начала импорта main.py: импорт модулей,
+    готовность принимать обновления, загрузка справочника и первый ответ
+    пользователю. Каждое событие пишется в лог один раз.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._marked = set()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark(self, event: str):
+        """Событие запуска с временем от начала (повторные игнорируются)"""
+        if event in self._marked:
+            return
+        self._marked.add(event)
+        logger.info("Запуск: %s через %.2f с", event, self.elapsed())
+
+    def first_reply(self):
+        # Вызывается на каждый ответ: после первого — только проверка множества
+        self.mark("первый ответ пользователю")
+
+
+# Создается при первом импорте модуля — main.py импортирует его первым
+startup = StartupTimer()
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """HTTP-сервер для приема обновлений Telegram через webhook"""
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        host: str,
+        port: int,
+        path: str,
+        secret_token: str | None = None,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._stop = asyncio.Event()
+
+    def create_app(self) -> web.Application:
+        """
+        aiohttp-приложение: обработчик обновлений на self.path с проверкой
+        заголовка X-Telegram-Bot-Api-Secret-Token; startup/shutdown
+        диспетчера привязаны к жизненному циклу приложения.
+        """
+        app = web.Application()
+        SimpleRequestHandler(
+            dispatcher=self.dp, bot=self.bot, secret_token=self.secret_token
+        ).register(app, path=self.path)
+        setup_application(app, self.dp, bot=self.bot)
+        return app
+
+    async def run(self):
+        """Запуск сервера до получения SIGINT/SIGTERM или вызова stop"""
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except NotImplementedError:
+                pass
+
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+            logger.info(
+                "Webhook-сервер слушает http://%s:%s%s", self.host, self.port, self.path
+            )
+            await self._stop.wait()
+            logger.info("Получен сигнал остановки")
+        finally:
+            await runner.cleanup()
+
+    async def stop(self):
+        """Остановка сервера (как по SIGTERM)"""
+        self._stop.set()
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from services.metrics import metrics
+from services.profiler import profiled_call, profiler
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Очередь обработки переполнена"""
+
+
+class JobTimeoutError(Exception):
+    """Превышено время обработки задачи"""
+
+
+class WorkerPool:
+    """Пул воркеров для тяжелой обработки файлов вне event loop"""
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        job_timeout: float,
+        use_processes: bool = True,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waiting = 0
+        # Невыполненные задачи пулов и зависшие задачи замененных пулов
+        self._running: dict[Executor, set[asyncio.Future]] = {}
+        self._hung: dict[Executor, set[asyncio.Future]] = {}
+
+    def start(self):
+        """Создание пула (процессы, при недоступности — потоки)"""
+        if self._executor is not None:
+            return
+
+        if self.use_processes:
+            # Пул создается и пересоздается, когда в боте уже работают потоки
+            # (asyncio.to_thread, aiohttp): fork скопировал бы их блокировки
+            # в воркер. Воркеры forkserver порождаются из отдельного чистого
+            # процесса, им ничего не нужно от бота — штрихкод приходит
+            # аргументом задачи
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            except (OSError, NotImplementedError, ImportError, ValueError) as e:
+                logger.warning("Пул процессов недоступен (%s), используем потоки", e)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="file-worker"
+            )
+
+        logger.info(
+            "Пул обработки запущен: %s, воркеров: %s, очередь: %s",
+            type(self._executor).__name__,
+            self.max_workers,
+            self.max_queue,
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество задач, ожидающих свободного воркера"""
+        return self._waiting
+
+    async def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_queued: Callable[[int], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """
+        Выполняет fn(*args) в пуле с ограничением параллелизма.
+
+        Если все воркеры заняты, задача встает в очередь, а on_queued
+        получает ее позицию. При переполненной очереди — QueueFullError,
+        при превышении job_timeout — JobTimeoutError.
+        """
+        self.start()
+
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                raise QueueFullError("Очередь обработки переполнена, попробуйте позже")
+
+            self._waiting += 1
+            started = time.perf_counter()
+            try:
+                if on_queued:
+                    await on_queued(self._waiting)
+                await self._slots.acquire()
+            finally:
+                self._waiting -= 1
+            metrics.observe_stage("queue", time.perf_counter() - started)
+        else:
+            await self._slots.acquire()
+
+        # Во время сессии /profile задача выполняется под cProfile в процессе
+        # воркера. В потоках второй cProfile не запустится, пока идет профиль
+        # event loop, поэтому там задачи выполняются как обычно
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        profiling = profiler.active and isinstance(executor, ProcessPoolExecutor)
+        if profiling:
+            fn, args = profiled_call, (fn, *args)
+
+        try:
+            future = loop.run_in_executor(executor, partial(fn, *args))
+        except Exception:
+            self._slots.release()
+            raise
+
+        running = self._running.setdefault(executor, set())
+        running.add(future)
+        released = False
+
+        def done(_):
+            nonlocal released
+            running.discard(future)
+            if not released:
+                released = True
+                self._slots.release()
+            if executor in self._hung:
+                self._stop_retired(executor)
+
+        future.add_done_callback(done)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.job_timeout)
+        except TimeoutError:
+            # Зависшую задачу нельзя отменить: слот освобождается сразу,
+            # а ее процесс останавливается вместе с замененным пулом
+            if not released:
+                released = True
+                self._slots.release()
+            self._retire(executor, future)
+            raise JobTimeoutError(
+                f"Превышено время обработки ({self.job_timeout:g} с)"
+            ) from None
+
+        if profiling:
+            result, stats = result
+            profiler.add_worker_stats(stats)
+        return result
+
+    def _retire(self, executor: Executor, future: asyncio.Future):
+        """
+        Замена пула с зависшей задачей новым. Остальные задачи старого
+        пула дорабатывают, после этого его процессы останавливаются
+        (потоки остановить нельзя — они просто не получают новых задач).
+        """
+        if self._executor is executor:
+            logger.warning("Задача зависла, пул обработки заменен новым")
+            self._executor = None
+            self.start()
+        self._hung.setdefault(executor, set()).add(future)
+        self._stop_retired(executor)
+
+    def _stop_retired(self, executor: Executor):
+        """Остановка замененного пула, когда в нем остались только зависшие задачи"""
+        if self._running.get(executor, set()) - self._hung[executor]:
+            return
+        del self._hung[executor]
+        self._running.pop(executor, None)
+        self._stop(executor)
+
+    @staticmethod
+    def _stop(executor: Executor):
+        # Процессы берутся до shutdown: после него пул их забывает
+        processes = getattr(executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Остановка пула без ожидания зависших задач"""
+        for executor in list(self._hung):
+            self._stop(executor)
+        self._hung.clear()
+        self._running.clear()
+
+        if self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Пул обработки остановлен")
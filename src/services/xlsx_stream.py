@@ -0,0 +1,442 @@
+import posixpath
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from xml.etree import ElementTree
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+# openpyxl импортируется при первом использовании (стили и даты при чтении,
+# ошибка записи), а не при импорте модуля: запись результата обходится без
+# него, а импорт занимает заметную долю запуска бота
+
+# Управляющие символы, недопустимые в xlsx (как в openpyxl.cell.cell)
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+# Начало отсчета дат книги (openpyxl.utils.datetime)
+CALENDAR_WINDOWS_1900 = datetime(1899, 12, 30)
+CALENDAR_MAC_1904 = datetime(1904, 1, 1)
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Значения, которые pandas.read_excel по умолчанию считает пустыми (NaN)
+NA_STRINGS = frozenset(
+    {
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+        "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+        "n/a", "nan", "null",
+    }
+)  # fmt: skip
+
+CHUNK_SIZE = 1 << 20
+DIGITS = "0123456789"
+WRITE_BATCH_ROWS = 4096
+# Предел строк листа Excel
+MAX_ROWS = 1_048_576
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.'
+    'openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    "</Relationships>"
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<workbook xmlns="{SHEET_MAIN_NS}" xmlns:r="{REL_NS}">'
+    '<sheets><sheet name="Sheet" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.'
+    'openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId2" Target="styles.xml" Type="http://schemas.'
+    'openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    "</Relationships>"
+)
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{SHEET_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/>'
+    "</border></borders>"
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+    "</cellStyleXfs>"
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" '
+    'xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/>'
+    "</cellStyles>"
+    "</styleSheet>"
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<worksheet xmlns="{SHEET_MAIN_NS}"><sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def column_index(letters: str) -> int:
+    """Номер столбца (с 1) по буквам: A -> 1, B -> 2, AA -> 27"""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def _column_letters(index: int) -> str:
+    """Буквы столбца по номеру (с 1): 2 -> B, 27 -> AA"""
+    letters = ""
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+class _ColumnParser:
+    """SAX-обработчик листа: собирает значения одного столбца"""
+
+    def __init__(
+        self,
+        column: int,
+        start_row: int,
+        shared_strings: list[str],
+        date_styles: set[int],
+        timedelta_styles: set[int],
+        epoch,
+    ):
+        self.column = column
+        self.letters = _column_letters(column)
+        self.start_row = start_row
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.timedelta_styles = timedelta_styles
+        self.epoch = epoch
+        self.values: list[str] = []
+
+        self._row = 0
+        # Номер текущего столбца известен только для ячеек без адреса,
+        # для остальных хранятся буквы — так не нужно разбирать каждый адрес
+        self._col: int | None = 0
+        self._letters = ""
+        self._in_cell = False
+        self._type = "n"
+        self._style = 0
+        self._text: list[str] | None = None
+        self._value: str | None = None
+        self._inline: list[str] = []
+        self._phonetic = False
+
+    def start(self, name: str, attrs: dict[str, str]):
+        if ":" in name:
+            name = name[name.rfind(":") + 1 :]
+        if name == "c":
+            ref = attrs.get("r")
+            if ref:
+                self._letters = ref.rstrip(DIGITS)
+                self._col = None
+                in_column = self._letters == self.letters
+            else:
+                if self._col is None:
+                    self._col = column_index(self._letters)
+                self._col += 1
+                in_column = self._col == self.column
+            self._in_cell = in_column and self._row >= self.start_row
+            if self._in_cell:
+                self._type = attrs.get("t", "n")
+                self._style = int(attrs.get("s") or 0)
+                self._value = None
+                self._inline = []
+        elif name == "row":
+            ref = attrs.get("r")
+            self._row = int(ref) if ref else self._row + 1
+            self._col = 0
+            self._letters = ""
+        elif self._in_cell:
+            if name in ("v", "t") and not self._phonetic:
+                self._text = []
+            elif name == "rPh":
+                self._phonetic = True
+
+    def end(self, name: str):
+        if not self._in_cell:
+            return
+        if ":" in name:
+            name = name[name.rfind(":") + 1 :]
+        if name == "v" and self._text is not None:
+            self._value = "".join(self._text)
+            self._text = None
+        elif name == "t" and self._text is not None:
+            self._inline.append("".join(self._text))
+            self._text = None
+        elif name == "rPh":
+            self._phonetic = False
+        elif name == "c":
+            self._in_cell = False
+            value = self._convert()
+            if value is not None:
+                value = value.strip()
+                if value:
+                    self.values.append(value)
+
+    def data(self, text: str):
+        if self._text is not None:
+            self._text.append(text)
+
+    def _convert(self) -> str | None:
+        """Значение ячейки в том виде, в котором его вернул бы pandas с dtype=str"""
+        data_type = self._type
+
+        if data_type == "inlineStr":
+            text = "".join(self._inline)
+            return None if text in NA_STRINGS else text
+
+        value = self._value or None
+        if value is None or data_type == "e":
+            return None
+
+        if data_type == "s":
+            text = self.shared_strings[int(value)]
+            return None if text in NA_STRINGS else text
+        if data_type == "str":
+            return None if value in NA_STRINGS else value
+        if data_type == "b":
+            return str(bool(int(value)))
+        if data_type == "d":
+            from openpyxl.utils.datetime import from_ISO8601
+
+            return str(from_ISO8601(value))
+
+        number = float(value) if "." in value or "e" in value.lower() else int(value)
+        if self._style in self.date_styles:
+            from openpyxl.utils.datetime import from_excel
+
+            try:
+                return str(
+                    from_excel(
+                        number,
+                        self.epoch,
+                        timedelta=self._style in self.timedelta_styles,
+                    )
+                )
+            except (OverflowError, ValueError):
+                return None
+
+        integer = int(number)
+        return str(integer if integer == number else float(number))
+
+
+class XlsxStreamReader:
+    """Потоковое чтение одного столбца xlsx без построения DataFrame"""
+
+    @classmethod
+    def iter_column(cls, source, column: int = 2, start_row: int = 2) -> Iterator[str]:
+        """
+        Построчно разбирает XML первого листа и отдает непустые значения
+        столбца (с обрезанными пробелами), начиная со строки start_row.
+
+        Args:
+            source: Путь к файлу или бинарный file-like объект
+            column: Номер столбца, начиная с 1 (B = 2)
+            start_row: Номер первой читаемой строки, начиная с 1
+
+        Yields:
+            str: Значения ячеек в порядке следования строк
+        """
+        with zipfile.ZipFile(source) as archive:
+            sheet_path, strings_path, styles_path, epoch = cls.locate_parts(archive)
+            shared_strings = cls._read_shared_strings(archive, strings_path)
+            date_styles, timedelta_styles = cls._read_date_styles(archive, styles_path)
+
+            handler = _ColumnParser(
+                column, start_row, shared_strings, date_styles, timedelta_styles, epoch
+            )
+            parser = expat.ParserCreate()
+            parser.buffer_text = True
+            parser.StartElementHandler = handler.start
+            parser.EndElementHandler = handler.end
+            parser.CharacterDataHandler = handler.data
+
+            with archive.open(sheet_path) as sheet:
+                while chunk := sheet.read(CHUNK_SIZE):
+                    parser.Parse(chunk, False)
+                    yield from handler.values
+                    handler.values.clear()
+                parser.Parse(b"", True)
+                yield from handler.values
+
+    @staticmethod
+    def locate_parts(archive: zipfile.ZipFile):
+        """Пути к первому листу, общим строкам и стилям, эпоха дат книги"""
+        workbook_path = "xl/workbook.xml"
+        if "_rels/.rels" in archive.NameToInfo:
+            package_rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+            for rel in package_rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+                if rel.get("Type", "").endswith("/officeDocument"):
+                    workbook_path = rel.get("Target", workbook_path).lstrip("/")
+                    break
+
+        base_dir, workbook_name = posixpath.split(workbook_path)
+        rels_path = posixpath.join(base_dir, "_rels", f"{workbook_name}.rels")
+        workbook = ElementTree.fromstring(archive.read(workbook_path))
+        rels = ElementTree.fromstring(archive.read(rels_path))
+
+        targets = {}
+        strings_path = styles_path = None
+        for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(base_dir, target))
+            rel_type = rel.get("Type", "")
+            if rel_type.endswith("/worksheet"):
+                targets[rel.get("Id")] = target
+            elif rel_type.endswith("/sharedStrings"):
+                strings_path = target
+            elif rel_type.endswith("/styles"):
+                styles_path = target
+
+        sheet_path = None
+        for sheet in workbook.iter(f"{{{SHEET_MAIN_NS}}}sheet"):
+            sheet_path = targets.get(sheet.get(f"{{{REL_NS}}}id"))
+            if sheet_path:
+                break
+        if sheet_path is None:
+            raise ValueError("В файле не найдено ни одного листа")
+
+        epoch = CALENDAR_WINDOWS_1900
+        properties = workbook.find(f"{{{SHEET_MAIN_NS}}}workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            epoch = CALENDAR_MAC_1904
+
+        return sheet_path, strings_path, styles_path, epoch
+
+    @staticmethod
+    def _read_shared_strings(archive: zipfile.ZipFile, path: str | None) -> list[str]:
+        """Таблица общих строк (как ее читает openpyxl)"""
+        if not path or path not in archive.NameToInfo:
+            return []
+
+        strings = []
+        si_tag = f"{{{SHEET_MAIN_NS}}}si"
+        t_tag = f"{{{SHEET_MAIN_NS}}}t"
+        r_tag = f"{{{SHEET_MAIN_NS}}}r"
+        with archive.open(path) as source:
+            for _, node in ElementTree.iterparse(source):
+                if node.tag != si_tag:
+                    continue
+                parts = []
+                plain = node.find(t_tag)
+                if plain is not None and plain.text:
+                    parts.append(plain.text)
+                for run in node.iterfind(r_tag):
+                    text = run.findtext(t_tag)
+                    if text:
+                        parts.append(text)
+                strings.append("".join(parts).replace("x005F_", ""))
+                node.clear()
+        return strings
+
+    @staticmethod
+    def _read_date_styles(
+        archive: zipfile.ZipFile, path: str | None
+    ) -> tuple[set[int], set[int]]:
+        """Индексы стилей ячеек с форматами даты и длительности"""
+        if not path or path not in archive.NameToInfo:
+            return set(), set()
+
+        from openpyxl.styles.stylesheet import Stylesheet
+
+        stylesheet = Stylesheet.from_tree(ElementTree.fromstring(archive.read(path)))
+        return stylesheet.date_formats, stylesheet.timedelta_formats
+
+
+class XlsxStreamWriter:
+    """Потоковая запись одного столбца в xlsx без модели книги openpyxl"""
+
+    @staticmethod
+    def _cell_xml(row: int, value: str) -> str:
+        """Строка листа с одной inline-строкой в столбце A"""
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            from openpyxl.utils.exceptions import IllegalCharacterError
+
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        return (
+            f'<row r="{row}"><c r="A{row}" t="inlineStr"><is>'
+            f"<t{space}>{escape(value)}</t></is></c></row>"
+        )
+
+    @classmethod
+    def write_column(
+        cls,
+        target,
+        values: Iterable[str],
+        max_rows: int = MAX_ROWS,
+        max_bytes: int | None = None,
+    ) -> int:
+        """
+        Записывает значения в столбец A первого листа, по одному на строку.
+
+        Лист пишется в архив по мере чтения values пачками по
+        WRITE_BATCH_ROWS строк, поэтому память не зависит от их количества.
+        Запись останавливается на max_rows строках или когда сжатый файл
+        дорастает до max_bytes (проверяется после каждой пачки, поэтому
+        файл может превысить max_bytes на пачку и буфер сжатия — сотни
+        килобайт). Оставшиеся значения
+        итератора values не читаются — их можно записать в следующий файл.
+
+        Args:
+            target: Путь к файлу или бинарный file-like объект
+            values: Строки для записи, начиная с A1
+            max_rows: Предел строк в файле
+            max_bytes: Предел размера файла (None — без предела)
+
+        Returns:
+            int: Количество записанных строк
+        """
+        row = 0
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+            archive.writestr("_rels/.rels", _ROOT_RELS_XML)
+            archive.writestr("xl/workbook.xml", _WORKBOOK_XML)
+            archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS_XML)
+            archive.writestr("xl/styles.xml", _STYLES_XML)
+
+            with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+                sheet.write(_SHEET_HEAD.encode())
+                batch = []
+                for row, value in enumerate(values, start=1):
+                    batch.append(cls._cell_xml(row, value))
+                    if row >= max_rows:
+                        break
+                    if len(batch) >= WRITE_BATCH_ROWS:
+                        sheet.write("".join(batch).encode())
+                        batch.clear()
+                        # Позиция в архиве — сжатые данные, уже записанные
+                        if max_bytes is not None and archive.fp.tell() >= max_bytes:
+                            break
+                sheet.write(("".join(batch) + _SHEET_TAIL).encode())
+
+        return row
@@ -0,0 +1,177 @@
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from pathlib import Path
+
+from config import (
+    CODE_PATTERN,
+    JOB_POLL_INTERVAL,
+    JOB_QUEUE_PATH,
+    JOB_WORKERS,
+    JOBS_DIR,
+    RESULT_MAX_BYTES,
+    RESULT_MAX_ROWS,
+    WORKER_ID,
+    WORKER_JOB_TIMEOUT,
+)
+from services.file_processor import FileProcessor
+from services.job_queue import JobQueue
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+# Задачи без хозяина (его хост пересоздан под другим именем и не вернет их
+# в очередь сам) подбираются, когда взяты больше STALE_TIMEOUTS таймаутов
+# назад: живой хозяин к этому времени уже завершил бы их по таймауту
+STALE_TIMEOUTS = 2
+
+
+def worker_prefix(pid: int) -> str:
+    return f"{WORKER_ID}:{pid}:"
+
+
+def worker_pid(name: str) -> int:
+    """pid процесса по имени воркера из worker_prefix"""
+    return int(name.split(":")[1])
+
+
+def run_worker(queue_path: Path, results_dir: Path):
+    """Цикл процесса-воркера: забрать задачу, обработать, записать результат"""
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    # Текущая задача дорабатывается, новые не берутся
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    queue = JobQueue(queue_path)
+    name = f"{worker_prefix(multiprocessing.current_process().pid)}worker"
+    logger.info("Воркер %s запущен", name)
+
+    while not stopping:
+        job = queue.claim(name)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        logger.info("Задача %s: %s", job["id"], job["file_name"])
+        try:
+            result_paths, _, stats = FileProcessor.process_file(
+                Path(job["input_path"]),
+                results_dir,
+                job["file_name"],
+                job["barcode"],
+                f"job{job['id']}_",
+                max_rows=RESULT_MAX_ROWS,
+                max_bytes=RESULT_MAX_BYTES,
+                code_pattern=CODE_PATTERN or None,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.error("Задача %s завершилась ошибкой: %s", job["id"], e)
+            queue.fail(job["id"], str(e))
+        else:
+            check = stats.get("check")
+            queue.complete(
+                job["id"],
+                result_paths,
+                check
+                and {
+                    "codes": check.codes,
+                    "invalid": check.invalid,
+                    "duplicates": check.duplicates,
+                },
+            )
+
+    logger.info("Воркер %s остановлен", name)
+
+
+def main():
+    """
+    Запуск JOB_WORKERS процессов с перезапуском упавших.
+
+    Задача, выполняющаяся дольше WORKER_JOB_TIMEOUT, завершается ошибкой,
+    а процесс ее воркера убивается и запускается заново. В очередь
+    возвращаются задачи завершившихся процессов этого запуска (WORKER_ID);
+    задачи других запусков — только когда они явно брошены (STALE_TIMEOUTS).
+    """
+    if not JOB_QUEUE_PATH:
+        logger.error("ОШИБКА: Не задана переменная окружения JOB_QUEUE_PATH")
+        sys.exit(1)
+
+    queue_path = Path(JOB_QUEUE_PATH)
+    results_dir = Path(JOBS_DIR) / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    queue = JobQueue(queue_path)
+    # Задачи, которые этот запуск не успел обработать до перезапуска
+    if requeued := queue.requeue(f"{WORKER_ID}:"):
+        logger.info("Возвращено в очередь после перезапуска: %s", requeued)
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def spawn() -> multiprocessing.Process:
+        process = multiprocessing.Process(
+            target=run_worker, args=(queue_path, results_dir), daemon=True
+        )
+        process.start()
+        return process
+
+    processes = [spawn() for _ in range(JOB_WORKERS)]
+    logger.info("Запущено воркеров: %s, очередь: %s", JOB_WORKERS, queue_path)
+
+    while not stopping:
+        time.sleep(JOB_POLL_INTERVAL)
+
+        # Зависшая обработка: задача завершается ошибкой, процесс — убивается
+        expired = queue.expire(
+            f"{WORKER_ID}:",
+            WORKER_JOB_TIMEOUT,
+            f"Превышено время обработки ({WORKER_JOB_TIMEOUT:g} с)",
+        )
+        for job in expired:
+            pid = worker_pid(job["worker"])
+            logger.error("Задача %s: превышено время обработки", job["id"])
+            for process in processes:
+                if process.pid == pid and process.is_alive():
+                    process.kill()
+                    process.join()
+            # Части результата, которые воркер успел записать
+            for path in results_dir.glob(f"job{job['id']}_*"):
+                path.unlink(missing_ok=True)
+
+        for index, process in enumerate(processes):
+            if process.is_alive():
+                continue
+            logger.error("Воркер %s завершился (код %s)", process.pid, process.exitcode)
+            queue.requeue(worker_prefix(process.pid))
+            processes[index] = spawn()
+
+        if requeued := queue.requeue(
+            "", claimed_before=time.time() - STALE_TIMEOUTS * WORKER_JOB_TIMEOUT
+        ):
+            logger.warning("Возвращено в очередь задач без воркера: %s", requeued)
+
+    logger.info("Остановка воркеров...")
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+
+from services.batch_manager import BatchManager
+from services.send_queue import SendQueue
+
+DELAY = 0.1
+
+
+class _Bot:
+    """Бот, который только запоминает отправленные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text):
+        self.messages.append((chat_id, text))
+
+
+def _manager(**kwargs) -> BatchManager:
+    send_queue = SendQueue(chat_rate=1000, chat_burst=1000, global_rate=1000)
+    return BatchManager(_Bot(), send_queue, delay=DELAY, **kwargs)
+
+
+async def _add_file(manager: BatchManager, user_id: int, success: bool = True):
+    manager.add_result(user_id, {"success": success, "filename": "f.xlsx"})
+    await manager.schedule_batch(user_id, chat_id=user_id)
+
+
+def test_later_file_pushes_the_deadline():
+    async def run():
+        manager = _manager()
+        for success in (True, False, True):
+            await _add_file(manager, 1, success)
+            await asyncio.sleep(DELAY * 0.6)
+        # Каждый файл сдвигал срок: сводки еще нет
+        assert manager.bot.messages == []
+        await asyncio.sleep(DELAY * 2)
+        manager.stop()
+        return manager
+
+    manager = asyncio.run(run())
+    assert manager.bot.messages == [
+        (1, "Обработка завершена: 3 файл(ов)\n✅ Успешно: 2\n❌ С ошибками: 1")
+    ]
+    assert manager.user_state == {}
+
+
+def test_compaction_keeps_live_deadlines():
+    async def run():
+        manager = _manager()
+        heap_sizes = []
+        for _ in range(300):
+            for user_id in (1, 2, 3):
+                await manager.schedule_batch(user_id, chat_id=user_id)
+            heap_sizes.append(len(manager._deadlines))
+        for user_id in (1, 2, 3):
+            await _add_file(manager, user_id)
+            await _add_file(manager, user_id)
+        await asyncio.sleep(DELAY * 3)
+        manager.stop()
+        return manager, heap_sizes
+
+    manager, heap_sizes = asyncio.run(run())
+    # Устаревшие записи вычищаются, куча не растет с числом переносов
+    assert max(heap_sizes) <= 2 * 3 + 64 + 1
+    assert sorted(chat for chat, _ in manager.bot.messages) == [1, 2, 3]
+    assert manager._deadlines == []
+
+
+def test_stale_state_removes_temp_files(tmp_path):
+    temp_input = tmp_path / "input.xlsx"
+    result = tmp_path / "codes_A.xlsx"
+    temp_input.write_bytes(b"in")
+    result.write_bytes(b"out")
+
+    async def run():
+        manager = _manager(stale_after=DELAY)
+        # Результат без запланированной сводки (обработка оборвалась)
+        manager.add_result(
+            1,
+            {
+                "success": True,
+                "filename": "A.xlsx",
+                "temp_input": str(temp_input),
+                "result_paths": [result],
+            },
+        )
+        await asyncio.sleep(DELAY * 3)
+        manager.stop()
+        return manager
+
+    manager = asyncio.run(run())
+    assert not temp_input.exists()
+    assert not result.exists()
+    assert manager.user_state == {}
+    assert manager.bot.messages == []
@@ -0,0 +1,196 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from services.file_processor import FileProcessor
+
+SHEET = "xl/worksheets/sheet1.xml"
+INLINE = "инлайн-строка"
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+SHARED_REL = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+)
+SHARED_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+)
+
+# Столбец B во всех видах, которые встречаются в файлах пользователей;
+# первая строка — заголовок
+VALUES = [
+    "Код",
+    "0104601234567890215abc",
+    4601234567890,
+    12.0,
+    1.5,
+    -3,
+    datetime(2024, 1, 2),
+    datetime(2024, 1, 2, 13, 45, 30),
+    "#N/A",
+    "#DIV/0!",
+    "NA",
+    "null",
+    "n/a",
+    "NaN",
+    "  пробелы  ",
+    "",
+    None,
+    "   ",
+    True,
+    INLINE,
+    "повтор",
+    "повтор",
+    "0123",
+    "1e5",
+]
+
+
+def _pandas_codes(df: pd.DataFrame) -> list:
+    """Прежнее чтение через pandas (read_codes_from_file до CodeReader)"""
+    if df.shape[1] < 2:
+        return []
+    codes = df.iloc[:, 1].str.strip().dropna()
+    return codes[codes != ""].tolist()
+
+
+def _share_strings(xlsx: bytes, inline: str) -> bytes:
+    """
+    Строки листа переносятся в общие строки, как их пишет Excel
+    (openpyxl пишет все строки встроенными); inline остается встроенной
+    """
+    source = zipfile.ZipFile(io.BytesIO(xlsx))
+    shared: list = []
+
+    def share(match):
+        text = match.group(3)
+        if text == inline:
+            return match.group(0)
+        if text not in shared:
+            shared.append(text)
+        return f'<c r="{match.group(1)}"{match.group(2)} t="s"><v>{shared.index(text)}</v></c>'
+
+    sheet = re.sub(
+        r'<c r="(\w+)"([^>]*) t="inlineStr"><is><t[^>]*>(.*?)</t></is></c>',
+        share,
+        source.read(SHEET).decode(),
+        flags=re.DOTALL,
+    )
+    items = "".join(f'<si><t xml:space="preserve">{text}</t></si>' for text in shared)
+    parts = {
+        SHEET: sheet,
+        "xl/sharedStrings.xml": (
+            f'<sst xmlns="{MAIN_NS}" count="{len(shared)}" '
+            f'uniqueCount="{len(shared)}">{items}</sst>'
+        ),
+        "xl/_rels/workbook.xml.rels": source.read("xl/_rels/workbook.xml.rels")
+        .decode()
+        .replace(
+            "</Relationships>",
+            f'<Relationship Id="rIdShared" Type="{SHARED_REL}" '
+            'Target="sharedStrings.xml"/></Relationships>',
+        ),
+        "[Content_Types].xml": source.read("[Content_Types].xml")
+        .decode()
+        .replace(
+            "</Types>",
+            '<Override PartName="/xl/sharedStrings.xml" '
+            f'ContentType="{SHARED_TYPE}"/></Types>',
+        ),
+    }
+    result = io.BytesIO()
+    with zipfile.ZipFile(result, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(
+                info.filename, parts.pop(info.filename, None) or source.read(info)
+            )
+        for name, data in parts.items():
+            target.writestr(name, data)
+    return result.getvalue()
+
+
+def _xlsx(tmp_path, values, columns=2):
+    wb = Workbook()
+    ws = wb.active
+    for row, value in enumerate(values, start=1):
+        ws.cell(row, 1, f"A{row}")
+        if columns > 1:
+            ws.cell(row, 2, value)
+        ws.cell(row, 3, "x")
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    path = tmp_path / "codes.xlsx"
+    path.write_bytes(_share_strings(buffer.getvalue(), INLINE))
+    return path
+
+
+def _float_ints(xlsx: bytes) -> bytes:
+    """Целые числа записываются как дробные, как их хранят другие программы"""
+    source = zipfile.ZipFile(io.BytesIO(xlsx))
+    sheet = (
+        source.read(SHEET)
+        .decode()
+        .replace('t="n"><v>4601234567890</v>', 't="n"><v>4.60123456789E+12</v>')
+        .replace('t="n"><v>12</v>', 't="n"><v>12.0</v>')
+    )
+    result = io.BytesIO()
+    with zipfile.ZipFile(result, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = sheet if info.filename == SHEET else source.read(info)
+            target.writestr(info.filename, data)
+    return result.getvalue()
+
+
+def test_xlsx_matches_pandas(tmp_path):
+    path = _xlsx(tmp_path, VALUES)
+    path.write_bytes(_float_ints(path.read_bytes()))
+    sheet = zipfile.ZipFile(path).read(SHEET).decode()
+    for cell in ('t="s"', 't="inlineStr"', 't="e"', 't="b"', "<v>12.0</v>"):
+        assert cell in sheet
+    expected = _pandas_codes(
+        pd.read_excel(path, header=None, skiprows=1, dtype=str, engine="openpyxl")
+    )
+    assert INLINE in expected
+    assert FileProcessor.read_codes_from_file(path) == expected
+    assert FileProcessor.read_codes_from_file(io.BytesIO(path.read_bytes())) == expected
+
+
+def test_xlsx_without_column_b(tmp_path):
+    path = _xlsx(tmp_path, ["Код", "a", "b"], columns=1)
+    assert FileProcessor.read_codes_from_file(path) == []
+
+
+def test_ods_matches_pandas(tmp_path):
+    path = tmp_path / "codes.ods"
+    rows = [[f"A{row}", value, "x"] for row, value in enumerate(VALUES, start=1)]
+    pd.DataFrame(rows).to_excel(path, header=False, index=False, engine="odf")
+    expected = _pandas_codes(
+        pd.read_excel(path, header=None, skiprows=1, dtype=str, engine="odf")
+    )
+    assert FileProcessor.read_codes_from_file(path) == expected
+
+
+@pytest.mark.parametrize("delimiter", [";", ","])
+def test_csv_matches_pandas(tmp_path, delimiter):
+    path = tmp_path / "codes.csv"
+    values = ["" if value is None else str(value) for value in VALUES] + [
+        "код; с разделителем",
+        "код\nс переводом строки",
+        '"в кавычках"',
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerows([f"A{row}", value, "x"] for row, value in enumerate(values))
+    expected = _pandas_codes(
+        pd.read_csv(path, header=None, skiprows=1, dtype=str, sep=delimiter)
+    )
+    assert FileProcessor.read_codes_from_file(path) == expected
+
+    # Переданный поток остается открытым у вызывающего
+    stream = io.BytesIO(path.read_bytes())
+    assert FileProcessor.read_codes_from_file(stream) == expected
+    assert not stream.closed
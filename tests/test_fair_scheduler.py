@@ -0,0 +1,76 @@
+import asyncio
+
+from services.fair_scheduler import FairScheduler, ReplyOrder
+
+
+def test_many_files_of_one_user_do_not_starve_another():
+    async def run():
+        scheduler = FairScheduler(max_active=2, per_user_limit=2, max_waiting=100)
+        started = []
+
+        async def process(user_id: int, index: int):
+            async with scheduler.slot(user_id):
+                started.append((user_id, index))
+                await asyncio.sleep(0.01)
+
+        heavy = [asyncio.create_task(process(1, i)) for i in range(50)]
+        await asyncio.sleep(0)
+        single = asyncio.create_task(process(2, 0))
+        await asyncio.gather(*heavy, single)
+        return started
+
+    started = asyncio.run(run())
+    # Два первых файла заняли все места; файл второго пользователя —
+    # следующий по кругу, а не после всех пятидесяти
+    assert started.index((2, 0)) <= 3
+    assert [index for user, index in started if user == 1] == list(range(50))
+
+
+def test_replies_follow_ticket_order():
+    async def run():
+        order = ReplyOrder()
+        replies = []
+
+        async def handle(delay: float, fail: bool = False):
+            ticket = order.take(1)
+            try:
+                await asyncio.sleep(delay)
+                if fail:
+                    raise ValueError("ошибка обработки")
+                await order.wait(1, ticket)
+                replies.append(ticket)
+            except ValueError:
+                await order.wait(1, ticket)
+                replies.append(f"error {ticket}")
+            finally:
+                order.done(1, ticket)
+
+        # Поздние файлы заканчиваются раньше, второй падает с ошибкой
+        await asyncio.gather(
+            handle(0.05), handle(0.01, fail=True), handle(0), handle(0.02)
+        )
+        return replies, order
+
+    replies, order = asyncio.run(run())
+    assert replies == [0, "error 1", 2, 3]
+    assert order._users == {}
+
+
+def test_cancelled_ticket_does_not_block_later_replies():
+    async def run():
+        order = ReplyOrder()
+        first, second = order.take(1), order.take(1)
+
+        async def reply():
+            await order.wait(1, second)
+            order.done(1, second)
+            return "sent"
+
+        task = asyncio.create_task(reply())
+        await asyncio.sleep(0)
+        assert not task.done()
+        # Первый файл отменен до ответа: номер освобождается без ответа
+        order.done(1, first)
+        return await asyncio.wait_for(task, 1)
+
+    assert asyncio.run(run()) == "sent"
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+from services.file_processor import FileProcessor
+
+BARCODE = "4601234567890"
+MAX_ROWS = 5
+# Кодов в одной части: max_rows без двух строк заголовка
+PER_PART = MAX_ROWS - 2
+
+
+def _parts(count: int, max_rows: int = MAX_ROWS):
+    codes = [f"code{i}" for i in range(count)]
+    buffers = {}
+
+    def part_target(part: int) -> io.BytesIO:
+        buffers[part] = io.BytesIO()
+        return buffers[part]
+
+    counts = FileProcessor.create_result_parts(BARCODE, codes, part_target, max_rows)
+    columns = []
+    for part in sorted(buffers):
+        buffers[part].seek(0)
+        ws = load_workbook(buffers[part]).active
+        columns.append([row[0] for row in ws.iter_rows(values_only=True)])
+    return codes, counts, columns
+
+
+@pytest.mark.parametrize(
+    "count, expected",
+    [
+        (0, []),
+        (1, [1]),
+        (PER_PART - 1, [PER_PART - 1]),
+        (PER_PART, [PER_PART]),
+        (PER_PART + 1, [PER_PART, 1]),
+        (MAX_ROWS - 1, [PER_PART, 1]),
+        (MAX_ROWS, [PER_PART, 2]),
+        (4 * PER_PART, [PER_PART] * 4),
+    ],
+)
+def test_parts_split_on_max_rows(count, expected):
+    codes, counts, columns = _parts(count)
+
+    assert counts == expected
+    assert [len(column) for column in columns] == [n + 2 for n in expected]
+    assert all(column[:2] == ["коды", BARCODE] for column in columns)
+    assert [code for column in columns for code in column[2:]] == codes
+
+
+def test_parts_need_room_for_a_code():
+    with pytest.raises(ValueError):
+        _parts(3, max_rows=2)
@@ -0,0 +1,140 @@
+import time
+
+from services.job_queue import DONE, FAILED, PENDING, RUNNING, JobQueue
+
+
+def _queue(tmp_path) -> JobQueue:
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def _add(queue: JobQueue, user_id: int = 1, name: str = "file.xlsx") -> int:
+    return queue.add(user_id=user_id, chat_id=user_id, message_id=1, file_name=name)
+
+
+def _status(queue: JobQueue, job_id: int) -> str:
+    row = queue._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+    return row.fetchone()["status"]
+
+
+def test_claim_alternates_between_users(tmp_path):
+    queue = _queue(tmp_path)
+    heavy = [_add(queue, 1) for _ in range(5)]
+    single = _add(queue, 2)
+
+    first = queue.claim("host:1:worker")
+    second = queue.claim("host:2:worker")
+
+    # У второго пользователя нет задач в работе — его файл идет раньше
+    # оставшихся файлов первого
+    assert (first["id"], second["id"]) == (heavy[0], single)
+    assert queue.claim("host:1:worker")["id"] == heavy[1]
+
+
+def test_requeue_returns_jobs_of_a_dead_worker(tmp_path):
+    queue = _queue(tmp_path)
+    dead, alive = _add(queue, 1), _add(queue, 2)
+    queue.claim("host:10:worker")
+    queue.claim("host:20:worker")
+
+    assert queue.requeue("host:10:") == 1
+    assert _status(queue, dead) == PENDING
+    assert _status(queue, alive) == RUNNING
+    assert queue.claim("host:30:worker")["attempts"] == 2
+
+
+def test_expire_fails_only_overdue_jobs_of_the_host(tmp_path):
+    queue = _queue(tmp_path)
+    overdue, fresh, other = _add(queue, 1), _add(queue, 2), _add(queue, 3)
+    for worker in ("host:10:worker", "host:20:worker", "other:30:worker"):
+        queue.claim(worker)
+    queue._connect().execute(
+        "UPDATE jobs SET claimed_at = ? WHERE id IN (?, ?)",
+        (time.time() - 60, overdue, other),
+    )
+
+    expired = queue.expire("host:", 30, "timeout")
+
+    assert expired == [{"id": overdue, "worker": "host:10:worker"}]
+    assert _status(queue, overdue) == FAILED
+    assert _status(queue, fresh) == RUNNING
+    assert _status(queue, other) == RUNNING
+    # Воркер, у которого задачу забрали по таймауту, не перезапишет ее
+    queue.complete(overdue, [])
+    assert _status(queue, overdue) == FAILED
+
+
+def test_delivery_waits_for_earlier_jobs_of_the_user(tmp_path):
+    queue = _queue(tmp_path)
+    first, second = _add(queue, 1), _add(queue, 1)
+    other = _add(queue, 2)
+    for worker in ("host:1:worker", "host:2:worker", "host:3:worker"):
+        queue.claim(worker)
+
+    # Второй файл готов раньше первого: отправлять его еще нельзя
+    queue.complete(second, [])
+    queue.fail(other, "error")
+    assert [job["id"] for job in queue.claim_deliverable()] == [other]
+
+    # Готовые подряд задачи пользователя забираются вместе, по порядку
+    queue.complete(first, [])
+    assert [job["id"] for job in queue.claim_deliverable()] == [first, second]
+    assert queue.claim_deliverable() == []
+
+
+def test_delivery_waits_while_earlier_job_is_sending(tmp_path):
+    queue = _queue(tmp_path)
+    first, second = _add(queue, 1), _add(queue, 1)
+    for worker in ("host:1:worker", "host:2:worker"):
+        queue.claim(worker)
+
+    queue.complete(first, [])
+    assert [job["id"] for job in queue.claim_deliverable()] == [first]
+    # Первый еще отправляется: готовый позже второй ждет его
+    queue.complete(second, [])
+    assert queue.claim_deliverable() == []
+
+    queue.mark_delivered(first)
+    assert [job["id"] for job in queue.claim_deliverable()] == [second]
+
+
+def test_release_delivery_returns_unsent_jobs(tmp_path):
+    queue = _queue(tmp_path)
+    first, second = _add(queue, 1), _add(queue, 1)
+    for job_id in (first, second):
+        queue.claim("host:1:worker")
+        queue.complete(job_id, [])
+
+    assert [job["id"] for job in queue.claim_deliverable()] == [first, second]
+    assert queue.release_delivery([second]) == 1
+
+    queue.mark_delivered(first)
+    (job,) = queue.claim_deliverable()
+    assert (job["id"], job["status"], job["delivery_attempts"]) == (second, DONE, 2)
+
+
+def test_stale_jobs_of_a_vanished_host_are_requeued(tmp_path):
+    queue = _queue(tmp_path)
+    stale, fresh = _add(queue, 1), _add(queue, 2)
+    queue.claim("old-container:10:worker")
+    queue.claim("other-host:20:worker")
+    queue._connect().execute(
+        "UPDATE jobs SET claimed_at = ? WHERE id = ?", (time.time() - 3600, stale)
+    )
+
+    # Запуск с другим именем хоста не видит задач по своему префиксу
+    assert queue.requeue("new-container:") == 0
+    assert queue.requeue("", claimed_before=time.time() - 600) == 1
+
+    assert _status(queue, stale) == PENDING
+    assert _status(queue, fresh) == RUNNING
+    assert queue.claim("new-container:30:worker")["id"] == stale
+
+
+def test_stale_jobs_fail_after_max_attempts(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = _add(queue)
+    for attempt in range(3):
+        queue.claim(f"host{attempt}:1:worker")
+        queue.requeue("", claimed_before=time.time() + 1)
+
+    assert _status(queue, job_id) == FAILED
@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import pytest
+
+from services.preflight import RATIO_MIN_BYTES, Preflight, PreflightError
+from services.xlsx_stream import XlsxStreamWriter
+
+SHEET = "xl/worksheets/sheet1.xml"
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+
+def _xlsx(sheet_xml: str) -> io.BytesIO:
+    """Настоящая книга XlsxStreamWriter с подмененным листом"""
+    source = io.BytesIO()
+    XlsxStreamWriter.write_column(source, ["коды", "4601234567890"])
+    result = io.BytesIO()
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(result, "w") as dst:
+        for info in src.infolist():
+            data = sheet_xml.encode() if info.filename == SHEET else src.read(info)
+            dst.writestr(info.filename, data)
+    return result
+
+
+def _sheet(dimension: str, prefix: str = "") -> str:
+    ns = f"xmlns:{prefix[:-1]}" if prefix else "xmlns"
+    return (
+        f'<?xml version="1.0"?><{prefix}worksheet {ns}="{MAIN_NS}">'
+        f"{dimension}<{prefix}sheetData/></{prefix}worksheet>"
+    )
+
+
+@pytest.mark.parametrize(
+    "sheet_xml",
+    [
+        _sheet('<dimension ref="A1:B20000"/>'),
+        _sheet('<dimension ref="$A$1:$B$20000"/>'),
+        _sheet('<x:dimension ref="A1:B20000"/>', prefix="x:"),
+    ],
+)
+def test_dimension_forms(sheet_xml):
+    preflight = Preflight(max_cells=100_000, slow_cells=30_000)
+    assert preflight.inspect(_xlsx(sheet_xml)) is True
+
+    with pytest.raises(PreflightError, match="40 000 ячеек"):
+        Preflight(max_cells=39_999).inspect(_xlsx(sheet_xml))
+
+
+@pytest.mark.parametrize("ref", ["A1", "XFD1048576", "$C$5"])
+def test_single_cell_dimension_is_one_cell(ref):
+    # Одна ячейка — не диапазон от A1 до нее
+    xlsx = _xlsx(_sheet(f'<dimension ref="{ref}"/>'))
+    assert Preflight(max_cells=1, slow_cells=1).inspect(xlsx) is False
+
+
+@pytest.mark.parametrize("ref", ["", "A:XFD", "1:1048576"])
+def test_unparsed_dimension_is_skipped(ref):
+    xlsx = _xlsx(_sheet(f'<dimension ref="{ref}"/>'))
+    assert Preflight(max_cells=1, slow_cells=1).inspect(xlsx) is False
+
+
+def test_dimension_after_sheet_data_is_ignored():
+    sheet_xml = (
+        f'<?xml version="1.0"?><worksheet xmlns="{MAIN_NS}"><sheetData/>'
+        '<dimension ref="A1:XFD1048576"/></worksheet>'
+    )
+    assert Preflight(max_cells=10, slow_cells=1).inspect(_xlsx(sheet_xml)) is False
+
+
+def _packed(size: int) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("content.xml", b"\0" * size)
+    return buffer
+
+
+def test_ratio_is_checked_only_for_large_archives():
+    preflight = Preflight(max_ratio=100)
+    # Маленький архив сжат в сотни раз, но степень сжатия не проверяется
+    assert preflight.inspect(_packed(RATIO_MIN_BYTES)) is False
+
+    with pytest.raises(PreflightError, match="сжат подозрительно сильно"):
+        preflight.inspect(_packed(RATIO_MIN_BYTES + 1))
+
+
+def test_unpacked_size_limits():
+    archive = _packed(1000)
+    assert Preflight(slow_bytes=999).inspect(archive) is True
+    assert Preflight(slow_bytes=1000).inspect(archive) is False
+
+    with pytest.raises(PreflightError, match="после распаковки"):
+        Preflight(max_unpacked_bytes=999).inspect(archive)
+
+
+def test_slow_lane_by_document_size():
+    preflight = Preflight(max_file_bytes=100, slow_bytes=50)
+    assert preflight.check_size(None) is False
+    assert preflight.check_size(50) is False
+    assert preflight.check_size(51) is True
+
+    with pytest.raises(PreflightError, match="Файл слишком большой"):
+        preflight.check_size(101)
+
+
+def test_not_zip_is_checked_by_size_only():
+    assert Preflight(max_cells=1, slow_bytes=1).inspect(io.BytesIO(b"a;b\n")) is False
@@ -0,0 +1,68 @@
+import asyncio
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.send_queue import SendQueue
+
+METHOD = SendMessage(chat_id=1, text="test")
+
+
+def _send_with_errors(queue: SendQueue, errors: list) -> list:
+    """Отправка, первые попытки которой падают с errors; моменты попыток"""
+    attempts = []
+
+    async def request():
+        attempts.append(asyncio.get_running_loop().time())
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    async def run():
+        assert await queue.send(1, request) == "ok"
+
+    asyncio.run(run())
+    return attempts
+
+
+def test_retry_after_is_not_shortened_by_burst():
+    queue = SendQueue(chat_rate=1.0, chat_burst=3)
+    error = TelegramRetryAfter(METHOD, "Too Many Requests", retry_after=1)
+
+    first, retry = _send_with_errors(queue, [error])
+
+    assert retry - first >= 1.0
+
+
+def test_backoff_is_not_shortened_by_burst():
+    queue = SendQueue(chat_rate=1.0, chat_burst=3)
+    queue._backoff = lambda attempt: 0.5
+
+    first, retry = _send_with_errors(queue, [TelegramNetworkError(METHOD, "timeout")])
+
+    assert retry - first >= 0.5
+
+
+def test_retry_after_does_not_delay_other_chats():
+    queue = SendQueue(chat_rate=1.0, chat_burst=3)
+    sent = {}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        errors = [TelegramRetryAfter(METHOD, "Too Many Requests", retry_after=10)]
+
+        async def request(chat_id):
+            if chat_id == 1 and errors:
+                raise errors.pop(0)
+            sent[chat_id] = loop.time()
+            return "ok"
+
+        started = loop.time()
+        paused = asyncio.create_task(queue.send(1, lambda: request(1)))
+        await asyncio.sleep(0.1)
+        await queue.send(2, lambda: request(2))
+        paused.cancel()
+        return started
+
+    started = asyncio.run(run())
+    assert sent[2] - started < 1
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from services.profiler import profiler
+from services.worker_pool import JobTimeoutError, WorkerPool
+
+
+def _sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+@pytest.mark.parametrize("use_processes", [True, False])
+def test_timeout_frees_the_worker(use_processes):
+    async def run():
+        pool = WorkerPool(1, 10, job_timeout=2, use_processes=use_processes)
+        try:
+            with pytest.raises(JobTimeoutError):
+                await pool.submit(_sleep, 5)
+            # Единственный воркер занят зависшей задачей — следующая задача
+            # все равно выполняется, не дожидаясь ее
+            started = time.monotonic()
+            await pool.submit(_sleep, 0)
+            return time.monotonic() - started
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(run()) < 3
+
+
+def test_timeout_kills_the_hung_process():
+    async def run():
+        pool = WorkerPool(1, 10, job_timeout=2)
+        try:
+            first_pid = await pool.submit(_sleep, 0)
+            processes = list(pool._executor._processes.values())
+            with pytest.raises(JobTimeoutError):
+                await pool.submit(_sleep, 30)
+            next_pid = await pool.submit(_sleep, 0)
+            for process in processes:
+                process.join(5)
+            return first_pid, next_pid, processes
+        finally:
+            pool.shutdown()
+
+    first_pid, next_pid, processes = asyncio.run(run())
+    assert next_pid != first_pid
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_timeout_keeps_other_jobs_running():
+    async def run():
+        pool = WorkerPool(2, 10, job_timeout=3)
+        try:
+            # Запуск процессов воркеров не входит в проверяемое время
+            await asyncio.gather(pool.submit(_sleep, 0.5), pool.submit(_sleep, 0.5))
+            hung = pool.submit(_sleep, 30)
+            other = pool.submit(_sleep, 1)
+            return await asyncio.gather(hung, other, return_exceptions=True)
+        finally:
+            pool.shutdown()
+
+    hung, other = asyncio.run(run())
+    assert isinstance(hung, JobTimeoutError)
+    assert isinstance(other, int)
+
+
+def test_thread_pool_runs_jobs_during_profiling():
+    async def run():
+        pool = WorkerPool(1, 10, job_timeout=5, use_processes=False)
+        try:
+            session = asyncio.create_task(profiler.run(0.5))
+            await asyncio.sleep(0.1)
+            pid = await pool.submit(_sleep, 0)
+            await session
+            return pid
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(run()) == os.getpid()
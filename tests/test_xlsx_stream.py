@@ -0,0 +1,72 @@
+import io
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+from services.xlsx_stream import XlsxStreamWriter
+
+VALUES = [
+    "коды",
+    "4601234567890",
+    "0104601234567890215abc<>&\"'",
+    "  пробелы по краям  ",
+    "0123",
+    "1e5",
+    "Код с переводом\nстроки",
+    "табуляция\tвнутри",
+    "x" * 1000,
+]
+
+
+def _openpyxl_file(values) -> io.BytesIO:
+    """Результат так, как его писал create_result_file через openpyxl"""
+    wb = Workbook()
+    ws = wb.active
+    for row, value in enumerate(values, start=1):
+        ws[f"A{row}"] = value
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer
+
+
+def _stream_file(values) -> io.BytesIO:
+    buffer = io.BytesIO()
+    XlsxStreamWriter.write_column(buffer, values)
+    return buffer
+
+
+def _sheet(buffer: io.BytesIO):
+    buffer.seek(0)
+    wb = load_workbook(buffer)
+    ws = wb.active
+    cells = [
+        (cell.coordinate, cell.value, cell.data_type)
+        for row in ws.iter_rows()
+        for cell in row
+    ]
+    return wb.sheetnames, ws.title, ws.max_row, ws.max_column, cells
+
+
+def test_writer_matches_openpyxl():
+    assert _sheet(_stream_file(VALUES)) == _sheet(_openpyxl_file(VALUES))
+
+
+def test_writer_matches_openpyxl_on_many_rows():
+    values = ["коды", "4601234567890"] + [f"01046{i:09d}21<{i}>" for i in range(20000)]
+    assert _sheet(_stream_file(values)) == _sheet(_openpyxl_file(values))
+
+
+def test_writer_keeps_formula_like_codes_as_text():
+    # openpyxl записывал такие значения формулами; код — всегда текст
+    values = ["коды", "4601234567890", "=SUM(A1:A2)"]
+    cells = _sheet(_stream_file(values))[4]
+    assert cells[2] == ("A3", "=SUM(A1:A2)", "s")
+
+
+def test_writer_rejects_illegal_characters_like_openpyxl():
+    values = ["коды", "bad\x01value"]
+    with pytest.raises(IllegalCharacterError):
+        _openpyxl_file(values)
+    with pytest.raises(IllegalCharacterError):
+        _stream_file(values)